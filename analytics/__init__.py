@@ -0,0 +1 @@
+"""Camada de dados e análises do dashboard Passos Mágicos - Analytics."""
@@ -0,0 +1,163 @@
+"""Backtesting com origem móvel dos métodos de ``analytics.previsao``.
+
+Cada ano da série, a partir do ``minimo_treino``-ésimo, é uma origem: os
+métodos são ajustados apenas aos anos anteriores a ela e prevêem os
+``horizonte`` anos seguintes que já foram observados. Os erros de todas as
+dobras formam o placar, com MAE e MAPE por método e horizonte (anos à
+frente da origem). O melhor método é o de menor MAE médio entre os
+horizontes, com o MAPE como desempate.
+
+As dobras são independentes e são divididas em lotes executados em um pool
+de processos (``analytics.paralelo``), o que faz diferença em séries mais
+longas que a atual.
+
+O placar é calculado apenas fora do dashboard, por ``calcular``:
+``python -m analytics.backtesting`` (ou o pré-aquecimento de
+``analytics.figuras``) calcula o placar dos dados gerais e o grava em
+``.cache/backtesting``, por impressão digital da série, dos parâmetros e do
+código dos métodos. O dashboard usa ``ler``, que só consulta o cache do
+processo e essa pasta e retorna ``None`` quando o placar não existe: nenhum
+modelo é reajustado durante a requisição.
+
+Uso: ``python -m analytics.backtesting [--horizonte N] [--minimo-treino N] [--processos N]``
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from analytics import instrumentacao, paralelo, previsao
+from analytics.cache import CacheLRU, gravar_atomico
+from analytics.caminhos import RAIZ
+
+HORIZONTE = 3
+MINIMO_TREINO = 3
+PASTA_PLACARES = RAIZ / '.cache' / 'backtesting'
+
+COLUNAS_ERROS = ['metodo', 'origem', 'horizonte', 'ano', 'real', 'previsto']
+COLUNAS_PLACAR = ['dobras', 'mae', 'mape']
+
+_cache = CacheLRU(max_itens=16)
+
+
+def _avaliar_origens(anos, valores, origens, horizonte, metodos):
+    """Previsões de cada método em cada origem (posição do primeiro ano de teste), executado nos processos do pool."""
+    erros = []
+    for origem in origens:
+        treino = pd.Series(valores[:origem], index=anos[:origem])
+        anos_teste = anos[origem:origem + horizonte]
+        for metodo in metodos:
+            with warnings.catch_warnings():
+                # Com poucos anos de treino, o statsmodels avisa que a otimização da suavização não convergiu
+                warnings.simplefilter('ignore')
+                previstos = previsao.ajustar_e_prever(treino, metodo, anos_teste)
+            for passo, (ano, real, previsto) in enumerate(zip(anos_teste, valores[origem:origem + horizonte], previstos), start=1):
+                erros.append((metodo, int(anos[origem - 1]), passo, int(ano), real, previsto))
+    return erros
+
+
+def erros(serie, horizonte=HORIZONTE, minimo_treino=MINIMO_TREINO, metodos=tuple(previsao.METODOS), processos=None):
+    """Uma linha por método, origem (último ano de treino) e horizonte, com o valor real e o previsto."""
+    anos = serie.index.to_numpy(dtype='int64')
+    valores = serie.to_numpy(dtype='float64')
+    origens = np.arange(minimo_treino, len(valores))
+    if not len(origens):
+        raise ValueError(f'A série tem {len(valores)} anos; o backtesting precisa de mais de {minimo_treino}.')
+
+    processos = processos or paralelo.processos_padrao()
+    lotes = [(anos, valores, lote, horizonte, metodos) for lote in np.array_split(origens, min(processos, len(origens)))]
+    resultados = paralelo.mapear(_avaliar_origens, lotes, processos)
+    return pd.DataFrame([linha for resultado in resultados for linha in resultado], columns=COLUNAS_ERROS)
+
+
+def calcular_placar(erros_dobras):
+    """MAE, MAPE (%) e número de dobras por método e horizonte."""
+    absolutos = (erros_dobras['previsto'] - erros_dobras['real']).abs()
+    tabela = erros_dobras.assign(erro_absoluto=absolutos, erro_percentual=absolutos / erros_dobras['real'].abs().replace(0, np.nan) * 100)
+    placar = tabela.groupby(['metodo', 'horizonte'], sort=False).agg(dobras=('erro_absoluto', 'size'), mae=('erro_absoluto', 'mean'),
+                                                                     mape=('erro_percentual', 'mean'))
+    return placar[COLUNAS_PLACAR]
+
+
+def resumo(placar_metodos):
+    """Por método, a média do MAE e do MAPE entre os horizontes, do melhor para o pior."""
+    medias = placar_metodos.groupby(level='metodo', sort=False)[['mae', 'mape']].mean()
+    return medias.sort_values(['mae', 'mape'])
+
+
+def melhor_metodo(placar_metodos):
+    return resumo(placar_metodos).index[0]
+
+
+def _chave(serie, horizonte, minimo_treino, metodos):
+    digest = hashlib.sha256(previsao.impressao_digital(serie).encode())
+    digest.update(repr((horizonte, minimo_treino, tuple(metodos))).encode())
+    # Uma mudança nos métodos ou no backtesting invalida os placares gravados
+    for caminho in (previsao.__file__, __file__):
+        with open(caminho, 'rb') as arquivo:
+            digest.update(arquivo.read())
+    return digest.hexdigest()
+
+
+def _ler_arquivo(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        linhas = json.load(arquivo)
+    return pd.DataFrame(linhas).set_index(['metodo', 'horizonte'])[COLUNAS_PLACAR]
+
+
+def ler(serie, horizonte=HORIZONTE, minimo_treino=MINIMO_TREINO, metodos=tuple(previsao.METODOS), pasta=PASTA_PLACARES):
+    """Placar já calculado de ``serie``, do cache do processo ou de ``pasta``; ``None`` se ainda não foi calculado."""
+    chave = _chave(serie, horizonte, minimo_treino, metodos)
+    resultado = _cache.consultar(chave)
+    caminho = None if pasta is None else os.path.join(pasta, f'{chave}.json')
+    if resultado is None and caminho is not None and os.path.exists(caminho):
+        resultado = _cache.obter(chave, lambda: instrumentacao.registrar('backtesting (disco)', lambda: _ler_arquivo(caminho)))
+    return resultado
+
+
+def calcular(serie, horizonte=HORIZONTE, minimo_treino=MINIMO_TREINO, metodos=tuple(previsao.METODOS), processos=None,
+             pasta=PASTA_PLACARES):
+    """Calcula o placar do backtesting de ``serie`` (ver ``calcular_placar``), fora do dashboard.
+
+    O placar fica no cache do processo e, se ``pasta`` existir, é gravado
+    nela para ``ler``.
+    """
+    chave = _chave(serie, horizonte, minimo_treino, metodos)
+    with instrumentacao.etapa('backtesting', linhas=len(serie)):
+        resultado = calcular_placar(erros(serie, horizonte, minimo_treino, metodos, processos))
+    if pasta is not None and os.path.isdir(pasta):
+        conteudo = resultado.reset_index().to_json(orient='records', force_ascii=False, indent=2)
+        gravar_atomico(os.path.join(pasta, f'{chave}.json'), conteudo.encode('utf-8'))
+    return _cache.obter(chave, lambda: resultado)
+
+
+def limpar_cache():
+    _cache.limpar()
+
+
+def main(argv=None):
+    from analytics import dados
+
+    parser = argparse.ArgumentParser(description='Backtesting com origem móvel dos métodos de previsão da série de alunos.')
+    parser.add_argument('--horizonte', type=int, default=HORIZONTE, help='anos previstos a partir de cada origem')
+    parser.add_argument('--minimo-treino', type=int, default=MINIMO_TREINO, help='anos de treino da primeira origem')
+    parser.add_argument('--processos', type=int, help=f'processos do pool (padrão: CPUs, até {paralelo.MAX_PROCESSOS})')
+    args = parser.parse_args(argv)
+
+    serie = dados.carregar_dados_gerais().set_index('Ano')['Alunos']
+    os.makedirs(PASTA_PLACARES, exist_ok=True)
+    resultado = calcular(serie, args.horizonte, args.minimo_treino, processos=args.processos)
+    with pd.option_context('display.float_format', '{:.1f}'.format):
+        print(resultado.rename(index=previsao.METODOS, level='metodo'))
+        print()
+        print(resumo(resultado).rename(index=previsao.METODOS))
+    print(f'\nMelhor método: {previsao.METODOS[melhor_metodo(resultado)]} (placar em {PASTA_PLACARES})')
+
+
+if __name__ == '__main__':
+    main()
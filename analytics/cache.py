@@ -0,0 +1,87 @@
+"""Cache LRU limitado, compartilhado entre as sessões do Streamlit."""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Memoiza valores por chave com limite de itens e descarte do menos usado.
+
+    O cache vive no processo do servidor, portanto todas as sessões
+    compartilham a mesma cópia. Cada chave é construída uma única vez, mesmo
+    quando várias sessões pedem o mesmo item ao mesmo tempo.
+    """
+
+    def __init__(self, max_itens=16):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._construindo = {}
+
+    def obter(self, chave, construir):
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+            lock_chave = self._construindo.setdefault(chave, threading.Lock())
+
+        with lock_chave:
+            # Outra sessão pode ter construído o item enquanto esperávamos
+            with self._lock:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    return self._itens[chave]
+            try:
+                valor = construir()
+                with self._lock:
+                    self._itens[chave] = valor
+                    while len(self._itens) > self.max_itens:
+                        self._itens.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._construindo.pop(chave, None)
+        return valor
+
+    def consultar(self, chave):
+        """Valor já em cache para ``chave``, ou ``None``, sem construir nada."""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+        return None
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._itens
+
+    def __len__(self):
+        with self._lock:
+            return len(self._itens)
+
+
+def versao_arquivo(caminho):
+    """Versão barata de um arquivo (mtime em ns e tamanho), usada como chave de cache."""
+    info = os.stat(caminho)
+    return info.st_mtime_ns, info.st_size
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava os bytes ``conteudo`` em ``caminho`` por um arquivo temporário renomeado, legível pelos outros usuários.
+
+    Processos concorrentes nunca leem um arquivo pela metade.
+    """
+    descritor, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.chmod(caminho_tmp, 0o644)
+        os.replace(caminho_tmp, caminho)
+    finally:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
@@ -0,0 +1,6 @@
+"""Caminhos das pastas usadas pelo dashboard."""
+
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+PASTA_DADOS = RAIZ / 'dados'
@@ -0,0 +1,32 @@
+"""Cenários de crescimento (what-if) calculados em lote.
+
+Multiplicar a série por ``1 + aumento`` multiplica os coeficientes da
+regressão linear pelo mesmo fator, então basta a curva da regressão linear
+do ``previsao.forecast`` (ajuste e previsão em cache) e escalá-la para todos
+os fatores de aumento de uma só vez, por broadcasting.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import previsao
+
+
+def fatores_aumento(minimo, maximo, passo):
+    """De ``minimo`` até ``maximo`` com o ``passo`` informado; o máximo só entra se cair em um passo."""
+    # Meio passo de folga para que o máximo não se perca por arredondamento de ponto flutuante
+    return np.round(np.arange(minimo, maximo + passo / 2, passo), 4)
+
+
+def projetar(serie, aumentos, horizonte):
+    """Projeções por fator de aumento (linhas) e ano (colunas), do primeiro ano observado até ``horizonte`` anos após o último."""
+    reta = previsao.forecast(serie, horizonte, metodos=['regressao_linear'])['regressao_linear']
+    projecoes = (1 + np.asarray(aumentos, dtype='float64'))[:, np.newaxis] * reta.to_numpy()
+    return pd.DataFrame(projecoes, index=pd.Index(aumentos, name='aumento'), columns=reta.index)
+
+
+def tabela_horizontes(projecoes, ultimo_ano, horizontes):
+    """Projeção no ano final de cada horizonte, para cada fator de aumento."""
+    tabela = projecoes[[ultimo_ano + horizonte for horizonte in horizontes]]
+    tabela.columns = pd.Index(horizontes, name='horizonte')
+    return tabela
@@ -0,0 +1,81 @@
+"""Cubo de agregados dos indicadores dos alunos.
+
+O cubo guarda, para cada combinação de ``DIMENSOES``, a quantidade de alunos
+e, para cada indicador e nota, a quantidade de valores, a soma e a soma dos
+quadrados. Como essas medidas são aditivas, o cubo de cada partição anual é
+gravado na ingestão e os cubos são simplesmente concatenados na leitura.
+Tabelas e gráficos são fatias do cubo: filtrar e reagrupar algumas centenas
+de linhas em vez da tabela completa de alunos.
+"""
+
+import numpy as np
+import pandas as pd
+
+DIMENSOES = ['ANO', 'PONTO_VIRADA', 'PEDRA', 'FASE', 'INSTITUICAO_ENSINO_ALUNO']
+INDICADORES = ['INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN']
+NOTAS = ['NOTA_MAT', 'NOTA_PORT', 'NOTA_ING']
+MEDIDAS = INDICADORES + NOTAS
+PONTOS_VIRADA = ['Não', 'Sim']
+
+
+def construir_cubo(df):
+    """Agrega a tabela de alunos por todas as dimensões (nulos formam grupos próprios)."""
+    # Dimensões e medidas que não existem na partição entram como nulas
+    df = df.reindex(columns=DIMENSOES + MEDIDAS)
+    valores = df[MEDIDAS].astype('float64')
+    quadrados = (valores ** 2).add_prefix('SOMA_QUAD_')
+    base = pd.concat([df[DIMENSOES], valores.notna().add_prefix('N_'), valores.fillna(0).add_prefix('SOMA_'), quadrados.fillna(0)], axis=1)
+
+    grupos = base.groupby(DIMENSOES, dropna=False, sort=True)
+    cubo = grupos.sum()
+    cubo.insert(0, 'ALUNOS', grupos.size())
+    colunas_n = [f'N_{medida}' for medida in MEDIDAS]
+    cubo[['ALUNOS'] + colunas_n] = cubo[['ALUNOS'] + colunas_n].astype('int64')
+    return cubo.reset_index()
+
+
+def filtrar(cubo, filtros=None):
+    """Linhas do cubo cujas dimensões estão nos valores de ``filtros`` ({dimensão: valores})."""
+    if not filtros:
+        return cubo
+    mascara = np.ones(len(cubo), dtype=bool)
+    for dimensao, valores in filtros.items():
+        mascara &= cubo[dimensao].isin(list(valores)).to_numpy()
+    return cubo[mascara]
+
+
+def fatiar(cubo, por, filtros=None):
+    """Soma as medidas do cubo agrupando por ``por`` (linhas com dimensão nula ficam de fora)."""
+    medidas = [coluna for coluna in cubo.columns if coluna not in DIMENSOES]
+    return filtrar(cubo, filtros).groupby(list(por))[medidas].sum()
+
+
+def contagem(cubo, por=('ANO', 'PONTO_VIRADA'), filtros=None):
+    """Quantidade de alunos, com a última dimensão de ``por`` nas colunas."""
+    contagens = fatiar(cubo, por, filtros)['ALUNOS'].unstack(fill_value=0)
+    if por[-1] == 'PONTO_VIRADA':
+        # As colunas Não e Sim existem mesmo quando a seleção não tem alunos com um dos rótulos
+        contagens = contagens.reindex(columns=PONTOS_VIRADA, fill_value=0)
+    return contagens
+
+
+def medias(cubo, colunas, por=('ANO', 'PONTO_VIRADA'), filtros=None):
+    fatia = fatiar(cubo, por, filtros)
+    quantidades = _medida(fatia, 'N_', colunas)
+    return _medida(fatia, 'SOMA_', colunas) / quantidades.where(quantidades > 0)
+
+
+def desvios_padrao(cubo, colunas, por=('ANO', 'PONTO_VIRADA'), filtros=None):
+    """Desvio padrão amostral, obtido da soma e da soma dos quadrados."""
+    fatia = fatiar(cubo, por, filtros)
+    n = _medida(fatia, 'N_', colunas)
+    soma = _medida(fatia, 'SOMA_', colunas)
+    soma_quad = _medida(fatia, 'SOMA_QUAD_', colunas)
+    variancia = (soma_quad - soma ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+    return np.sqrt(variancia.clip(lower=0))
+
+
+def _medida(fatia, prefixo, colunas):
+    medida = fatia[[f'{prefixo}{coluna}' for coluna in colunas]]
+    medida.columns = colunas
+    return medida
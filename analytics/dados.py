@@ -0,0 +1,162 @@
+"""Leitura memoizada dos arquivos da pasta ``dados``.
+
+Cada arquivo é lido uma única vez por versão (mtime e tamanho): se o arquivo
+for alterado em disco, a próxima chamada o lê novamente. Os DataFrames ficam
+em um cache LRU do processo, compartilhado entre sessões, e cada chamada
+recebe uma cópia rasa. O ``app.py`` liga o modo copy-on-write do pandas, de
+modo que alterações feitas por uma aba nunca chegam à cópia compartilhada.
+"""
+
+import warnings
+
+import pandas as pd
+
+from analytics import filtros, geo, ideb, ingestao, instrumentacao, pipeline, propensao, ranking_ideb, significancia, trajetoria
+from analytics.cache import CacheLRU, versao_arquivo
+from analytics.caminhos import PASTA_DADOS
+
+CAMINHO_DADOS_GERAIS = PASTA_DADOS / 'dados_gerais.csv'
+
+_cache = CacheLRU(max_itens=32)
+
+
+def _memoizar(nome, caminhos, construir):
+    chave = (nome, *(versao_arquivo(caminho) for caminho in caminhos))
+    return _cache.obter(chave, lambda: instrumentacao.registrar(f'dados: {nome}', construir))
+
+
+def _carregar(nome, caminhos, ler):
+    return _memoizar(nome, caminhos, ler).copy(deep=False)
+
+
+def carregar_dados_gerais():
+    return _carregar('dados_gerais', [CAMINHO_DADOS_GERAIS], lambda: pd.read_csv(CAMINHO_DADOS_GERAIS, delimiter=';', thousands='.'))
+
+
+def carregar_alunos():
+    """Tabela longa de alunos já limpa e tipada, lida das partições por ano."""
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)
+    return _carregar('alunos', caminhos, lambda: ingestao.ler_particoes(caminhos))
+
+
+def carregar_indice_filtros():
+    """Índice de filtros da tabela de alunos, construído uma vez por versão das partições."""
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)
+    return _memoizar('indice_filtros', caminhos, lambda: filtros.IndiceFiltros(carregar_alunos()))
+
+
+def carregar_testes_ponto_virada():
+    """Testes Sim x Não do Ponto de Virada por ano e medida, com cache por filtro (ver ``analytics.significancia``)."""
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)
+    return _memoizar('testes_ponto_virada', caminhos, lambda: significancia.TestesPontoVirada(carregar_alunos(), carregar_indice_filtros()))
+
+
+def carregar_indice_alunos():
+    """Tabela de alunos ordenada por aluno e ano, para consulta das trajetórias."""
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)
+    return _memoizar('indice_alunos', caminhos, lambda: trajetoria.IndiceAlunos(carregar_alunos()))
+
+
+def carregar_cubo_alunos():
+    """Cubo de agregados dos indicadores, concatenado a partir das partições por ano."""
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_CUBO)
+    return _carregar('cubo_alunos', caminhos, lambda: ingestao.ler_particoes(caminhos))
+
+
+def _carregar_modelo(caminho):
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)
+
+    def carregar():
+        modelo = propensao.ModeloPropensao.carregar(caminho)
+        # Os hashes gravados no treinamento dizem se o modelo ainda corresponde às partições atuais
+        if modelo.particoes_alteradas(caminhos):
+            warnings.warn(f'O modelo de propensão v{modelo.versao} foi treinado com partições diferentes das atuais '
+                          f'({", ".join(modelo.particoes_desatualizadas)}); treine novamente com python -m analytics.propensao.')
+        return modelo
+
+    return _memoizar('modelo_propensao', [caminho, *caminhos], carregar)
+
+
+def carregar_modelo_propensao():
+    """Versão mais recente do modelo de propensão ao Ponto de Virada, ou ``None`` se nenhum foi treinado."""
+    caminho = propensao.caminho_mais_recente()
+    return None if caminho is None else _carregar_modelo(caminho)
+
+
+def carregar_propensao():
+    """Probabilidade de Ponto de Virada de cada linha de ``carregar_alunos``, pontuada uma vez por versão do modelo e das partições."""
+    # O caminho é resolvido uma vez: o modelo e a chave do cache se referem sempre ao mesmo artefato
+    caminho = propensao.caminho_mais_recente()
+    if caminho is None:
+        return None
+    modelo = _carregar_modelo(caminho)
+    caminhos = [caminho, *ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)]
+
+    def pontuar():
+        probabilidades = modelo.pontuar(carregar_alunos())
+        probabilidades.flags.writeable = False
+        return probabilidades
+
+    return _memoizar('propensao', caminhos, pontuar)
+
+
+def arquivos_alunos():
+    """Arquivos das partições de alunos e dos cubos, para versionar o que é derivado deles."""
+    ingestao.exigir_particoes()
+    return ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS) + ingestao.arquivos_particoes(pipeline.ARQUIVO_CUBO)
+
+
+def arquivos_ideb(municipio=None, uf=None):
+    """Arquivos das partições do IDEB por escola e por município da seleção."""
+    return ideb.particoes('escolas', municipio, uf) + ideb.particoes('municipios', municipio, uf)
+
+
+def carregar_ideb_por_escola(municipio=None, uf=None, ciclos=None, anos=None):
+    """IDEB/SAEB por escola, lido apenas das partições do município e dos anos pedidos (ver ``analytics.ideb``)."""
+    return _carregar_ideb('escolas', municipio, uf, ciclos, anos)
+
+
+def carregar_ideb_por_municipio(municipio=None, uf=None, ciclos=None, anos=None):
+    """IDEB/SAEB por município, lido apenas das partições do município e dos anos pedidos (ver ``analytics.ideb``)."""
+    return _carregar_ideb('municipios', municipio, uf, ciclos, anos)
+
+
+def carregar_catalogo_ideb():
+    """UFs, municípios e anos com IDEB municipal convertido."""
+    caminho = ideb.caminho_catalogo('municipios')
+    return _carregar('catalogo_ideb', [caminho], lambda: ideb.ler_catalogo('municipios'))
+
+
+def carregar_ranking_ideb(uf):
+    """Ranking das escolas da UF, calculado uma vez por UF e versão das partições (ver ``analytics.ranking_ideb``)."""
+    return _memoizar(('ranking_ideb', uf), arquivos_ideb(uf=uf), lambda: ranking_ideb.RankingIdeb(carregar_ideb_por_escola(uf=uf), carregar_ideb_por_municipio(uf=uf)))
+
+
+def carregar_escolas_geo():
+    return _carregar('escolas_geo', [geo.CAMINHO_ESCOLAS_GEO], geo.ler_escolas_geo)
+
+
+def carregar_indice_unidades():
+    """Índice espacial das unidades da Passos Mágicos; ``None`` se nenhuma unidade estiver cadastrada."""
+    def construir():
+        unidades = geo.ler_unidades()
+        return geo.IndiceEspacial(unidades) if unidades[['latitude', 'longitude']].notna().all(axis=1).any() else None
+
+    return _memoizar('indice_unidades', [geo.CAMINHO_UNIDADES], construir)
+
+
+def _carregar_ideb(tabela, municipio, uf, ciclos, anos):
+    caminhos = ideb.particoes(tabela, municipio, uf, anos)
+    ciclos = None if ciclos is None else tuple(ciclos)
+    nome = ('ideb', tabela, municipio, uf, ciclos, None if anos is None else tuple(anos))
+    return _carregar(nome, caminhos, lambda: ideb.ler(tabela, caminhos, ciclos))
+
+
+def limpar_cache():
+    _cache.limpar()
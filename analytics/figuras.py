@@ -0,0 +1,188 @@
+"""Cache das figuras Plotly por versão dos dados.
+
+Cada figura é identificada pelo nome, pelos parâmetros que a alteram
+(filtros, município, aluno...) e pela versão (mtime e tamanho) dos arquivos
+de dados de que depende, além de uma impressão digital do código do
+dashboard. A figura é construída uma única vez por chave e fica em um cache
+LRU do processo. Se a pasta ``.cache/figuras`` existir, o JSON de cada figura
+também é gravado nela e reaproveitado por outros processos, como o primeiro
+acesso após um deploy. ``python -m analytics.figuras`` cria a pasta, calcula
+o placar do backtesting e os intervalos de previsão (que o dashboard só lê,
+ver ``analytics.backtesting`` e ``analytics.intervalos``) e executa todas as seções do dashboard uma vez para pré-aquecer esse cache.
+
+Em memória fica o próprio ``go.Figure``, e não o JSON: o ``st.plotly_chart``
+valida de novo uma figura recebida como dicionário (dezenas de ms por
+figura), enquanto uma figura já construída só é serializada. As figuras
+devolvidas são compartilhadas entre sessões e não devem ser alteradas.
+
+Os gráficos matplotlib/seaborn passam por ``imagem``: cada um é desenhado em
+um ``Figure`` próprio com canvas Agg, sem o estado global do ``pyplot`` (que é
+compartilhado pelas threads das sessões do Streamlit), e a figura é limpa
+logo após gerar o PNG. Em cache ficam apenas os bytes do PNG.
+
+Uso: ``python -m analytics.figuras [--limpar]``
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+import plotly.io as pio
+import streamlit as st
+
+from analytics import instrumentacao
+from analytics.cache import CacheLRU, versao_arquivo
+from analytics.caminhos import RAIZ
+
+PASTA_FIGURAS = RAIZ / '.cache' / 'figuras'
+CAMINHO_APP = RAIZ / 'app.py'
+
+_cache = CacheLRU(max_itens=128)
+_versao_codigo = None
+
+
+def versao_codigo():
+    """Hash do ``app.py`` e dos módulos de ``analytics``: uma figura em disco nunca sobrevive a uma mudança de código."""
+    global _versao_codigo
+    if _versao_codigo is None:
+        digest = hashlib.sha256()
+        for caminho in [CAMINHO_APP, *sorted((RAIZ / 'analytics').glob('*.py'))]:
+            digest.update(caminho.read_bytes())
+        _versao_codigo = digest.hexdigest()
+    return _versao_codigo
+
+
+def chave_figura(nome, arquivos, parametros=()):
+    digest = hashlib.sha256(versao_codigo().encode())
+    digest.update(repr((nome, parametros)).encode())
+    for caminho in arquivos:
+        digest.update(repr((os.path.basename(caminho), versao_arquivo(caminho))).encode())
+    return digest.hexdigest()
+
+
+def figura(nome, arquivos, construir, parametros=(), pasta=PASTA_FIGURAS):
+    """Figura ``nome`` construída por ``construir`` uma única vez por versão de ``arquivos`` e ``parametros``."""
+    chave = chave_figura(nome, arquivos, parametros)
+    return _cache.obter(chave, lambda: _ler_ou_construir(nome, chave, construir, pasta, 'json', _ler_json, _gravar_json))
+
+
+def imagem(nome, arquivos, desenhar, parametros=(), tamanho=None, pasta=PASTA_FIGURAS):
+    """PNG do gráfico matplotlib que ``desenhar(fig)`` desenha em uma figura nova, gerado uma única vez por versão dos dados.
+
+    Exibido com ``st.image(png, use_column_width=True)``, na mesma resolução
+    e largura do ``st.pyplot``.
+    """
+    chave = chave_figura(nome, arquivos, parametros)
+    return _cache.obter(chave, lambda: _ler_ou_construir(nome, chave, lambda: renderizar_png(desenhar, tamanho), pasta, 'png',
+                                                         _ler_bytes, lambda png: png))
+
+
+def renderizar_png(desenhar, tamanho=None):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=tamanho)
+    FigureCanvasAgg(fig)
+    try:
+        desenhar(fig)
+        # Mesmas opções do st.pyplot
+        saida = io.BytesIO()
+        fig.savefig(saida, format='png', dpi=200, bbox_inches='tight')
+        return saida.getvalue()
+    finally:
+        fig.clear()
+
+
+def exibir(fig):
+    """``st.plotly_chart`` da figura, registrando o tempo de serialização."""
+    with instrumentacao.etapa('st.plotly_chart'):
+        st.plotly_chart(fig)
+
+
+def _ler_json(caminho):
+    return pio.read_json(caminho)
+
+
+def _gravar_json(fig):
+    return pio.to_json(fig, validate=False).encode('utf-8')
+
+
+def _ler_bytes(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+
+def _ler_ou_construir(nome, chave, construir, pasta, extensao, ler, serializar):
+    if pasta is None or not os.path.isdir(pasta):
+        return instrumentacao.registrar(f'figura: {nome}', construir)
+
+    caminho = os.path.join(pasta, f'{chave}.{extensao}')
+    if os.path.exists(caminho):
+        return instrumentacao.registrar(f'figura (disco): {nome}', lambda: ler(caminho))
+
+    resultado = instrumentacao.registrar(f'figura: {nome}', construir)
+    # Grava em um arquivo temporário e renomeia, para que processos concorrentes nunca leiam um arquivo pela metade
+    descritor, caminho_tmp = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(serializar(resultado))
+        os.chmod(caminho_tmp, 0o644)
+        os.replace(caminho_tmp, caminho)
+    finally:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+    return resultado
+
+
+def limpar_cache():
+    _cache.limpar()
+
+
+def preaquecer(limpar=False):
+    """Executa cada seção do dashboard com os valores padrão, gravando as figuras em ``PASTA_FIGURAS``."""
+    from streamlit.testing.v1 import AppTest
+
+    from analytics import backtesting, dados, intervalos
+
+    if limpar and os.path.isdir(PASTA_FIGURAS):
+        shutil.rmtree(PASTA_FIGURAS)
+    os.makedirs(PASTA_FIGURAS, exist_ok=True)
+
+    # O dashboard apenas lê o placar do backtesting e os intervalos de previsão; eles são calculados aqui, antes das seções
+    serie = dados.carregar_dados_gerais().set_index('Ano')['Alunos']
+    os.makedirs(backtesting.PASTA_PLACARES, exist_ok=True)
+    backtesting.calcular(serie)
+    os.makedirs(intervalos.PASTA_INTERVALOS, exist_ok=True)
+    intervalos.calcular(serie)
+
+    def executar(secao=None):
+        app = AppTest.from_file(str(CAMINHO_APP), default_timeout=600)
+        app.run()
+        if secao is not None:
+            app.sidebar.radio[0].set_value(secao)
+            app.run()
+        if app.exception:
+            raise RuntimeError(f'Erro ao executar a seção {secao}: {app.exception[0].message}')
+        return app
+
+    # Uma sessão nova por seção, para que os widgets de uma seção não interfiram na execução da seguinte
+    secoes = executar().sidebar.radio[0].options
+    for secao in secoes:
+        executar(secao)
+    return secoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pré-aquece o cache de figuras do dashboard em disco.')
+    parser.add_argument('--limpar', action='store_true', help='apaga as figuras gravadas antes de pré-aquecer')
+    args = parser.parse_args(argv)
+
+    secoes = preaquecer(args.limpar)
+    print(f'{len(os.listdir(PASTA_FIGURAS))} figuras em {PASTA_FIGURAS} ({len(secoes)} seções executadas)')
+
+
+if __name__ == '__main__':
+    main()
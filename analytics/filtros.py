@@ -0,0 +1,89 @@
+"""Índice em memória para os filtros da aba Ponto de Virada.
+
+Cada dimensão de filtro é codificada uma única vez (``pd.factorize``) e cada
+um dos seus valores ganha uma máscara booleana pré-calculada. Uma combinação
+de filtros vira uma união de máscaras dentro da dimensão e uma interseção
+entre dimensões, sem nenhum ``groupby`` na tabela de alunos. As agregações
+por ``ANO`` x ``PONTO_VIRADA`` da seleção são feitas com ``np.bincount`` e
+saem no mesmo formato do cubo (ver ``analytics.cubo``).
+
+``FASE_TURMA`` só vem preenchida em 2020; nos outros anos a dimensão é
+montada a partir de ``FASE`` e ``TURMA`` (ex.: fase 2, turma G vira "2G").
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import cubo
+
+DIMENSOES_FILTRO = ['ANO', 'FASE', 'FASE_TURMA', 'PEDRA', 'INSTITUICAO_ENSINO_ALUNO', 'BOLSISTA']
+
+
+def fase_turma(df):
+    """``FASE_TURMA`` de todos os anos: a coluna de 2020 ou a fase seguida da turma."""
+    montada = df['FASE'].map('{:g}'.format, na_action='ignore') + df['TURMA']
+    return df['FASE_TURMA'].fillna(montada)
+
+
+# Dimensões que não existem prontas em todos os anos e são montadas de outras colunas
+DERIVADAS = {'FASE_TURMA': fase_turma}
+
+
+class IndiceFiltros:
+
+    def __init__(self, df, dimensoes=DIMENSOES_FILTRO, medidas=cubo.MEDIDAS):
+        self.tamanho = len(df)
+        self.categorias = {}
+        self._mascaras = {}
+        for dimensao in dimensoes:
+            # Valores nulos recebem código -1 e não têm máscara (só aparecem sem filtro)
+            coluna = DERIVADAS[dimensao](df) if dimensao in DERIVADAS else df[dimensao]
+            codigos, categorias = pd.factorize(coluna, sort=True)
+            self.categorias[dimensao] = categorias.tolist()
+            self._mascaras[dimensao] = {categoria: codigos == i for i, categoria in enumerate(self.categorias[dimensao])}
+
+        # Grupos ANO x PONTO_VIRADA; Ponto de Virada nulo ocupa a última posição de cada ano
+        codigos_ano, self._anos = pd.factorize(df['ANO'], sort=True)
+        codigos_pv, pontos_virada = pd.factorize(df['PONTO_VIRADA'], sort=True)
+        self._pontos_virada = pontos_virada.tolist() + [np.nan]
+        codigos_pv = np.where(codigos_pv < 0, len(pontos_virada), codigos_pv)
+        self._grupos = codigos_ano * len(self._pontos_virada) + codigos_pv
+        self._quantidade_grupos = len(self._anos) * len(self._pontos_virada)
+
+        self._valores = {medida: df[medida].to_numpy(dtype='float64') for medida in medidas if medida in df.columns}
+
+    def mascara(self, filtros=None):
+        """Linhas que atendem a ``filtros`` ({dimensão: valores}); dimensões sem valores não filtram."""
+        mascara = np.ones(self.tamanho, dtype=bool)
+        for dimensao, valores in (filtros or {}).items():
+            if not valores:
+                continue
+            selecionados = np.zeros(self.tamanho, dtype=bool)
+            for valor in valores:
+                selecionados |= self._mascaras[dimensao][valor]
+            mascara &= selecionados
+        return mascara
+
+    def cubo(self, filtros=None):
+        """Cubo ``ANO`` x ``PONTO_VIRADA`` das linhas selecionadas por ``filtros``."""
+        mascara = self.mascara(filtros)
+        grupos = self._grupos[mascara]
+
+        def contar(pesos=None):
+            return np.bincount(grupos, weights=pesos, minlength=self._quantidade_grupos)
+
+        colunas = {
+            'ANO': np.repeat(self._anos, len(self._pontos_virada)),
+            'PONTO_VIRADA': np.tile(np.array(self._pontos_virada, dtype=object), len(self._anos)),
+            'ALUNOS': contar(),
+        }
+        for medida, valores in self._valores.items():
+            valores = valores[mascara]
+            presentes = ~np.isnan(valores)
+            valores = np.where(presentes, valores, 0.0)
+            colunas[f'N_{medida}'] = contar(presentes.astype('float64')).astype('int64')
+            colunas[f'SOMA_{medida}'] = contar(valores)
+            colunas[f'SOMA_QUAD_{medida}'] = contar(valores ** 2)
+
+        resultado = pd.DataFrame(colunas)
+        return resultado[resultado['ALUNOS'] > 0].reset_index(drop=True)
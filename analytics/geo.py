@@ -0,0 +1,78 @@
+"""Escolas geocodificadas e índice espacial sobre elas.
+
+As coordenadas das escolas ficam em ``dados/escolas_geo.csv``, identificadas
+por UF, município e nome da escola, as mesmas chaves das tabelas do IDEB
+(que não trazem o código INEP). As unidades da Passos Mágicos ficam em
+``dados/unidades_passos_magicos.csv``.
+
+O índice é uma ``BallTree`` do scikit-learn com distância haversine: consultas
+de escolas dentro de um raio, da unidade mais próxima de cada escola e
+agrupamento por densidade (DBSCAN) rodam em O(log n) por ponto, em lote.
+O scikit-learn é importado apenas quando um índice é construído.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics.caminhos import PASTA_DADOS
+
+CAMINHO_ESCOLAS_GEO = PASTA_DADOS / 'escolas_geo.csv'
+CAMINHO_UNIDADES = PASTA_DADOS / 'unidades_passos_magicos.csv'
+
+CHAVE_ESCOLA = ['uf', 'nome_municipio', 'nome_escola']
+RAIO_TERRA_KM = 6371.0088
+
+
+def ler_escolas_geo(caminho=CAMINHO_ESCOLAS_GEO):
+    return pd.read_csv(caminho, delimiter=';', dtype={'latitude': 'float64', 'longitude': 'float64'})
+
+
+def ler_unidades(caminho=CAMINHO_UNIDADES):
+    return pd.read_csv(caminho, delimiter=';', dtype={'latitude': 'float64', 'longitude': 'float64'})
+
+
+def geocodificar(escolas, escolas_geo):
+    """Acrescenta ``latitude`` e ``longitude`` às escolas; as que não estão na tabela ficam com coordenadas nulas."""
+    return escolas.merge(escolas_geo[CHAVE_ESCOLA + ['latitude', 'longitude']], on=CHAVE_ESCOLA, how='left')
+
+
+def _radianos(latitudes, longitudes):
+    return np.radians(np.column_stack([np.asarray(latitudes, dtype='float64'), np.asarray(longitudes, dtype='float64')]))
+
+
+class IndiceEspacial:
+
+    def __init__(self, pontos):
+        from sklearn.neighbors import BallTree
+
+        self.pontos = pontos.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        self._coordenadas = _radianos(self.pontos['latitude'], self.pontos['longitude'])
+        self._arvore = BallTree(self._coordenadas, metric='haversine')
+
+    def __len__(self):
+        return len(self.pontos)
+
+    def no_raio(self, latitude, longitude, raio_km):
+        """Pontos a até ``raio_km`` do local, do mais próximo ao mais distante, com a coluna ``distancia_km``."""
+        indices, distancias = self._arvore.query_radius(_radianos([latitude], [longitude]), r=raio_km / RAIO_TERRA_KM,
+                                                        return_distance=True, sort_results=True)
+        return self.pontos.iloc[indices[0]].assign(distancia_km=distancias[0] * RAIO_TERRA_KM).reset_index(drop=True)
+
+    def mais_proximos(self, latitudes, longitudes):
+        """Posição em ``pontos`` e distância (km) do ponto mais próximo de cada local, em lote."""
+        distancias, indices = self._arvore.query(_radianos(latitudes, longitudes), k=1)
+        return indices[:, 0], distancias[:, 0] * RAIO_TERRA_KM
+
+    def agrupar(self, raio_km, minimo=2):
+        """Agrupamentos por densidade (DBSCAN): pontos a até ``raio_km`` uns dos outros; -1 para pontos isolados."""
+        from sklearn.cluster import DBSCAN
+
+        modelo = DBSCAN(eps=raio_km / RAIO_TERRA_KM, min_samples=minimo, metric='haversine', algorithm='ball_tree')
+        return pd.Series(modelo.fit_predict(self._coordenadas), index=self.pontos.index, name='agrupamento')
+
+
+def unidade_mais_proxima(escolas, indice_unidades):
+    """Acrescenta às escolas geocodificadas a unidade da Passos Mágicos mais próxima e a distância até ela."""
+    posicoes, distancias = indice_unidades.mais_proximos(escolas['latitude'], escolas['longitude'])
+    return escolas.assign(unidade_mais_proxima=indice_unidades.pontos['nome_unidade'].to_numpy()[posicoes],
+                          distancia_unidade_km=distancias)
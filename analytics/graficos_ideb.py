@@ -0,0 +1,142 @@
+"""Gráficos do IDEB por escola, gerados a partir de uma única divisão dos dados.
+
+As escolas do município são separadas uma só vez por ``ciclo`` x ``ano``
+(``groupby``) e cada partição é ordenada pelo IDEB; o IDEB de referência do
+município (rede pública) vem de uma única consulta, indexada pelo mesmo par.
+Todos os gráficos de ciclo e de ano são gerados dessas partições, então uma
+nova edição do IDEB ou um novo ciclo não exige código nem filtros a mais.
+"""
+
+import plotly.graph_objects as go
+
+CICLOS = {
+    'AI': 'nos Anos Iniciais (1º ao 5º ano)',
+    'AF': 'nos Anos Finais (6º ao 9º ano)',
+    'EM': 'no Ensino Médio',
+}
+
+COR_ACIMA = '#1f77b4'
+COR_ABAIXO = '#aec7e8'
+
+# Altura dos gráficos de barras horizontais: cresce com o número de escolas, dentro destes limites
+ALTURA_POR_ESCOLA = 50
+ALTURA_MINIMA = 300
+ALTURA_MAXIMA = 600
+
+
+class GraficosIdeb:
+
+    def __init__(self, escolas, municipio, nome_municipio):
+        self.nome_municipio = nome_municipio
+        self._vazio = escolas.iloc[:0]
+        self._particoes = {chave: grupo.sort_values(by='ideb') for chave, grupo in escolas.groupby(['ciclo', 'ano'], sort=True)}
+        self.anos = sorted({ano for _, ano in self._particoes})
+        self.ciclos = [ciclo for ciclo in CICLOS if any(chave[0] == ciclo for chave in self._particoes)]
+        # IDEB de referência do município por ciclo x ano
+        self.referencia = municipio[municipio['rede'] == 'Pública'].groupby(['ciclo', 'ano'])['ideb'].mean().dropna()
+
+    def escolas(self, ciclo, ano):
+        """Escolas do ciclo no ano, em ordem crescente de IDEB."""
+        return self._particoes.get((ciclo, ano), self._vazio)
+
+    def municipio(self):
+        """IDEB do município por ciclo, com uma barra por ano."""
+        fig = go.Figure()
+        for ano in self.anos:
+            ideb_ano = self.referencia.xs(ano, level='ano').reindex(self.ciclos).dropna()
+            fig.add_trace(go.Bar(x=ideb_ano.index, y=ideb_ano.values, name=str(ano)))
+
+        fig.update_layout(title=f'Valor do IDEB do Município de {self.nome_municipio} por Ano Escolar',
+                        xaxis_title='Ano Escolar',
+                        yaxis_title='IDEB',
+                        barmode='group',
+                        legend_title='Ano')
+        return fig
+
+    def por_ciclo(self, ciclo):
+        """IDEB de cada escola do ciclo, com uma barra por ano."""
+        fig = go.Figure()
+        quantidade_escolas = 0
+        for ano in self.anos:
+            escolas = self.escolas(ciclo, ano).iloc[::-1]
+            quantidade_escolas = max(quantidade_escolas, len(escolas))
+            fig.add_trace(go.Bar(x=escolas['nome_escola'], y=escolas['ideb'], name=str(ano)))
+
+        fig.update_layout(title=f'Valor do IDEB por Escola do Município de {self.nome_municipio} {CICLOS[ciclo]}',
+                        xaxis_title='Escolas',
+                        yaxis_title='IDEB',
+                        barmode='group',
+                        legend_title='Ano',
+                        width=min(900, max(600, 50 * quantidade_escolas + 100)),
+                        height=600 if quantidade_escolas > 8 else 500,
+                        yaxis_tickangle=-45)
+        return fig
+
+    def por_ano(self, ciclo, ano):
+        """IDEB de cada escola do ciclo no ano, destacando as escolas acima do IDEB do município."""
+        escolas = self.escolas(ciclo, ano)
+        referencia = self.referencia.get((ciclo, ano))
+        cores = [COR_ACIMA if ideb >= referencia else COR_ABAIXO for ideb in escolas['ideb']] if referencia is not None else COR_ACIMA
+
+        fig = go.Figure()
+
+        fig.add_trace(go.Bar(x=escolas['ideb'], y=escolas['nome_escola'],
+                            name=str(ano), orientation='h', marker_color=cores))
+
+        if referencia is not None:
+            fig.add_vline(x=referencia, line_dash="dash", line_color="black")
+
+            fig.add_annotation(x=referencia + 0.2, y=len(escolas), text=f"IDEB {self.nome_municipio}: {referencia}", showarrow=True,
+                            arrowhead=1, arrowcolor="black", arrowsize=0.5,
+                            arrowwidth=2, ax=70, ay=-30)
+
+        fig.update_layout(title=f'Valor do IDEB {ano} por Escola do Município de {self.nome_municipio} {CICLOS[ciclo]}',
+                        xaxis_title=f'IDEB {ano}',
+                        yaxis_title='Escolas',
+                        legend_title='Ano',
+                        barmode='group',
+                        width=800,
+                        height=min(ALTURA_MAXIMA, max(ALTURA_MINIMA, ALTURA_POR_ESCOLA * len(escolas))),
+                        plot_bgcolor='rgba(255,255,255,0)',
+                        font=dict(family='Arial', size=12, color='black'),
+                        legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'),
+                        margin=dict(l=200, r=50, t=70, b=50),
+                        )
+        return fig
+
+
+def diferenca_municipio(comparacao, nome_municipio, ciclo, ano):
+    """Diferença entre o IDEB de cada escola e o IDEB do município (linhas de ``ranking_ideb.comparar``)."""
+    escolas = comparacao[comparacao['ano'] == ano].sort_values(by='delta_municipio')
+    cores = [COR_ACIMA if delta >= 0 else COR_ABAIXO for delta in escolas['delta_municipio']]
+    texto = [f'{percentil:.0%} da UF' for percentil in escolas['percentil_uf']]
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(x=escolas['delta_municipio'], y=escolas['nome_escola'], orientation='h',
+                        marker_color=cores, text=texto, textposition='outside', name=str(ano)))
+
+    fig.add_vline(x=0, line_dash="dash", line_color="black")
+
+    fig.update_layout(title=f'Diferença entre o IDEB {ano} de cada Escola e o IDEB de {nome_municipio} {CICLOS[ciclo]}',
+                    xaxis_title='Diferença para o IDEB do município',
+                    yaxis_title='Escolas',
+                    width=800,
+                    height=min(ALTURA_MAXIMA, max(ALTURA_MINIMA, ALTURA_POR_ESCOLA * len(escolas))),
+                    plot_bgcolor='rgba(255,255,255,0)',
+                    font=dict(family='Arial', size=12, color='black'),
+                    margin=dict(l=200, r=50, t=70, b=50),
+                    )
+    return fig
+
+
+def mapa_escolas(escolas, cor=None, dados_hover=None):
+    """Mapa das escolas geocodificadas (colunas ``latitude`` e ``longitude``)."""
+    import plotly.express as px
+
+    fig = px.scatter_mapbox(escolas, lat='latitude', lon='longitude', hover_name='nome_escola', color=cor,
+                            hover_data=dados_hover, zoom=11)
+
+    fig.update_layout(mapbox_style="open-street-map", width=700, height=600)
+    fig.update_traces(marker=dict(size=15))
+    return fig
@@ -0,0 +1,188 @@
+"""Armazenamento particionado do IDEB/SAEB por escola e por município.
+
+As planilhas do INEP (``dados/ideb_saeb_por_*.xlsx``) são convertidas uma
+única vez, fora do dashboard, em arquivos Arrow tipados com uma partição por
+UF, município e ano em
+``dados/ideb/<tabela>/UF=<uf>/MUNICIPIO=<municipio>/ANO=<ano>/ideb.feather``.
+A planilha é validada com ``ESQUEMA_IDEB`` (ver ``analytics.validacao``): os
+marcadores de ausência do INEP (``-`` e ``ND``) viram nulos, as notas viram
+números e as linhas com valores inválidos, como uma nota fora da escala,
+ficam na quarentena da tabela, ao lado do relatório de qualidade. Na leitura, os caminhos são montados a partir do município e
+dos anos pedidos, de modo que só essas partições são abertas, e o filtro de
+ciclo é aplicado na tabela Arrow antes da conversão para pandas. Um catálogo
+por tabela (``catalogo.feather``) lista as UFs, municípios e anos convertidos.
+
+Ao sair uma nova edição do IDEB, basta atualizar a planilha e rodar a
+conversão: partições cujo conteúdo não mudou não são regravadas.
+
+Uso: ``python -m analytics.ideb [--pasta PASTA] [--reconstruir]``
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import unicodedata
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from analytics import pipeline, validacao
+from analytics.caminhos import PASTA_DADOS
+
+PASTA_IDEB = PASTA_DADOS / 'ideb'
+ARQUIVO_IDEB = 'ideb.feather'
+ARQUIVO_CATALOGO = 'catalogo.feather'
+
+PLANILHAS = {
+    'escolas': PASTA_DADOS / 'ideb_saeb_por_escola.xlsx',
+    'municipios': PASTA_DADOS / 'ideb_saeb_por_municipio.xlsx',
+}
+
+COLUNAS_NOTAS = ['saeb_matematica', 'saeb_portugues', 'saeb_nota_media', 'ideb']
+COLUNAS = {
+    'escolas': ['ano', 'ciclo', 'uf', 'nome_municipio', 'nome_escola', 'rede'] + COLUNAS_NOTAS,
+    'municipios': ['ano', 'ciclo', 'uf', 'nome_municipio', 'rede'] + COLUNAS_NOTAS,
+}
+
+SENTINELAS_INEP = ['-', 'ND']
+ESQUEMA_IDEB = {
+    # O IDEB começou a ser calculado em 2005
+    'ano': validacao.Coluna('inteiro', 2005, obrigatoria=True),
+    'ciclo': validacao.Coluna(categorias=['AI', 'AF', 'EM'], obrigatoria=True),
+    'uf': validacao.Coluna(padrao=r'[A-Z]{2}', obrigatoria=True),
+    'nome_municipio': validacao.Coluna(obrigatoria=True),
+    'saeb_matematica': validacao.Coluna('numero', 0, 500),
+    'saeb_portugues': validacao.Coluna('numero', 0, 500),
+    'saeb_nota_media': validacao.Coluna('numero', 0, 10),
+    'ideb': validacao.Coluna('numero', 0, 10),
+}
+
+
+def chave_municipio(nome):
+    """Nome do município sem acentos e em minúsculas, usado no nome da pasta (``Embu-Guaçu`` -> ``embu-guacu``)."""
+    sem_acentos = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', sem_acentos.lower()).strip('-')
+
+
+def caminho_particao(tabela, uf, municipio, ano, pasta=PASTA_IDEB):
+    return os.path.join(pasta, tabela, f'UF={uf}', f'MUNICIPIO={chave_municipio(municipio)}', f'ANO={ano}')
+
+
+def validar_planilha(origem):
+    """Planilha validada com ``ESQUEMA_IDEB``: a tabela limpa e tipada, a quarentena e o relatório de qualidade."""
+    df, quarentena, relatorio = validacao.validar(pd.read_excel(origem), ESQUEMA_IDEB, SENTINELAS_INEP,
+                                                  identificacao=['ano', 'ciclo', 'uf', 'nome_municipio'])
+    df['ano'] = df['ano'].astype('int64')
+    return df, quarentena, relatorio
+
+
+def ler_planilha(origem):
+    return validar_planilha(origem)[0]
+
+
+def _hash_gravado(caminho):
+    if not os.path.exists(caminho):
+        return None
+    metadados = feather.read_table(caminho, memory_map=True).schema.metadata or {}
+    return metadados.get(pipeline.CHAVE_HASH)
+
+
+def converter(tabela, origem=None, pasta=PASTA_IDEB, reconstruir=False):
+    """Converte a planilha de ``tabela`` em partições; devolve as partições gravadas.
+
+    Partições de municípios ou anos que não estão na planilha são mantidas,
+    exceto com ``reconstruir``, que apaga a tabela convertida antes.
+    """
+    origem = origem or PLANILHAS[tabela]
+    pasta_tabela = os.path.join(pasta, tabela)
+    if reconstruir and os.path.isdir(pasta_tabela):
+        shutil.rmtree(pasta_tabela)
+
+    df, quarentena, relatorio = validar_planilha(origem)
+    os.makedirs(pasta_tabela, exist_ok=True)
+    pipeline.gravar_feather(quarentena, os.path.join(pasta_tabela, pipeline.ARQUIVO_QUARENTENA))
+    pipeline.gravar_feather(relatorio, os.path.join(pasta_tabela, pipeline.ARQUIVO_QUALIDADE))
+
+    df = df[COLUNAS[tabela]]
+    gravadas = []
+    for (uf, municipio, ano), df_particao in df.groupby(['uf', 'nome_municipio', 'ano'], sort=True):
+        # O hash é do conteúdo da partição: uma planilha nova só regrava os municípios e anos que mudaram
+        conteudo = pd.util.hash_pandas_object(df_particao, index=False).to_numpy().tobytes()
+        digest = hashlib.sha256(conteudo).hexdigest().encode()
+        pasta_particao = caminho_particao(tabela, uf, municipio, ano, pasta)
+        destino = os.path.join(pasta_particao, ARQUIVO_IDEB)
+        if _hash_gravado(destino) == digest:
+            continue
+        os.makedirs(pasta_particao, exist_ok=True)
+        pipeline.gravar_feather(df_particao.reset_index(drop=True), destino, {pipeline.CHAVE_HASH: digest})
+        gravadas.append(pasta_particao)
+
+    gravar_catalogo(tabela, pasta)
+    return gravadas
+
+
+def gravar_catalogo(tabela, pasta=PASTA_IDEB):
+    """Grava a lista de UFs, municípios e anos convertidos, usada pelos seletores sem abrir as partições."""
+    linhas = []
+    for caminho in particoes(tabela, pasta=pasta):
+        particao = feather.read_table(caminho, columns=['uf', 'nome_municipio', 'ano'], memory_map=True).slice(0, 1)
+        linhas.append(particao.to_pandas())
+    catalogo = pd.concat(linhas, ignore_index=True).sort_values(['uf', 'nome_municipio', 'ano'], ignore_index=True)
+    return pipeline.gravar_feather(catalogo, os.path.join(pasta, tabela, ARQUIVO_CATALOGO))
+
+
+def caminho_catalogo(tabela, pasta=PASTA_IDEB):
+    return os.path.join(pasta, tabela, ARQUIVO_CATALOGO)
+
+
+def ler_catalogo(tabela, pasta=PASTA_IDEB):
+    return feather.read_table(caminho_catalogo(tabela, pasta), memory_map=True).to_pandas()
+
+
+def particoes(tabela, municipio=None, uf=None, anos=None, pasta=PASTA_IDEB):
+    """Arquivos das partições de ``tabela`` que atendem ao município, à UF e aos anos (``None`` = todos)."""
+    padrao_uf = f'UF={uf}' if uf else 'UF=*'
+    padrao_municipio = f'MUNICIPIO={chave_municipio(municipio)}' if municipio else 'MUNICIPIO=*'
+    caminhos = sorted(Path(pasta, tabela).glob(f'{padrao_uf}/{padrao_municipio}/ANO=*/{ARQUIVO_IDEB}'))
+    if anos is not None:
+        anos = {int(ano) for ano in anos}
+        caminhos = [caminho for caminho in caminhos if int(caminho.parent.name.split('=')[1]) in anos]
+    return [str(caminho) for caminho in caminhos]
+
+
+def ler(tabela, caminhos, ciclos=None):
+    """Concatena as partições, mantendo apenas os ``ciclos`` pedidos (``None`` = todos)."""
+    tabelas = [feather.read_table(caminho, memory_map=True) for caminho in caminhos]
+    if not tabelas:
+        return pd.DataFrame({coluna: pd.Series(dtype='float64' if coluna in COLUNAS_NOTAS else 'object') for coluna in COLUNAS[tabela]}).astype({'ano': 'int64'})
+    tabela_arrow = pa.concat_tables(tabelas)
+    if ciclos is not None:
+        tabela_arrow = tabela_arrow.filter(pc.is_in(tabela_arrow['ciclo'], value_set=pa.array(list(ciclos), type=pa.string())))
+    return tabela_arrow.to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Converte as planilhas do IDEB/SAEB em partições por UF, município e ano.')
+    parser.add_argument('--escolas', default=PLANILHAS['escolas'], help='planilha do IDEB/SAEB por escola')
+    parser.add_argument('--municipios', default=PLANILHAS['municipios'], help='planilha do IDEB/SAEB por município')
+    parser.add_argument('--pasta', default=PASTA_IDEB, help='pasta das partições convertidas')
+    parser.add_argument('--reconstruir', action='store_true', help='apaga e regrava todas as partições')
+    args = parser.parse_args(argv)
+
+    for tabela, origem in (('escolas', args.escolas), ('municipios', args.municipios)):
+        gravadas = converter(tabela, origem, args.pasta, args.reconstruir)
+        print(f'{tabela}: {len(gravadas)} partições gravadas em {os.path.join(args.pasta, tabela)}')
+        quarentena = pd.read_feather(os.path.join(args.pasta, tabela, pipeline.ARQUIVO_QUARENTENA))
+        relatorio = pd.read_feather(os.path.join(args.pasta, tabela, pipeline.ARQUIVO_QUALIDADE))
+        print(f'  {len(quarentena)} linhas em quarentena')
+        if len(relatorio):
+            print(relatorio.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Leitura do armazenamento particionado da tabela longa de alunos.
+
+As partições são produzidas offline por ``python -m analytics.pipeline`` (uma
+por ``ANO``) e lidas pelo dashboard via memory map; nenhuma leitura dispara
+a ingestão. Os cubos de agregados de cada partição são
+aditivos e basta concatená-los (ver ``analytics.cubo``).
+"""
+
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from analytics import pipeline
+
+
+def exigir_particoes(pasta=pipeline.PASTA_PARTICOES):
+    """Anos com partição gravada; sem nenhuma, orienta a rodar a ingestão pela linha de comando."""
+    anos = pipeline.anos_particionados(pasta)
+    if not anos:
+        raise FileNotFoundError(f'Nenhuma partição em {pasta}; gere-as com python -m analytics.pipeline.')
+    return anos
+
+
+def arquivos_particoes(nome_arquivo, pasta=pipeline.PASTA_PARTICOES, anos=None):
+    anos = pipeline.anos_particionados(pasta) if anos is None else anos
+    return [os.path.join(pipeline.caminho_particao(ano, pasta), nome_arquivo) for ano in anos]
+
+
+def ler_particoes(caminhos):
+    tabelas = [feather.read_table(caminho, memory_map=True).to_pandas() for caminho in caminhos]
+    return pd.concat(tabelas, ignore_index=True)
+
+
+def ler_qualidade(pasta=pipeline.PASTA_PARTICOES):
+    """Relatório de qualidade e quarentena de todas as partições (ver ``analytics.validacao``), concatenados."""
+    def ler(nome_arquivo):
+        caminhos = [caminho for caminho in arquivos_particoes(nome_arquivo, pasta) if os.path.exists(caminho)]
+        return ler_particoes(caminhos) if caminhos else pd.DataFrame()
+
+    return ler(pipeline.ARQUIVO_QUALIDADE), ler(pipeline.ARQUIVO_QUARENTENA)
@@ -0,0 +1,235 @@
+"""Tempo de execução das seções do dashboard e das etapas dentro delas.
+
+Cada rerun executa apenas a seção ativa; ``medir`` cronometra o bloco e
+guarda as últimas ``MAX_MEDICOES`` medições de cada seção na memória do
+processo, compartilhadas entre as sessões.
+
+Dentro de uma seção, as etapas caras reportam-se com ``etapa`` (ou
+``registrar``). Isso inclui as leituras de arquivos e a construção dos
+índices (``analytics.dados``), a limpeza e a tipagem na ingestão
+(``analytics.pipeline``), o ajuste dos modelos (``analytics.previsao``), a
+construção das figuras e a serialização no ``st.plotly_chart``
+(``analytics.figuras``). Cada etapa registra a duração, o número de linhas
+quando faz sentido e a variação do RSS do processo.
+
+As etapas ficam associadas ao rerun em andamento na thread (cada sessão do
+Streamlit executa o script na sua própria thread). Os últimos
+``MAX_EXECUCOES`` reruns ficam guardados com a sessão, a seção e as suas
+etapas. Os resumos podem ser filtrados por sessão e exportados em JSON ou
+no formato texto do Prometheus.
+
+Além das últimas medições, cada seção e cada etapa acumula a soma dos
+tempos e o número de execuções desde o início do processo (ou o último
+``limpar``). São esses totais que saem como ``_sum`` e ``_count`` no
+Prometheus, que espera contadores que só crescem; as filas com as últimas
+medições servem apenas para os quantis.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import psutil
+
+MAX_MEDICOES = 50
+MAX_EXECUCOES = 200
+
+_lock = threading.Lock()
+_medicoes = defaultdict(lambda: deque(maxlen=MAX_MEDICOES))
+_etapas = defaultdict(lambda: deque(maxlen=MAX_MEDICOES))
+_execucoes = deque(maxlen=MAX_EXECUCOES)
+# Soma (ms) e contagem acumuladas de cada seção e etapa
+_totais_secoes = defaultdict(lambda: [0.0, 0])
+_totais_etapas = defaultdict(lambda: [0.0, 0])
+_local = threading.local()
+_processo = psutil.Process()
+
+COLUNAS_ETAPAS = ['execucoes', 'ultima_ms', 'media_ms', 'p95_ms', 'max_ms', 'linhas', 'memoria_mb']
+
+
+def _rss_mb():
+    return _processo.memory_info().rss / 2 ** 20
+
+
+def _acumular(totais, duracao_ms):
+    totais[0] += duracao_ms
+    totais[1] += 1
+
+
+@contextmanager
+def medir(secao, sessao=None):
+    """Registra o tempo (ms) do bloco para ``secao``, mesmo que ele seja interrompido, com as etapas executadas nele."""
+    execucao = {'sessao': sessao, 'secao': secao, 'inicio': time.time(), 'etapas': []}
+    _local.execucao, _local.nivel = execucao, 0
+    memoria_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    try:
+        yield execucao
+    finally:
+        decorrido = (time.perf_counter() - inicio) * 1000
+        execucao.update(duracao_ms=decorrido, memoria_mb=_rss_mb() - memoria_inicial)
+        _local.execucao = None
+        with _lock:
+            _medicoes[secao].append(decorrido)
+            _acumular(_totais_secoes[secao], decorrido)
+            _execucoes.append(execucao)
+
+
+@contextmanager
+def etapa(nome, linhas=None):
+    """Registra a duração (ms) e a variação do RSS (MB) do bloco; o número de linhas pode ser definido dentro dele.
+
+    ``with etapa('leitura') as registro: ...; registro['linhas'] = len(df)``
+    """
+    nivel = getattr(_local, 'nivel', 0)
+    registro = {'etapa': nome, 'nivel': nivel, 'linhas': linhas}
+    execucao = getattr(_local, 'execucao', None)
+    if execucao is not None:
+        # Entra no rerun ao começar, para que as etapas internas fiquem abaixo dela
+        with _lock:
+            execucao['etapas'].append(registro)
+    _local.nivel = nivel + 1
+    memoria_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro.update(duracao_ms=(time.perf_counter() - inicio) * 1000, memoria_mb=_rss_mb() - memoria_inicial)
+        _local.nivel = nivel
+        with _lock:
+            _etapas[nome].append(registro)
+            _acumular(_totais_etapas[nome], registro['duracao_ms'])
+
+
+def registrar(nome, funcao, linhas=None):
+    """Executa ``funcao`` como uma etapa; o número de linhas é o tamanho do resultado, se for uma tabela ou um array."""
+    with etapa(nome, linhas) as registro:
+        resultado = funcao()
+        if linhas is None and isinstance(resultado, (pd.DataFrame, pd.Series, np.ndarray)):
+            registro['linhas'] = len(resultado)
+    return resultado
+
+
+def resumo():
+    """Execuções, último tempo, média, p95 e máximo (ms) de cada seção medida."""
+    with _lock:
+        medicoes = {secao: np.array(tempos) for secao, tempos in _medicoes.items()}
+    linhas = {
+        secao: {
+            'execucoes': len(tempos),
+            'ultima_ms': tempos[-1],
+            'media_ms': tempos.mean(),
+            'p95_ms': np.percentile(tempos, 95),
+            'max_ms': tempos.max(),
+        }
+        for secao, tempos in medicoes.items()
+    }
+    return pd.DataFrame.from_dict(linhas, orient='index', columns=['execucoes', 'ultima_ms', 'media_ms', 'p95_ms', 'max_ms'])
+
+
+def _registros_etapas(sessao=None):
+    with _lock:
+        if sessao is None:
+            return {nome: list(registros) for nome, registros in _etapas.items()}
+        registros = defaultdict(list)
+        for execucao in _execucoes:
+            if execucao['sessao'] == sessao:
+                for registro in execucao['etapas']:
+                    registros[registro['etapa']].append(registro)
+        return registros
+
+
+def resumo_etapas(sessao=None):
+    """Por etapa: execuções, último tempo, média, p95 e máximo (ms), linhas da última execução e variação média do RSS (MB).
+
+    Sem ``sessao``, considera as últimas medições de cada etapa no processo; com ela, apenas os reruns guardados da sessão.
+    """
+    linhas = {}
+    for nome, registros in _registros_etapas(sessao).items():
+        tempos = np.array([registro['duracao_ms'] for registro in registros])
+        linhas[nome] = {
+            'execucoes': len(tempos),
+            'ultima_ms': tempos[-1],
+            'media_ms': tempos.mean(),
+            'p95_ms': np.percentile(tempos, 95),
+            'max_ms': tempos.max(),
+            'linhas': registros[-1]['linhas'],
+            'memoria_mb': np.mean([registro['memoria_mb'] for registro in registros]),
+        }
+    resultado = pd.DataFrame.from_dict(linhas, orient='index', columns=COLUNAS_ETAPAS)
+    return resultado.sort_values('media_ms', ascending=False)
+
+
+def ultima_execucao(sessao=None):
+    """O último rerun registrado (da ``sessao``, se informada), ou ``None``."""
+    with _lock:
+        for execucao in reversed(_execucoes):
+            if sessao is None or execucao['sessao'] == sessao:
+                return execucao
+    return None
+
+
+def etapas_execucao(execucao):
+    """Etapas de um rerun na ordem em que começaram, com o nome recuado pelo nível de aninhamento."""
+    etapas = pd.DataFrame(execucao['etapas'], columns=['etapa', 'nivel', 'duracao_ms', 'linhas', 'memoria_mb'])
+    etapas['etapa'] = ['  ' * nivel + nome for nome, nivel in zip(etapas['etapa'], etapas['nivel'])]
+    return etapas.drop(columns='nivel')
+
+
+def exportar_json(sessao=None):
+    """Resumo das seções, das etapas e dos reruns guardados, em JSON."""
+    with _lock:
+        execucoes = [execucao for execucao in _execucoes if sessao is None or execucao['sessao'] == sessao]
+    conteudo = {
+        'gerado_em': time.time(),
+        'secoes': resumo().to_dict(orient='index'),
+        'etapas': resumo_etapas(sessao).to_dict(orient='index'),
+        'execucoes': execucoes,
+    }
+    return json.dumps(conteudo, ensure_ascii=False, indent=2, default=float)
+
+
+def _rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exportar_prometheus():
+    """Métricas das seções e etapas no formato texto do Prometheus.
+
+    Resumos com o quantil 0,95 das últimas execuções e a soma e a contagem acumuladas no processo.
+    """
+    with _lock:
+        series = {
+            'dashboard_secao_segundos': ('secao', 'Duração das execuções de cada seção do dashboard.',
+                                         {secao: (list(tempos), tuple(_totais_secoes[secao])) for secao, tempos in _medicoes.items()}),
+            'dashboard_etapa_segundos': ('etapa', 'Duração das execuções de cada etapa do dashboard.',
+                                         {nome: ([registro['duracao_ms'] for registro in registros], tuple(_totais_etapas[nome]))
+                                          for nome, registros in _etapas.items()}),
+        }
+        linhas_etapas = {nome: registros[-1]['linhas'] for nome, registros in _etapas.items() if registros[-1]['linhas'] is not None}
+
+    saida = []
+    for metrica, (rotulo, descricao, tempos_por_nome) in series.items():
+        saida += [f'# HELP {metrica} {descricao}', f'# TYPE {metrica} summary']
+        for nome, (tempos, (soma_ms, contagem)) in tempos_por_nome.items():
+            rotulos = f'{rotulo}="{_rotulo(nome)}"'
+            saida += [f'{metrica}{{{rotulos},quantile="0.95"}} {np.percentile(np.array(tempos) / 1000, 95):.6f}',
+                      f'{metrica}_sum{{{rotulos}}} {soma_ms / 1000:.6f}',
+                      f'{metrica}_count{{{rotulos}}} {contagem}']
+    saida += ['# HELP dashboard_etapa_linhas Linhas processadas na última execução de cada etapa.',
+              '# TYPE dashboard_etapa_linhas gauge']
+    saida += [f'dashboard_etapa_linhas{{etapa="{_rotulo(nome)}"}} {linhas}' for nome, linhas in linhas_etapas.items()]
+    return '\n'.join(saida) + '\n'
+
+
+def limpar():
+    with _lock:
+        _medicoes.clear()
+        _etapas.clear()
+        _execucoes.clear()
+        _totais_secoes.clear()
+        _totais_etapas.clear()
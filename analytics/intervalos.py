@@ -0,0 +1,228 @@
+"""Intervalos de previsão por bootstrap dos resíduos, para os métodos de ``analytics.previsao``.
+
+Cada método é ajustado à série e os seus resíduos (centrados) são
+reamostrados com reposição. Uma série sintética é montada como ajuste +
+resíduos sorteados, o método é reajustado a ela e cada ano futuro recebe um
+resíduo sorteado. Os limites do intervalo são os quantis das trajetórias
+simuladas.
+
+- Média, Naive e Regressão Linear têm forma fechada. As ``REAMOSTRAGENS``
+  trajetórias são calculadas de uma vez, como matrizes NumPy (reamostragem x
+  ano), sem laço em Python. No Naive, os resíduos são as diferenças entre
+  anos e a trajetória é um passeio aleatório a partir do último valor.
+- Random Forest e Suavização Exponencial precisam ser reajustados a cada
+  reamostragem. As ``REAMOSTRAGENS_MODELOS`` reamostragens são divididas em
+  lotes executados em processos separados (``analytics.paralelo``). No Random Forest, os resíduos são
+  os erros fora da amostra (out-of-bag), porque os erros dentro da amostra
+  são quase nulos, e cada reamostragem é reajustada com
+  ``ARVORES_REAMOSTRAGEM`` árvores: o que importa é a dispersão entre as
+  reamostragens, e uma floresta menor custa uma fração do tempo. Na
+  Suavização Exponencial, o nível simulado é atualizado a cada ano futuro.
+
+Como a série é de alunos, as trajetórias simuladas são limitadas a zero.
+
+Como o placar do backtesting, os intervalos são calculados apenas fora do
+dashboard, por ``calcular``: ``python -m analytics.intervalos`` (ou o
+pré-aquecimento de ``analytics.figuras``) os grava em ``.cache/intervalos``,
+por impressão digital da série, do horizonte, do nível e do código. O
+dashboard usa ``ler``, que só consulta o cache do processo e essa pasta e
+retorna ``None`` quando os intervalos não existem: nenhum pool de processos
+é iniciado durante a requisição.
+
+Uso: ``python -m analytics.intervalos [--horizonte N] [--processos N]``
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import instrumentacao, paralelo, previsao
+from analytics.cache import CacheLRU, gravar_atomico
+from analytics.caminhos import RAIZ
+
+NIVEL = 0.95
+REAMOSTRAGENS = 5000
+REAMOSTRAGENS_MODELOS = 100
+ARVORES_REAMOSTRAGEM = 20
+# Horizonte dos gráficos de previsão do dashboard
+HORIZONTE = 5
+PASTA_INTERVALOS = RAIZ / '.cache' / 'intervalos'
+
+METODOS_VETORIZADOS = ('media_movel', 'regressao_linear', 'naive')
+METODOS_REAJUSTADOS = ('random_forest', 'suavizacao_exponencial')
+
+_cache = CacheLRU(max_itens=16)
+
+
+def _sortear(rng, residuos, forma):
+    return residuos[rng.integers(0, len(residuos), size=forma)]
+
+
+def _centrar(residuos):
+    return residuos - residuos.mean()
+
+
+def _simular_vetorizado(metodo, anos, valores, anos_futuros, rng, quantidade):
+    """Trajetórias futuras simuladas (reamostragem x ano) de um método em forma fechada."""
+    horizonte = len(anos_futuros)
+    if metodo == 'naive':
+        passos = _sortear(rng, _centrar(np.diff(valores)), (quantidade, horizonte))
+        return valores[-1] + passos.cumsum(axis=1)
+
+    if metodo == 'media_movel':
+        ajustados = np.full(len(valores), valores.mean())
+        simuladas = ajustados + _sortear(rng, _centrar(valores - ajustados), (quantidade, len(valores)))
+        nivel = simuladas.mean(axis=1)
+        return nivel[:, np.newaxis] + _sortear(rng, _centrar(valores - ajustados), (quantidade, horizonte))
+
+    # Regressão linear: os mínimos quadrados de todas as reamostragens em uma operação
+    inclinacao, intercepto = previsao.ajustar(pd.Series(valores, index=anos.astype('int64')), 'regressao_linear')
+    ajustados = inclinacao * anos + intercepto
+    residuos = _centrar(valores - ajustados)
+    simuladas = ajustados + _sortear(rng, residuos, (quantidade, len(valores)))
+    x = anos - anos.mean()
+    inclinacoes = (simuladas - simuladas.mean(axis=1, keepdims=True)) @ x / (x ** 2).sum()
+    interceptos = simuladas.mean(axis=1) - inclinacoes * anos.mean()
+    return inclinacoes[:, np.newaxis] * anos_futuros + interceptos[:, np.newaxis] + _sortear(rng, residuos, (quantidade, horizonte))
+
+
+def _simular_lote(metodo, anos, valores, anos_futuros, semente, quantidade):
+    """Trajetórias futuras simuladas reajustando ``metodo`` a cada reamostragem (executado nos processos do pool)."""
+    rng = np.random.default_rng(semente)
+    trajetorias = np.empty((quantidade, len(anos_futuros)))
+
+    if metodo == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+
+        x = anos.reshape(-1, 1)
+        modelo = RandomForestRegressor(random_state=previsao.SEMENTE, oob_score=True).fit(x, valores)
+        ajustados = modelo.predict(x)
+        residuos = _centrar(valores - modelo.oob_prediction_)
+        for i in range(quantidade):
+            simulada = ajustados + _sortear(rng, residuos, len(valores))
+            reajuste = RandomForestRegressor(n_estimators=ARVORES_REAMOSTRAGEM, random_state=previsao.SEMENTE).fit(x, simulada)
+            trajetorias[i] = reajuste.predict(anos_futuros.reshape(-1, 1)) + _sortear(rng, residuos, len(anos_futuros))
+        return trajetorias
+
+    from statsmodels.tsa.holtwinters import SimpleExpSmoothing
+
+    ajuste = SimpleExpSmoothing(valores).fit()
+    ajustados = ajuste.fittedvalues
+    # O primeiro valor ajustado é a própria observação; os erros de previsão começam no segundo ano
+    residuos = _centrar((valores - ajustados)[1:])
+    for i in range(quantidade):
+        reajuste = SimpleExpSmoothing(ajustados + _sortear(rng, residuos, len(valores))).fit()
+        alfa, nivel = reajuste.params['smoothing_level'], reajuste.forecast(1)[0]
+        for h, erro in enumerate(_sortear(rng, residuos, len(anos_futuros))):
+            trajetorias[i, h] = nivel + erro
+            nivel += alfa * erro
+    return trajetorias
+
+
+def _simular_reajustados(metodos, anos, valores, anos_futuros, processos):
+    """Trajetórias de cada método reajustado, com as reamostragens divididas em lotes entre ``processos``."""
+    sementes = np.random.SeedSequence(previsao.SEMENTE).spawn(len(metodos) * processos)
+    tamanhos = np.diff(np.linspace(0, REAMOSTRAGENS_MODELOS, processos + 1).astype(int))
+    lotes = [(metodo, anos, valores, anos_futuros, sementes[i * processos + j], tamanho)
+             for i, metodo in enumerate(metodos) for j, tamanho in enumerate(tamanhos)]
+    resultados = paralelo.mapear(_simular_lote, lotes, processos)
+    return {metodo: np.vstack(resultados[i * processos:(i + 1) * processos]) for i, metodo in enumerate(metodos)}
+
+
+def _limites(trajetorias, nivel):
+    quantis = [(1 - nivel) / 2, 1 - (1 - nivel) / 2]
+    return np.quantile(np.maximum(trajetorias, 0), quantis, axis=0).T
+
+
+def _tabela(limites, anos_futuros, nome_indice):
+    """Limites no formato de ``ler``: anos futuros no índice e colunas ``(metodo, 'inferior')`` e ``(metodo, 'superior')``."""
+    return pd.DataFrame(np.hstack(list(limites.values())), index=pd.Index(np.asarray(anos_futuros, dtype='int64'), name=nome_indice),
+                        columns=pd.MultiIndex.from_product([list(limites), ['inferior', 'superior']]))
+
+
+def _chave(serie, horizonte, nivel):
+    digest = hashlib.sha256(previsao.impressao_digital(serie).encode())
+    digest.update(repr((horizonte, nivel)).encode())
+    # Uma mudança nos métodos ou nas simulações invalida os intervalos gravados
+    for caminho in (previsao.__file__, __file__):
+        with open(caminho, 'rb') as arquivo:
+            digest.update(arquivo.read())
+    return digest.hexdigest()
+
+
+def _ler_arquivo(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        conteudo = json.load(arquivo)
+    limites = {metodo: np.array(valores, dtype='float64') for metodo, valores in conteudo['limites'].items()}
+    return _tabela(limites, conteudo['anos'], conteudo['indice'])
+
+
+def ler(serie, horizonte=HORIZONTE, nivel=NIVEL, pasta=PASTA_INTERVALOS):
+    """Intervalos já calculados de todos os métodos (ver ``calcular``), do cache do processo ou de ``pasta``; ``None`` se não existem."""
+    chave = _chave(serie, horizonte, nivel)
+    resultado = _cache.consultar(chave)
+    caminho = None if pasta is None else os.path.join(pasta, f'{chave}.json')
+    if resultado is None and caminho is not None and os.path.exists(caminho):
+        resultado = _cache.obter(chave, lambda: instrumentacao.registrar('intervalos (disco)', lambda: _ler_arquivo(caminho)))
+    return resultado
+
+
+def calcular(serie, horizonte=HORIZONTE, nivel=NIVEL, processos=None, pasta=PASTA_INTERVALOS):
+    """Limites inferior e superior do intervalo de previsão de cada método nos ``horizonte`` anos após o último, fora do dashboard.
+
+    O resultado tem os anos futuros no índice e colunas ``(metodo, 'inferior')``
+    e ``(metodo, 'superior')``. Ele fica no cache do processo e, se ``pasta``
+    existir, é gravado nela para ``ler``.
+    """
+    anos = serie.index.to_numpy(dtype='float64')
+    valores = serie.to_numpy(dtype='float64')
+    anos_futuros = np.arange(serie.index[-1] + 1, serie.index[-1] + horizonte + 1, dtype='float64')
+
+    processos = processos or paralelo.processos_padrao()
+    with instrumentacao.etapa(f'intervalos: {", ".join(METODOS_REAJUSTADOS)}', linhas=REAMOSTRAGENS_MODELOS * len(METODOS_REAJUSTADOS)):
+        reajustadas = _simular_reajustados(METODOS_REAJUSTADOS, anos, valores, anos_futuros, processos)
+
+    limites = {}
+    for metodo in previsao.METODOS:
+        if metodo in reajustadas:
+            trajetorias = reajustadas[metodo]
+        else:
+            rng = np.random.default_rng(previsao.SEMENTE)
+            trajetorias = instrumentacao.registrar(f'intervalos: {metodo}',
+                                                   lambda: _simular_vetorizado(metodo, anos, valores, anos_futuros, rng, REAMOSTRAGENS))
+        limites[metodo] = _limites(trajetorias, nivel)
+
+    resultado = _tabela(limites, anos_futuros, serie.index.name)
+    if pasta is not None and os.path.isdir(pasta):
+        conteudo = {'indice': serie.index.name, 'anos': anos_futuros.astype('int64').tolist(),
+                    'limites': {metodo: valores_limites.tolist() for metodo, valores_limites in limites.items()}}
+        gravar_atomico(os.path.join(pasta, f'{_chave(serie, horizonte, nivel)}.json'), json.dumps(conteudo).encode('utf-8'))
+    return _cache.obter(_chave(serie, horizonte, nivel), lambda: resultado)
+
+
+def limpar_cache():
+    _cache.limpar()
+
+
+def main(argv=None):
+    from analytics import dados
+
+    parser = argparse.ArgumentParser(description='Calcula os intervalos de previsão da série de alunos e os grava para o dashboard.')
+    parser.add_argument('--horizonte', type=int, default=HORIZONTE, help='anos previstos após o último ano observado')
+    parser.add_argument('--processos', type=int, help=f'processos do pool (padrão: CPUs, até {paralelo.MAX_PROCESSOS})')
+    args = parser.parse_args(argv)
+
+    serie = dados.carregar_dados_gerais().set_index('Ano')['Alunos']
+    os.makedirs(PASTA_INTERVALOS, exist_ok=True)
+    resultado = calcular(serie, args.horizonte, processos=args.processos)
+    with pd.option_context('display.float_format', '{:.0f}'.format):
+        print(resultado.rename(columns=previsao.METODOS, level=0).T)
+    print(f'\nIntervalos de {NIVEL:.0%} gravados em {PASTA_INTERVALOS}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""Execução de lotes de trabalho em um pool de processos.
+
+Os processos são criados com ``spawn``: o processo do Streamlit tem várias
+threads e não deve ser duplicado com ``fork``. Com um único processo, os
+lotes são executados no próprio processo, sem o custo de iniciar o pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+MAX_PROCESSOS = 4
+
+
+def processos_padrao():
+    return min(os.cpu_count() or 1, MAX_PROCESSOS)
+
+
+def mapear(funcao, lotes, processos=None):
+    """``[funcao(*lote) for lote in lotes]``, com os lotes distribuídos entre ``processos`` processos.
+
+    ``funcao`` precisa ser definida no nível de um módulo, para que os processos a encontrem.
+    """
+    processos = processos or processos_padrao()
+    if processos == 1 or len(lotes) <= 1:
+        return [funcao(*lote) for lote in lotes]
+    with ProcessPoolExecutor(max_workers=processos, mp_context=get_context('spawn')) as pool:
+        return list(pool.map(funcao, *zip(*lotes)))
@@ -0,0 +1,274 @@
+"""Pipeline que monta a tabela longa de alunos a partir do PEDE.
+
+O arquivo ``PEDE_PASSOS_DATASET_FIAP.csv`` tem uma linha por aluno e um bloco
+de colunas ``<VARIAVEL>_<ANO>`` por ciclo de avaliação. O pipeline detecta os
+anos pelo sufixo das colunas, empilha os blocos em uma linha por ``ALUNO`` x
+``ANO``, aplica as regras de limpeza e grava o resultado tipado em uma
+partição por ano em ``dados/alunos/ANO=<ano>/``.
+
+A limpeza é declarativa: ``ESQUEMA_ALUNOS`` define o tipo, a faixa, as
+categorias e os valores sentinela de cada coluna, e ``analytics.validacao``
+o aplica na ingestão. As linhas com valores inválidos (como as do
+``ALUNO-1259``, preenchidas com os códigos do dicionário de dados, ou as com
+``#NULO!`` nos indicadores ou sem ``PONTO_VIRADA``) não vão para a tabela: ficam na quarentena da
+partição (``quarentena.feather``), com o motivo, e cada regra aplicada é
+contada no relatório de qualidade (``qualidade.feather``).
+
+O armazenamento é incremental: cada partição guarda o hash das colunas
+``NOME`` e ``*_<ano>`` do PEDE de que veio. Só os anos sem partição ou cujo
+hash mudou (por exemplo, uma reexportação corrigida do PEDE) são validados e
+gravados; as demais partições são mantidas. ``--reconstruir`` regrava todas.
+A ingestão roda apenas por esta linha de comando: o dashboard só lê as
+partições.
+Cada partição traz também o cubo de agregados daquele ano (ver
+``analytics.cubo``), usado pelas abas sem precisar reagrupar a tabela
+completa.
+
+Uso: ``python -m analytics.pipeline [--origem CSV] [--pasta PASTA] [--reconstruir] [--csv CSV_LONGO]``
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from analytics import instrumentacao, validacao
+from analytics.caminhos import PASTA_DADOS
+from analytics.cubo import INDICADORES, NOTAS, construir_cubo
+
+CAMINHO_PEDE = PASTA_DADOS / 'PEDE_PASSOS_DATASET_FIAP.csv'
+PASTA_PARTICOES = PASTA_DADOS / 'alunos'
+
+COLUNAS_OBRIGATORIAS = INDICADORES + ['PEDRA', 'PONTO_VIRADA']
+
+SENTINELAS_PEDE = ['#NULO!']
+SIM_NAO = ['Sim', 'Não']
+ESQUEMA_ALUNOS = {
+    'ALUNO': validacao.Coluna(padrao=r'ALUNO-\d+', obrigatoria=True),
+    # Indicadores de 0 a 10; o IAA e o IPV têm valores como 10.00002, ajustados para 10
+    **{indicador: validacao.Coluna('numero', 0, 10, obrigatoria=True, tolerancia=0.001) for indicador in INDICADORES},
+    **{nota: validacao.Coluna('numero', 0, 10) for nota in NOTAS},
+    'PEDRA': validacao.Coluna(categorias=['Quartzo', 'Ágata', 'Ametista', 'Topázio'], obrigatoria=True),
+    'PONTO_VIRADA': validacao.Coluna(categorias=SIM_NAO, obrigatoria=True),
+    'INDE_CONCEITO': validacao.Coluna(categorias=['A', 'B', 'C', 'D', 'E']),
+    'BOLSISTA': validacao.Coluna(categorias=SIM_NAO),
+    'INDICADO_BOLSA': validacao.Coluna(categorias=SIM_NAO),
+    'SINALIZADOR_INGRESSANTE': validacao.Coluna(categorias=['Ingressante', 'Veterano']),
+    'FASE_TURMA': validacao.Coluna(padrao=r'\d+[A-Z]+'),
+    'TURMA': validacao.Coluna(padrao=r'[A-Z]+'),
+    'NIVEL_IDEAL': validacao.Coluna(sentinelas=['ERRO']),
+    'FASE': validacao.Coluna('inteiro', 0, 8),
+    'IDADE_ALUNO': validacao.Coluna('inteiro', 0, 30),
+    'ANOS_PM': validacao.Coluna('inteiro', 0),
+    'DEFASAGEM': validacao.Coluna('inteiro'),
+    # A Passos Mágicos foi fundada em 1992
+    'ANO_INGRESSO': validacao.Coluna('inteiro', 1992),
+    'QTD_AVAL': validacao.Coluna('inteiro', 0),
+    'CG': validacao.Coluna('inteiro', 1),
+    'CF': validacao.Coluna('inteiro', 1),
+    'CT': validacao.Coluna('inteiro', 1),
+}
+
+ARQUIVO_ALUNOS = 'alunos.feather'
+ARQUIVO_CUBO = 'cubo.feather'
+ARQUIVO_QUARENTENA = 'quarentena.feather'
+ARQUIVO_QUALIDADE = 'qualidade.feather'
+CHAVE_HASH = b'fonte_sha256'
+
+_PADRAO_COLUNA_ANO = re.compile(r'^(?P<variavel>.+)_(?P<ano>\d{4})$')
+
+
+def hash_arquivo(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()
+
+
+def _colunas_por_ano(colunas):
+    colunas = {coluna: _PADRAO_COLUNA_ANO.match(coluna) for coluna in colunas}
+    return {coluna: (m['variavel'], int(m['ano'])) for coluna, m in colunas.items() if m}
+
+
+def ler_pede(origem=CAMINHO_PEDE, anos=None):
+    """Lê o PEDE como texto; com ``anos``, apenas ``NOME`` e as colunas desses anos."""
+    def usar_coluna(coluna):
+        if anos is None or coluna == 'NOME':
+            return True
+        m = _PADRAO_COLUNA_ANO.match(coluna)
+        return bool(m) and int(m['ano']) in anos
+
+    # Os tipos são definidos em limpar_alunos
+    return pd.read_csv(origem, delimiter=';', dtype=str, usecols=usar_coluna)
+
+
+def wide_para_longo(df):
+    """Empilha os blocos ``<VARIAVEL>_<ANO>`` em uma linha por aluno e ano.
+
+    Variáveis que não existem em algum ano aparecem como nulas nesse ano e
+    anos em que o aluno não tem nenhum dado são descartados.
+    """
+    colunas = _colunas_por_ano(df.columns)
+
+    largo = df.set_index('NOME')[list(colunas)]
+    largo.columns = pd.MultiIndex.from_tuples(colunas.values(), names=[None, 'ANO'])
+    longo = largo.stack('ANO', future_stack=True).dropna(how='all')
+
+    longo.index = longo.index.set_names(['ALUNO', 'ANO'])
+    return longo.reset_index()
+
+
+def validar_colunas(df, ano):
+    faltantes = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in df.columns]
+    if faltantes:
+        raise ValueError(f'O PEDE de {ano} não tem as colunas obrigatórias: {", ".join(faltantes)}')
+
+
+def validar_alunos(df):
+    """Valida a tabela longa de alunos com ``ESQUEMA_ALUNOS``; retorna a tabela limpa e tipada, a quarentena e o relatório."""
+    df, quarentena, relatorio = validacao.validar(df, ESQUEMA_ALUNOS, SENTINELAS_PEDE, identificacao=['ALUNO', 'ANO'])
+
+    # Em 2020 a fase só aparece junto da turma em FASE_TURMA (ex.: "2H" é a fase 2, turma H)
+    if 'FASE_TURMA' in df.columns:
+        fase_turma = pd.to_numeric(df['FASE_TURMA'].str.extract(r'^(\d+)', expand=False), errors='coerce')
+        df['FASE'] = df['FASE'].fillna(fase_turma) if 'FASE' in df.columns else fase_turma
+
+    # Criando uma coluna para conseguir ordenar os alunos de acordo com o número deles
+    numero_aluno = df['ALUNO'].str.split('-').str[1].astype('int32')
+    df.insert(1, 'NUMERO_ALUNO', numero_aluno)
+    df['ANO'] = df['ANO'].astype('int64')
+    return df.sort_values(['ANO', 'NUMERO_ALUNO']).reset_index(drop=True), quarentena, relatorio
+
+
+def limpar_alunos(df):
+    """Tabela longa de alunos limpa e tipada (as linhas inválidas ficam de fora; ver ``validar_alunos``)."""
+    return validar_alunos(df)[0]
+
+
+def construir_tabela_alunos(origem=CAMINHO_PEDE, anos=None):
+    return limpar_alunos(wide_para_longo(ler_pede(origem, anos)))
+
+
+def caminho_particao(ano, pasta=PASTA_PARTICOES):
+    return os.path.join(pasta, f'ANO={ano}')
+
+
+def anos_particionados(pasta=PASTA_PARTICOES):
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(int(nome.split('=', 1)[1]) for nome in os.listdir(pasta)
+                  if nome.startswith('ANO=') and os.path.exists(os.path.join(pasta, nome, ARQUIVO_ALUNOS)))
+
+
+def gravar_feather(df, destino, metadados=None):
+    """Grava o DataFrame como Arrow IPC sem compressão, de forma atômica."""
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    if metadados:
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), **metadados})
+
+    # Grava em um arquivo temporário e renomeia, para que sessões concorrentes nunca leiam um arquivo pela metade
+    descritor, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+    os.close(descritor)
+    try:
+        feather.write_feather(tabela, caminho_tmp, compression='uncompressed')
+        os.chmod(caminho_tmp, 0o644)
+        os.replace(caminho_tmp, destino)
+    finally:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+    return destino
+
+
+def gravar_particao(df_ano, ano, pasta=PASTA_PARTICOES, metadados=None, quarentena=None, relatorio=None):
+    pasta_ano = caminho_particao(ano, pasta)
+    os.makedirs(pasta_ano, exist_ok=True)
+    # O cubo, a quarentena e o relatório são gravados antes dos dados: a partição só passa a existir quando tudo está pronto
+    gravar_feather(construir_cubo(df_ano), os.path.join(pasta_ano, ARQUIVO_CUBO), metadados)
+    if quarentena is not None:
+        gravar_feather(quarentena, os.path.join(pasta_ano, ARQUIVO_QUARENTENA), metadados)
+    if relatorio is not None:
+        gravar_feather(relatorio, os.path.join(pasta_ano, ARQUIVO_QUALIDADE), metadados)
+    gravar_feather(df_ano, os.path.join(pasta_ano, ARQUIVO_ALUNOS), metadados)
+    return pasta_ano
+
+
+def _colunas_ano(colunas, anos):
+    return ['NOME'] + [coluna for coluna, (_, ano) in _colunas_por_ano(colunas).items() if ano in anos]
+
+
+def hash_fonte_ano(largo, ano):
+    """Hash das colunas ``NOME`` e ``*_<ano>`` do PEDE lido como texto: só muda quando os dados daquele ano mudam."""
+    return hashlib.sha256(largo[_colunas_ano(largo.columns, [ano])].to_csv(index=False).encode('utf-8')).hexdigest()
+
+
+def hash_particao(ano, pasta=PASTA_PARTICOES):
+    """Hash da fonte gravado na partição de ``ano``, ou ``None`` se ela não existe."""
+    caminho = os.path.join(caminho_particao(ano, pasta), ARQUIVO_ALUNOS)
+    if not os.path.exists(caminho):
+        return None
+    digest = (feather.read_table(caminho, memory_map=True).schema.metadata or {}).get(CHAVE_HASH)
+    return digest.decode() if digest else None
+
+
+def executar(origem=CAMINHO_PEDE, pasta=PASTA_PARTICOES, reconstruir=False):
+    """Ingere os anos do PEDE sem partição ou com dados alterados e retorna a lista de anos gravados."""
+    if reconstruir and os.path.isdir(pasta):
+        shutil.rmtree(pasta)
+
+    largo = instrumentacao.registrar('pipeline: leitura do PEDE', lambda: ler_pede(origem))
+    hashes = {ano: hash_fonte_ano(largo, ano) for ano in sorted({ano for _, ano in _colunas_por_ano(largo.columns).values()})}
+    # Anos novos e anos cujas colunas mudaram desde a gravação da partição
+    anos = [ano for ano, digest in hashes.items() if hash_particao(ano, pasta) != digest]
+    if not anos:
+        return []
+
+    longo = instrumentacao.registrar('pipeline: formato longo', lambda: wide_para_longo(largo[_colunas_ano(largo.columns, anos)]))
+    for ano, df_ano in longo.groupby('ANO'):
+        metadados = {CHAVE_HASH: hashes[ano].encode()}
+        # Colunas que não existem neste ano não entram na partição
+        df_ano = df_ano.dropna(axis=1, how='all')
+        validar_colunas(df_ano, ano)
+        with instrumentacao.etapa('pipeline: validação e tipos', linhas=len(df_ano)):
+            df_ano, quarentena, relatorio = validar_alunos(df_ano)
+            relatorio.insert(0, 'ANO', ano)
+        with instrumentacao.etapa('pipeline: cubo e gravação', linhas=len(df_ano)):
+            gravar_particao(df_ano, ano, pasta, metadados, quarentena, relatorio)
+    return anos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monta a tabela longa de alunos a partir do PEDE.')
+    parser.add_argument('--origem', default=CAMINHO_PEDE, help='CSV do PEDE no formato largo')
+    parser.add_argument('--pasta', default=PASTA_PARTICOES, help='pasta com as partições por ano')
+    parser.add_argument('--reconstruir', action='store_true', help='apaga e regrava todas as partições')
+    parser.add_argument('--csv', dest='destino_csv', help='também exporta a tabela longa completa em CSV')
+    args = parser.parse_args(argv)
+
+    anos = executar(args.origem, args.pasta, args.reconstruir)
+    if anos:
+        print(f'Partições gravadas em {args.pasta}: {", ".join(str(ano) for ano in anos)}')
+    else:
+        print('Nenhum ano novo ou alterado no PEDE; partições existentes mantidas.')
+
+    from analytics import ingestao
+
+    relatorio, quarentena = ingestao.ler_qualidade(args.pasta)
+    if len(relatorio):
+        print(f'\nRelatório de qualidade ({len(quarentena)} linhas em quarentena):')
+        print(relatorio.to_string(index=False))
+    if len(quarentena):
+        print('\nQuarentena:')
+        print(quarentena[['ANO', 'ALUNO', 'MOTIVOS']].to_string(index=False))
+
+    if args.destino_csv:
+        # Mesmo formato do dados.csv usado pelos notebooks
+        df = construir_tabela_alunos(args.origem).drop(columns='NUMERO_ALUNO')
+        df.to_csv(args.destino_csv, sep=';', index=False, encoding='iso-8859-1')
+
+
+if __name__ == '__main__':
+    main()
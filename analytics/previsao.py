@@ -0,0 +1,121 @@
+"""Previsões da série de alunos com cache por impressão digital dos dados.
+
+Cada método é ajustado uma única vez por série (identificada pelo hash dos
+anos e valores) e os parâmetros ajustados ficam em cache; as previsões de
+cada horizonte também. Média, Naive e Regressão Linear são calculadas em
+forma fechada com NumPy; Random Forest (com semente fixa, para que a curva
+não mude a cada rerun) e Suavização Exponencial usam scikit-learn e
+statsmodels, importados apenas quando esses métodos são pedidos.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from analytics import instrumentacao
+from analytics.cache import CacheLRU
+
+METODOS = {
+    'media_movel': 'Média Móvel Simples',
+    'regressao_linear': 'Regressão Linear Simples',
+    'naive': 'Método Naive',
+    'random_forest': 'Random Forest',
+    'suavizacao_exponencial': 'Suavização Exponencial Simples',
+}
+
+SEMENTE = 42
+
+_parametros = CacheLRU(max_itens=64)
+_previsoes = CacheLRU(max_itens=256)
+
+
+def impressao_digital(serie):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(serie.index.to_numpy(dtype='int64')).tobytes())
+    digest.update(np.ascontiguousarray(serie.to_numpy(dtype='float64')).tobytes())
+    return digest.hexdigest()
+
+
+def _ajustar_media(anos, valores):
+    return valores.mean()
+
+
+def _ajustar_naive(anos, valores):
+    return valores[-1]
+
+
+def _ajustar_regressao(anos, valores):
+    # Mínimos quadrados em forma fechada: inclinação = cov(x, y) / var(x)
+    x = anos - anos.mean()
+    inclinacao = (x * (valores - valores.mean())).sum() / (x ** 2).sum()
+    return inclinacao, valores.mean() - inclinacao * anos.mean()
+
+
+def _ajustar_random_forest(anos, valores):
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(random_state=SEMENTE).fit(anos.reshape(-1, 1), valores)
+
+
+def _ajustar_suavizacao(anos, valores):
+    from statsmodels.tsa.holtwinters import SimpleExpSmoothing
+
+    # A previsão da suavização exponencial simples é constante: o último nível ajustado
+    return SimpleExpSmoothing(valores).fit().forecast(1)[0]
+
+
+_AJUSTES = {
+    'media_movel': _ajustar_media,
+    'regressao_linear': _ajustar_regressao,
+    'naive': _ajustar_naive,
+    'random_forest': _ajustar_random_forest,
+    'suavizacao_exponencial': _ajustar_suavizacao,
+}
+
+_PREVISORES = {
+    'media_movel': lambda nivel, anos: np.full(len(anos), nivel, dtype='float64'),
+    'regressao_linear': lambda coeficientes, anos: coeficientes[0] * anos + coeficientes[1],
+    'naive': lambda nivel, anos: np.full(len(anos), nivel, dtype='float64'),
+    'random_forest': lambda modelo, anos: modelo.predict(anos.reshape(-1, 1)),
+    'suavizacao_exponencial': lambda nivel, anos: np.full(len(anos), nivel, dtype='float64'),
+}
+
+
+def ajustar(serie, metodo, digital=None):
+    """Parâmetros ajustados de ``metodo`` para ``serie`` (em cache)."""
+    digital = digital or impressao_digital(serie)
+    anos = serie.index.to_numpy(dtype='float64')
+    valores = serie.to_numpy(dtype='float64')
+    return _parametros.obter((digital, metodo), lambda: instrumentacao.registrar(f'ajuste: {metodo}', lambda: _AJUSTES[metodo](anos, valores),
+                                                                                  linhas=len(valores)))
+
+
+def ajustar_e_prever(serie, metodo, anos):
+    """Ajusta ``metodo`` a ``serie`` e prevê os ``anos``, sem passar pelos caches (usado no backtesting, com uma série por dobra)."""
+    anos_serie = serie.index.to_numpy(dtype='float64')
+    parametros = _AJUSTES[metodo](anos_serie, serie.to_numpy(dtype='float64'))
+    return _PREVISORES[metodo](parametros, np.asarray(anos, dtype='float64'))
+
+
+def forecast(serie, horizonte, metodos=tuple(METODOS)):
+    """Previsões de cada método do primeiro ano observado até ``horizonte`` anos após o último.
+
+    ``serie`` é indexada pelo ano. O resultado tem uma coluna por método e
+    os anos no índice; os valores não são arredondados.
+    """
+    digital = impressao_digital(serie)
+    anos = np.arange(serie.index[0], serie.index[-1] + horizonte + 1)
+
+    def prever(metodo):
+        previsao = _PREVISORES[metodo](ajustar(serie, metodo, digital), anos.astype('float64'))
+        previsao.flags.writeable = False
+        return previsao
+
+    colunas = {metodo: _previsoes.obter((digital, metodo, horizonte), lambda: prever(metodo)) for metodo in metodos}
+    return pd.DataFrame(colunas, index=pd.Index(anos, name=serie.index.name))
+
+
+def limpar_cache():
+    _parametros.limpar()
+    _previsoes.limpar()
@@ -0,0 +1,204 @@
+"""Propensão ao Ponto de Virada: treinamento offline e pontuação em lote.
+
+O modelo é uma regressão logística sobre os indicadores (INDE, IAA, IEG,
+IPS, IDA, IPP e IAN), a fase, a pedra (uma coluna por pedra, com o Quartzo
+como referência) e os anos no programa. O IPV fica de fora porque é o
+indicador do próprio Ponto de Virada; o INDE, porém, inclui o IPV na sua
+fórmula e leva parte desse sinal para o modelo. Os anos no programa vêm do
+``ANO_INGRESSO`` (2022) ou do ``ANOS_PM`` (2020) do aluno em qualquer ano e,
+sem nenhum dos dois, do primeiro ano em que ele aparece no PEDE.
+
+O treinamento roda apenas pela linha de comando, nunca no dashboard. Antes
+do ajuste final com todos os anos, o modelo é ajustado aos anos anteriores
+ao último e avaliado no último (AUC, precisão média e Brier). O artefato é
+um JSON versionado em ``dados/modelos``, com os atributos, a padronização,
+os coeficientes, as métricas e o hash das partições usadas. Cada
+treinamento grava uma versão nova e o dashboard usa a mais recente. Ao
+carregar o modelo, o dashboard compara esses hashes com as partições atuais
+(``particoes_alteradas``) e avisa quando o modelo foi treinado com outros
+dados.
+
+A pontuação é uma única operação matricial sobre a tabela inteira: sem
+scikit-learn e sem laço por aluno. Valores ausentes recebem a média do
+treinamento.
+
+Uso: ``python -m analytics.propensao [--pasta PASTA]``
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import ingestao, pipeline
+from analytics.caminhos import PASTA_DADOS
+
+PASTA_MODELOS = PASTA_DADOS / 'modelos'
+NOME_MODELO = 'propensao_ponto_virada'
+FORMATO = 1
+
+INDICADORES = ['INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IAN']
+PEDRAS = ['Quartzo', 'Ágata', 'Ametista', 'Topázio']
+ATRIBUTOS = INDICADORES + ['FASE', 'ANOS_NO_PROGRAMA'] + [f'PEDRA_{pedra}' for pedra in PEDRAS[1:]]
+
+_PADRAO_VERSAO = re.compile(rf'^{NOME_MODELO}_v(?P<versao>\d+)\.json$')
+
+
+def anos_no_programa(df):
+    """Anos desde o ingresso do aluno; espera a tabela de alunos completa, pois combina os anos de cada aluno."""
+    ingresso = df['ANO'] - df['ANOS_PM'] if 'ANOS_PM' in df.columns else pd.Series(np.nan, index=df.index)
+    if 'ANO_INGRESSO' in df.columns:
+        ingresso = df['ANO_INGRESSO'].fillna(ingresso)
+    # O ingresso informado em um ano vale para os outros anos do mesmo aluno
+    ingresso = ingresso.fillna(df['ANO']).groupby(df['NUMERO_ALUNO']).transform('min')
+    return (df['ANO'] - ingresso).clip(lower=0)
+
+
+def matriz_atributos(df):
+    """Matriz (alunos x ``ATRIBUTOS``) em float64, com ``NaN`` nos valores ausentes."""
+    colunas = [df[INDICADORES + ['FASE']].to_numpy(dtype='float64'), anos_no_programa(df).to_numpy(dtype='float64')[:, np.newaxis]]
+    pedra = df['PEDRA'].to_numpy(dtype=object)
+    colunas += [(pedra == nome).astype('float64')[:, np.newaxis] for nome in PEDRAS[1:]]
+    return np.hstack(colunas)
+
+
+class ModeloPropensao:
+
+    def __init__(self, artefato):
+        if artefato['formato'] != FORMATO:
+            raise ValueError(f'Formato de artefato {artefato["formato"]} não suportado (esperado: {FORMATO}).')
+        if artefato['atributos'] != ATRIBUTOS:
+            raise ValueError(f'Os atributos do artefato ({", ".join(artefato["atributos"])}) não são os atributos atuais.')
+        self.artefato = artefato
+        self.versao = artefato['versao']
+        self.metricas = artefato['metricas']
+        self._media = np.array(artefato['media'])
+        self._desvio = np.array(artefato['desvio'])
+        self._coeficientes = np.array(artefato['coeficientes'])
+        self._intercepto = artefato['intercepto']
+        self.particoes_desatualizadas = []
+
+    @classmethod
+    def carregar(cls, caminho=None):
+        """Carrega o artefato em ``caminho`` ou, sem ele, a versão mais recente em ``PASTA_MODELOS``."""
+        caminho = caminho or caminho_mais_recente()
+        if caminho is None:
+            raise FileNotFoundError(f'Nenhum modelo em {PASTA_MODELOS}; treine com python -m analytics.propensao.')
+        with open(caminho, encoding='utf-8') as arquivo:
+            return cls(json.load(arquivo))
+
+    def particoes_alteradas(self, caminhos):
+        """Partições de ``caminhos`` que não são as usadas no treinamento (hash diferente, novas ou removidas).
+
+        O resultado também fica em ``particoes_desatualizadas``.
+        """
+        registradas = self.artefato.get('particoes', {})
+        atuais = {os.path.relpath(caminho, PASTA_DADOS): caminho for caminho in caminhos}
+        alteradas = [nome for nome, caminho in atuais.items() if registradas.get(nome) != pipeline.hash_arquivo(caminho)]
+        self.particoes_desatualizadas = sorted(alteradas + [nome for nome in registradas if nome not in atuais])
+        return self.particoes_desatualizadas
+
+    def pontuar(self, df):
+        """Probabilidade de Ponto de Virada de cada linha de ``df``, em uma única operação vetorizada."""
+        x = matriz_atributos(df)
+        x = np.where(np.isnan(x), self._media, x)
+        logito = (x - self._media) / self._desvio @ self._coeficientes + self._intercepto
+        return 1 / (1 + np.exp(-logito))
+
+
+def caminho_versao(versao, pasta=PASTA_MODELOS):
+    return os.path.join(pasta, f'{NOME_MODELO}_v{versao}.json')
+
+
+def versoes(pasta=PASTA_MODELOS):
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(int(m['versao']) for m in map(_PADRAO_VERSAO.match, os.listdir(pasta)) if m)
+
+
+def caminho_mais_recente(pasta=PASTA_MODELOS):
+    todas = versoes(pasta)
+    return caminho_versao(todas[-1], pasta) if todas else None
+
+
+def _ajustar(x, y):
+    from sklearn.linear_model import LogisticRegression
+
+    media = np.nanmean(x, axis=0)
+    desvio = np.nanstd(x, axis=0)
+    desvio[desvio == 0] = 1
+    x = (np.where(np.isnan(x), media, x) - media) / desvio
+    regressao = LogisticRegression(max_iter=1000).fit(x, y)
+    return {'media': media.tolist(), 'desvio': desvio.tolist(), 'coeficientes': regressao.coef_[0].tolist(),
+            'intercepto': float(regressao.intercept_[0])}
+
+
+def treinar(df):
+    """Artefato (sem versão) do modelo ajustado a ``df``, com as métricas da validação no último ano."""
+    from sklearn.metrics import average_precision_score, brier_score_loss, roc_auc_score
+
+    rotulados = df['PONTO_VIRADA'].isin(['Sim', 'Não']).to_numpy()
+    x = matriz_atributos(df)[rotulados]
+    y = (df['PONTO_VIRADA'].to_numpy()[rotulados] == 'Sim').astype(int)
+    anos = df['ANO'].to_numpy()[rotulados]
+    ultimo_ano = anos.max()
+    treino, validacao = anos < ultimo_ano, anos == ultimo_ano
+
+    parametros_validacao = _ajustar(x[treino], y[treino])
+    modelo_validacao = ModeloPropensao({'formato': FORMATO, 'atributos': ATRIBUTOS, 'versao': None, 'metricas': None, **parametros_validacao})
+    previstas = modelo_validacao.pontuar(df)[rotulados][validacao]
+    metricas = {
+        'ano_validacao': int(ultimo_ano),
+        'alunos_validacao': int(validacao.sum()),
+        'auc': float(roc_auc_score(y[validacao], previstas)),
+        'precisao_media': float(average_precision_score(y[validacao], previstas)),
+        'brier': float(brier_score_loss(y[validacao], previstas)),
+        'taxa_ponto_virada': float(y[validacao].mean()),
+    }
+    return {'formato': FORMATO, 'atributos': ATRIBUTOS, 'metricas': metricas, 'alunos_treino': int(len(y)),
+            'anos_treino': sorted(int(ano) for ano in np.unique(anos)), **_ajustar(x, y)}
+
+
+def gravar(artefato, pasta=PASTA_MODELOS):
+    """Grava ``artefato`` como a próxima versão em ``pasta`` e retorna o caminho."""
+    os.makedirs(pasta, exist_ok=True)
+    versao = (versoes(pasta) or [0])[-1] + 1
+    artefato = {**artefato, 'versao': versao, 'criado_em': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    caminho = caminho_versao(versao, pasta)
+    # Grava em um arquivo temporário e renomeia, para que o dashboard nunca leia um artefato pela metade
+    descritor, caminho_tmp = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            json.dump(artefato, arquivo, ensure_ascii=False, indent=2)
+        os.chmod(caminho_tmp, 0o644)
+        os.replace(caminho_tmp, caminho)
+    finally:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+    return caminho
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Treina o modelo de propensão ao Ponto de Virada e grava uma nova versão do artefato.')
+    parser.add_argument('--pasta', default=PASTA_MODELOS, help='pasta dos artefatos versionados')
+    args = parser.parse_args(argv)
+
+    ingestao.exigir_particoes()
+    caminhos = ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS)
+    artefato = treinar(ingestao.ler_particoes(caminhos))
+    artefato['particoes'] = {os.path.relpath(caminho, PASTA_DADOS): pipeline.hash_arquivo(caminho) for caminho in caminhos}
+    caminho = gravar(artefato, args.pasta)
+
+    metricas = artefato['metricas']
+    print(f'Modelo gravado em {caminho} ({artefato["alunos_treino"]} alunos-ano de {", ".join(map(str, artefato["anos_treino"]))})')
+    print(f'Validação em {metricas["ano_validacao"]}: AUC {metricas["auc"]:.3f}, precisão média {metricas["precisao_media"]:.3f} '
+          f'(taxa de Ponto de Virada {metricas["taxa_ponto_virada"]:.1%}), Brier {metricas["brier"]:.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Ranking das escolas pelo IDEB, comparado ao IDEB do próprio município.
+
+Todas as medidas são calculadas de uma vez sobre a tabela de escolas
+carregada (tipicamente uma UF inteira): percentis por ``rank`` agrupado, a
+diferença para o IDEB municipal por junção com a tabela de municípios e a
+tendência entre edições por mínimos quadrados em forma fechada sobre a
+matriz escola x ano, sem laços por escola ou município.
+"""
+
+import numpy as np
+
+ESCOLA = ['uf', 'nome_municipio', 'nome_escola', 'rede', 'ciclo']
+
+
+def comparar(escolas, municipios):
+    """Uma linha por escola, ciclo e ano, com percentis e a diferença para o IDEB do município.
+
+    ``percentil_uf`` e ``percentil_municipio`` são a fração das escolas do
+    mesmo ciclo e ano com IDEB menor ou igual; ``posicao_municipio`` é a
+    posição da escola no município (1 = maior IDEB).
+    """
+    escolas = escolas.dropna(subset=['ideb'])
+    referencia = (municipios[municipios['rede'] == 'Pública']
+                  .groupby(['uf', 'nome_municipio', 'ciclo', 'ano'], as_index=False)['ideb'].mean()
+                  .rename(columns={'ideb': 'ideb_municipio'}))
+    comparacao = escolas[ESCOLA + ['ano', 'ideb']].merge(referencia, on=['uf', 'nome_municipio', 'ciclo', 'ano'], how='left')
+    comparacao['delta_municipio'] = comparacao['ideb'] - comparacao['ideb_municipio']
+
+    ideb_uf = comparacao.groupby(['uf', 'ciclo', 'ano'])['ideb']
+    ideb_municipio = comparacao.groupby(['uf', 'nome_municipio', 'ciclo', 'ano'])['ideb']
+    comparacao['percentil_uf'] = ideb_uf.rank(method='max', pct=True)
+    comparacao['percentil_municipio'] = ideb_municipio.rank(method='max', pct=True)
+    comparacao['posicao_municipio'] = ideb_municipio.rank(method='min', ascending=False).astype('int64')
+    return comparacao
+
+
+def tendencias(escolas):
+    """Uma linha por escola e ciclo com o IDEB de cada edição, as variações entre edições e a tendência.
+
+    ``tendencia`` é a inclinação (pontos de IDEB por ano) da reta de mínimos
+    quadrados sobre as edições em que a escola tem IDEB; nula com menos de
+    duas edições.
+    """
+    tabela = escolas.dropna(subset=['ideb']).pivot_table(index=ESCOLA, columns='ano', values='ideb', aggfunc='mean')
+    anos = tabela.columns.to_numpy(dtype='float64')
+    valores = tabela.to_numpy(dtype='float64')
+    presentes = ~np.isnan(valores)
+
+    # Mínimos quadrados linha a linha, considerando só os anos presentes em cada linha
+    quantidade = presentes.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_anos = (presentes * anos).sum(axis=1) / quantidade
+        media_ideb = np.where(presentes, valores, 0).sum(axis=1) / quantidade
+        desvio_anos = np.where(presentes, anos - media_anos[:, np.newaxis], 0)
+        inclinacao = (desvio_anos * np.where(presentes, valores - media_ideb[:, np.newaxis], 0)).sum(axis=1) / (desvio_anos ** 2).sum(axis=1)
+
+    resultado = tabela.add_prefix('ideb_')
+    resultado.columns.name = None
+    for anterior, seguinte in zip(tabela.columns[:-1], tabela.columns[1:]):
+        resultado[f'variacao_{anterior}_{seguinte}'] = tabela[seguinte] - tabela[anterior]
+    resultado['tendencia'] = np.where(quantidade >= 2, inclinacao, np.nan)
+    return resultado.reset_index()
+
+
+def abaixo_do_municipio(comparacao, minimo_edicoes=2):
+    """Escolas (por ciclo) com IDEB abaixo do IDEB do município em todas as edições, com pelo menos ``minimo_edicoes`` edições."""
+    grupos = comparacao.assign(abaixo=comparacao['delta_municipio'] < 0).groupby(ESCOLA)['abaixo']
+    selecionadas = (grupos.size() >= minimo_edicoes) & grupos.all()
+    return selecionadas[selecionadas].index.to_frame(index=False)
+
+
+class RankingIdeb:
+
+    def __init__(self, escolas, municipios):
+        self._comparacao = comparar(escolas, municipios)
+        self._tendencias = tendencias(escolas)
+
+    def comparacao(self, municipio=None, ciclo=None):
+        return _selecionar(self._comparacao, municipio, ciclo)
+
+    def tendencias(self, municipio=None, ciclo=None):
+        return _selecionar(self._tendencias, municipio, ciclo)
+
+    def abaixo_do_municipio(self, municipio=None, ciclo=None, minimo_edicoes=2):
+        return abaixo_do_municipio(self.comparacao(municipio, ciclo), minimo_edicoes)
+
+
+def _selecionar(tabela, municipio, ciclo):
+    mascara = np.ones(len(tabela), dtype=bool)
+    if municipio is not None:
+        mascara &= (tabela['nome_municipio'] == municipio).to_numpy()
+    if ciclo is not None:
+        mascara &= (tabela['ciclo'] == ciclo).to_numpy()
+    return tabela[mascara].reset_index(drop=True)
@@ -0,0 +1,142 @@
+"""Testes de diferença dos indicadores entre alunos com e sem Ponto de Virada.
+
+Para cada ano e cada medida do cubo (indicadores e notas), compara as
+médias dos alunos com ``PONTO_VIRADA`` "Sim" e "Não" e calcula:
+
+- a diferença das médias, com o intervalo de confiança de Welch;
+- o tamanho de efeito (d de Cohen, com o desvio padrão combinado);
+- o p-valor bilateral de um teste de permutação;
+- o p-valor ajustado por Holm, entre todos os testes da mesma seleção.
+
+As permutações embaralham os rótulos Sim/Não dentro de cada ano. Em vez de
+um laço por teste, os valores entram em uma matriz de desenho com uma coluna
+por ano x medida (zero fora do ano). Assim, as somas e contagens do grupo
+"Sim" de todas as permutações e de todos os testes saem de uma única
+multiplicação de matrizes (permutações x alunos) @ (alunos x testes). Para
+limitar a memória, as permutações são processadas em blocos de cerca de
+``ELEMENTOS_LOTE`` rótulos (permutações x alunos), e cada bloco embaralha os
+próprios rótulos booleanos, sem chaves aleatórias nem vetores de posições.
+Valores ausentes de uma medida ficam fora das somas e
+das contagens.
+
+O índice é construído uma vez por versão das partições. O resultado de cada
+combinação de filtros fica em cache nele, junto das máscaras de
+``analytics.filtros``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics import cubo
+from analytics.cache import CacheLRU
+
+PERMUTACOES = 2000
+ELEMENTOS_LOTE = 2 ** 22
+NIVEL = 0.95
+SEMENTE = 42
+
+COLUNAS = ['n_sim', 'n_nao', 'media_sim', 'media_nao', 'diferenca', 'ic_inferior', 'ic_superior', 'd_cohen', 'p_valor', 'p_holm']
+
+
+def ajustar_holm(p_valores):
+    """P-valores ajustados pelo método de Holm (controle da taxa de erro do conjunto)."""
+    p_valores = np.asarray(p_valores, dtype='float64')
+    ordem = np.argsort(p_valores)
+    ajustados = np.maximum.accumulate(p_valores[ordem] * (len(p_valores) - np.arange(len(p_valores))))
+    resultado = np.empty_like(ajustados)
+    resultado[ordem] = np.minimum(ajustados, 1)
+    return resultado
+
+
+class TestesPontoVirada:
+
+    def __init__(self, df, indice_filtros, medidas=cubo.MEDIDAS):
+        rotulados = df['PONTO_VIRADA'].isin(['Sim', 'Não']).to_numpy()
+        self.medidas = [medida for medida in medidas if medida in df.columns]
+        self._indice_filtros = indice_filtros
+        self._linhas = np.flatnonzero(rotulados)
+        self._anos = df['ANO'].to_numpy()[rotulados]
+        self._sim = df['PONTO_VIRADA'].to_numpy()[rotulados] == 'Sim'
+        self._valores = df[self.medidas].to_numpy(dtype='float64')[rotulados]
+        self._resultados = CacheLRU(max_itens=64)
+
+    def testar(self, filtros=None, permutacoes=PERMUTACOES, nivel=NIVEL):
+        """Uma linha por ``ANO`` x medida com dados nos dois grupos, para as linhas selecionadas por ``filtros``."""
+        filtros = {dimensao: valores for dimensao, valores in (filtros or {}).items() if valores}
+        chave = (tuple(sorted((dimensao, tuple(valores)) for dimensao, valores in filtros.items())), permutacoes, nivel)
+        return self._resultados.obter(chave, lambda: self._testar(filtros, permutacoes, nivel))
+
+    def _testar(self, filtros, permutacoes, nivel):
+        selecionadas = self._indice_filtros.mascara(filtros)[self._linhas]
+        # Ordenadas por ano: as permutações dentro de cada ano ficam em posições contíguas
+        ordem = np.argsort(self._anos[selecionadas], kind='stable')
+        anos, codigos = np.unique(self._anos[selecionadas][ordem], return_inverse=True)
+        sim = self._sim[selecionadas][ordem]
+        valores = self._valores[selecionadas][ordem]
+
+        # Matriz de desenho: uma coluna por ano x medida, com zero nas linhas de outros anos e nos valores ausentes
+        no_ano = (codigos[:, np.newaxis] == np.arange(len(anos)))[:, :, np.newaxis]
+        presentes = ~np.isnan(valores)
+        forma = (len(valores), len(anos) * len(self.medidas))
+        desenho_valores = (no_ano * np.where(presentes, valores, 0)[:, np.newaxis, :]).reshape(forma)
+        desenho_presentes = (no_ano * presentes[:, np.newaxis, :]).reshape(forma).astype('float64')
+        desenho = np.hstack([desenho_valores, desenho_presentes])
+        quantidade_testes = desenho_valores.shape[1]
+
+        total_soma, total_n = desenho_valores.sum(axis=0), desenho_presentes.sum(axis=0)
+        total_quad = (desenho_valores ** 2).sum(axis=0)
+
+        def diferencas(rotulos):
+            # rotulos: (permutações x alunos), 1 no grupo "Sim"; todas as somas em uma multiplicação de matrizes
+            somas = rotulos @ desenho
+            soma_sim, n_sim = somas[:, :quantidade_testes], somas[:, quantidade_testes:]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return soma_sim / n_sim - (total_soma - soma_sim) / (total_n - n_sim)
+
+        rotulos_observados = sim.astype('float64')[np.newaxis, :]
+        observada = diferencas(rotulos_observados)[0]
+
+        # Fronteiras dos anos nas linhas ordenadas; o tamanho do bloco acompanha o número de alunos
+        fronteiras = np.searchsorted(codigos, np.arange(len(anos) + 1))
+        lote = max(1, min(permutacoes, ELEMENTOS_LOTE // max(len(sim), 1)))
+        rng = np.random.default_rng(SEMENTE)
+        extremas = np.zeros(quantidade_testes)
+        for inicio in range(0, permutacoes, lote):
+            tamanho = min(lote, permutacoes - inicio)
+            # Rótulos booleanos (permutações x alunos), embaralhados no lugar dentro de cada ano
+            rotulos = np.broadcast_to(sim, (tamanho, len(sim))).copy()
+            for comeco, fim in zip(fronteiras[:-1], fronteiras[1:]):
+                rng.permuted(rotulos[:, comeco:fim], axis=1, out=rotulos[:, comeco:fim])
+            permutadas = diferencas(rotulos.astype('float64'))
+            extremas += (np.abs(permutadas) >= np.abs(observada) - 1e-12).sum(axis=0)
+
+        soma_sim = (rotulos_observados @ desenho_valores)[0]
+        quad_sim = (rotulos_observados @ desenho_valores ** 2)[0]
+        n_sim = (rotulos_observados @ desenho_presentes)[0]
+        n_nao = total_n - n_sim
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media_sim, media_nao = soma_sim / n_sim, (total_soma - soma_sim) / n_nao
+            var_sim = (quad_sim - n_sim * media_sim ** 2) / (n_sim - 1)
+            var_nao = (total_quad - quad_sim - n_nao * media_nao ** 2) / (n_nao - 1)
+            erro_padrao = np.sqrt(var_sim / n_sim + var_nao / n_nao)
+            # Graus de liberdade de Welch-Satterthwaite
+            graus = erro_padrao ** 4 / ((var_sim / n_sim) ** 2 / (n_sim - 1) + (var_nao / n_nao) ** 2 / (n_nao - 1))
+            desvio_combinado = np.sqrt(((n_sim - 1) * var_sim + (n_nao - 1) * var_nao) / (n_sim + n_nao - 2))
+
+        from scipy.stats import t
+
+        validos = (n_sim >= 2) & (n_nao >= 2)
+        margem = t.ppf(1 - (1 - nivel) / 2, np.where(validos, graus, 1)) * erro_padrao
+        resultado = pd.DataFrame({
+            'n_sim': n_sim.astype('int64'),
+            'n_nao': n_nao.astype('int64'),
+            'media_sim': media_sim,
+            'media_nao': media_nao,
+            'diferenca': observada,
+            'ic_inferior': observada - margem,
+            'ic_superior': observada + margem,
+            'd_cohen': observada / desvio_combinado,
+            'p_valor': (extremas + 1) / (permutacoes + 1),
+        }, index=pd.MultiIndex.from_product([anos, self.medidas], names=['ANO', 'MEDIDA']))
+        resultado = resultado[validos]
+        return resultado.assign(p_holm=ajustar_holm(resultado['p_valor']))[COLUNAS]
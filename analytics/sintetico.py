@@ -0,0 +1,138 @@
+"""Gerador de um PEDE sintético, no formato do arquivo real, para testes de escala.
+
+O modelo é ajustado ao ``PEDE_PASSOS_DATASET_FIAP.csv``. Nos anos que existem
+no PEDE real, cada aluno sintético é a cópia dos blocos ``<VARIAVEL>_<ANO>`` de
+um aluno real sorteado com reposição. A cópia preserva a correlação entre os
+indicadores de um mesmo ano e a trajetória do aluno entre os anos. Preserva
+também os padrões de anos ausentes e os valores categóricos (PEDRA, FASE,
+PONTO_VIRADA...), inclusive os artefatos como ``#NULO!``, nas proporções
+reais.
+
+Anos além dos do PEDE real seguem o esquema do último ano real. A presença
+do aluno nesses anos segue uma cadeia de Markov ajustada aos anos reais: a
+probabilidade de permanecer e a de entrar no programa, dado o ano anterior.
+Os valores de cada um desses anos vêm de uma linha do último ano real,
+sorteada com reposição.
+
+Para que as cópias não sejam idênticas, os indicadores e notas contínuos
+recebem um ruído normal (``ruido`` pontos, limitado a 0-10). O INDE fica sem
+ruído porque a PEDRA e o INDE_CONCEITO são derivados dele.
+
+O arquivo é gerado em lotes, então 1 milhão de alunos não precisa caber em
+memória de uma vez.
+
+Uso: ``python -m analytics.sintetico DESTINO (--alunos N | --escala X) [--anos N] [--semente S] [--ruido R]``
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import pipeline
+from analytics.cubo import INDICADORES, NOTAS
+
+COLUNAS_COM_RUIDO = [coluna for coluna in INDICADORES + NOTAS if coluna not in ('INDE', 'IAN')]
+TAMANHO_LOTE = 100_000
+
+
+class ModeloPede:
+
+    def __init__(self, pede):
+        colunas = pipeline._colunas_por_ano(pede.columns)
+        self.anos_reais = sorted({ano for _, ano in colunas.values()})
+        self._pede = pede
+        self._colunas = {ano: [coluna for coluna, (_, ano_coluna) in colunas.items() if ano_coluna == ano] for ano in self.anos_reais}
+        self._variaveis = {coluna: variavel for coluna, (variavel, _) in colunas.items()}
+        self._presenca = pd.DataFrame({ano: pede[self._colunas[ano]].notna().any(axis=1) for ano in self.anos_reais})
+
+        # Cadeia de Markov da presença entre anos consecutivos, com todas as transições reais somadas
+        anteriores = self._presenca.iloc[:, :-1].to_numpy().ravel()
+        seguintes = self._presenca.iloc[:, 1:].to_numpy().ravel()
+        self.p_permanencia = seguintes[anteriores].mean()
+        self.p_entrada = seguintes[~anteriores].mean()
+
+        ultimo = self.anos_reais[-1]
+        self._ultimo_bloco = pede.loc[self._presenca[ultimo], self._colunas[ultimo]].to_numpy(dtype=object)
+
+    def colunas(self, anos):
+        """Cabeçalho do arquivo gerado para os ``anos``: ``NOME`` e um bloco por ano."""
+        resultado = ['NOME']
+        for ano in anos:
+            if ano in self._colunas:
+                resultado += self._colunas[ano]
+            else:
+                resultado += [f'{self._variaveis[coluna]}_{ano}' for coluna in self._colunas[self.anos_reais[-1]]]
+        return resultado
+
+    def gerar_lote(self, rng, numeros, anos, ruido=0.05):
+        """Alunos sintéticos ``ALUNO-<numero>`` para os ``anos``, como texto, no formato largo do PEDE."""
+        quantidade = len(numeros)
+        anos_reais = [ano for ano in anos if ano in self._colunas]
+        # Apenas alunos reais com algum dado nos anos reais pedidos: nenhum aluno sintético fica vazio
+        candidatos = np.flatnonzero(self._presenca[anos_reais].any(axis=1)) if anos_reais else np.arange(len(self._pede))
+        sorteados = rng.choice(candidatos, size=quantidade)
+
+        blocos = [pd.DataFrame({'NOME': 'ALUNO-' + pd.Series(numeros).astype(str)})]
+        presente = np.zeros(quantidade, dtype=bool)
+        for ano in anos:
+            if ano in self._colunas:
+                bloco = self._pede[self._colunas[ano]].iloc[sorteados].reset_index(drop=True)
+                presente = self._presenca[ano].to_numpy()[sorteados]
+            else:
+                presente = rng.random(quantidade) < np.where(presente, self.p_permanencia, self.p_entrada)
+                valores = np.full((quantidade, self._ultimo_bloco.shape[1]), np.nan, dtype=object)
+                valores[presente] = self._ultimo_bloco[rng.integers(0, len(self._ultimo_bloco), presente.sum())]
+                bloco = pd.DataFrame(valores, columns=[coluna for coluna in self.colunas([ano]) if coluna != 'NOME'])
+            blocos.append(_com_ruido(bloco, rng, ruido))
+        return pd.concat(blocos, axis=1)
+
+
+def _com_ruido(bloco, rng, ruido):
+    if not ruido:
+        return bloco
+    for coluna in bloco.columns:
+        if coluna.rsplit('_', 1)[0] not in COLUNAS_COM_RUIDO:
+            continue
+        # Só os valores numéricos recebem ruído; artefatos como "#NULO!" são mantidos
+        valores = pd.to_numeric(bloco[coluna], errors='coerce')
+        numericos = valores.notna().to_numpy()
+        novos = np.clip(valores.to_numpy()[numericos] + rng.normal(0, ruido, numericos.sum()), 0, 10).round(6)
+        bloco.loc[numericos, coluna] = novos.astype(str)
+    return bloco
+
+
+def gerar(destino, alunos, anos=None, origem=pipeline.CAMINHO_PEDE, semente=42, ruido=0.05, tamanho_lote=TAMANHO_LOTE):
+    """Grava em ``destino`` um PEDE sintético com ``alunos`` alunos e ``anos`` anos (``None`` = os anos reais)."""
+    modelo = ModeloPede(pipeline.ler_pede(origem))
+    anos = list(range(modelo.anos_reais[0], modelo.anos_reais[0] + (anos or len(modelo.anos_reais))))
+    rng = np.random.default_rng(semente)
+
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    for inicio in range(0, alunos, tamanho_lote):
+        numeros = np.arange(inicio + 1, min(alunos, inicio + tamanho_lote) + 1)
+        lote = modelo.gerar_lote(rng, numeros, anos, ruido)
+        lote.to_csv(destino, sep=';', index=False, mode='w' if inicio == 0 else 'a', header=inicio == 0)
+    return anos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera um PEDE sintético no formato do arquivo real.')
+    parser.add_argument('destino', help='CSV gerado')
+    quantidade = parser.add_mutually_exclusive_group(required=True)
+    quantidade.add_argument('--alunos', type=int, help='número de alunos')
+    quantidade.add_argument('--escala', type=float, help='múltiplo do número de alunos do PEDE real')
+    parser.add_argument('--anos', type=int, help='número de anos a partir do primeiro ano real (padrão: os anos reais)')
+    parser.add_argument('--origem', default=pipeline.CAMINHO_PEDE, help='PEDE real ao qual o modelo é ajustado')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--ruido', type=float, default=0.05, help='desvio padrão do ruído nos indicadores, em pontos')
+    args = parser.parse_args(argv)
+
+    alunos = args.alunos or round(args.escala * len(pipeline.ler_pede(args.origem, anos=[])))
+    anos = gerar(args.destino, alunos, args.anos, args.origem, args.semente, args.ruido)
+    print(f'{alunos} alunos, anos {anos[0]}-{anos[-1]}, gravados em {args.destino}')
+
+
+if __name__ == '__main__':
+    main()
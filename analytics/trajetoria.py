@@ -0,0 +1,46 @@
+"""Trajetória de cada aluno ao longo dos anos do PEDE.
+
+A tabela longa é ordenada uma única vez por ``NUMERO_ALUNO`` e ``ANO``; as
+linhas de um aluno ficam contíguas e são localizadas por busca binária
+(``np.searchsorted``) sobre a coluna de números, em O(log n) por consulta.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_TRAJETORIA = ['ANO', 'PEDRA', 'FASE', 'INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN', 'PONTO_VIRADA']
+
+_PADRAO_ALUNO = re.compile(r'^\s*(?:ALUNO\s*-?\s*)?(\d+)\s*$', re.IGNORECASE)
+
+
+def numero_aluno(texto):
+    """Número do aluno a partir de ``ALUNO-123`` ou ``123``; ``None`` se o texto não for válido."""
+    m = _PADRAO_ALUNO.match(texto or '')
+    return int(m.group(1)) if m else None
+
+
+class IndiceAlunos:
+
+    def __init__(self, df):
+        ordem = np.lexsort((df['ANO'].to_numpy(), df['NUMERO_ALUNO'].to_numpy()))
+        self._tabela = df[COLUNAS_TRAJETORIA].take(ordem).reset_index(drop=True)
+        self._numeros = df['NUMERO_ALUNO'].to_numpy()[ordem]
+
+    def __contains__(self, numero):
+        posicao = np.searchsorted(self._numeros, numero)
+        return posicao < len(self._numeros) and self._numeros[posicao] == numero
+
+    def trajetoria(self, numero):
+        inicio, fim = np.searchsorted(self._numeros, [numero, numero + 1])
+        return self._tabela.iloc[inicio:fim].reset_index(drop=True)
+
+
+def transicoes_ponto_virada(trajetoria):
+    """Acrescenta a coluna ``TRANSICAO`` com a mudança do Ponto de Virada em relação ao ano anterior."""
+    anterior = trajetoria['PONTO_VIRADA'].shift()
+    mudou = anterior.notna() & trajetoria['PONTO_VIRADA'].notna() & (anterior != trajetoria['PONTO_VIRADA'])
+    transicao = pd.Series(pd.NA, index=trajetoria.index, dtype='object')
+    transicao[mudou] = anterior[mudou] + ' → ' + trajetoria['PONTO_VIRADA'][mudou]
+    return trajetoria.assign(TRANSICAO=transicao)
@@ -0,0 +1,124 @@
+"""Validação declarativa das tabelas na ingestão.
+
+Cada tabela tem um esquema: um ``Coluna`` por coluna, com o tipo, a faixa
+válida, as categorias permitidas, os valores sentinela e se a coluna é
+obrigatória. ``validar`` aplica o esquema de uma vez, com operações
+vetorizadas por coluna (nenhum laço por linha), e separa:
+
+- a tabela limpa e tipada;
+- a quarentena: as linhas com algum valor inválido, com os valores
+  originais e o motivo;
+- o relatório de qualidade, com a quantidade de ocorrências de cada regra
+  por coluna e alguns exemplos.
+
+As regras são:
+
+- ``sentinela``: valores como ``#NULO!`` ou ``-`` viram nulos. É informativa.
+- ``tipo``: texto que não é número em uma coluna numérica, ou número não
+  inteiro em uma coluna inteira.
+- ``faixa``: valor fora do mínimo e do máximo. Valores fora da faixa por até
+  ``tolerancia`` (como os 10.00002 do IAA) são ajustados ao limite e contados
+  na regra ``ajuste``, que é informativa.
+- ``categoria``: valor fora das categorias permitidas, ou texto fora do
+  ``padrao``.
+- ``obrigatoria``: valor ausente ou sentinela em uma coluna obrigatória.
+
+Qualquer ocorrência de ``tipo``, ``faixa``, ``categoria`` ou ``obrigatoria``
+manda a linha inteira para a quarentena, em vez de descartá-la em silêncio.
+"""
+
+import numpy as np
+import pandas as pd
+
+REGRAS_QUARENTENA = ['tipo', 'faixa', 'categoria', 'obrigatoria']
+COLUNAS_RELATORIO = ['coluna', 'regra', 'ocorrencias', 'exemplos']
+EXEMPLOS = 3
+
+
+class Coluna:
+
+    def __init__(self, tipo='texto', minimo=None, maximo=None, categorias=None, padrao=None, obrigatoria=False, sentinelas=(),
+                 tolerancia=0.0):
+        if tipo not in ('numero', 'inteiro', 'texto'):
+            raise ValueError(f'Tipo de coluna desconhecido: {tipo}')
+        self.tipo = tipo
+        self.minimo = minimo
+        self.maximo = maximo
+        self.categorias = None if categorias is None else list(categorias)
+        self.padrao = padrao
+        self.obrigatoria = obrigatoria
+        self.sentinelas = list(sentinelas)
+        self.tolerancia = tolerancia
+
+    def aplicar(self, valores, sentinelas=()):
+        """Valores convertidos e as máscaras de cada regra para a série ``valores`` (texto ou já tipada)."""
+        sentinela = valores.isin(self.sentinelas + list(sentinelas))
+        valores = valores.mask(sentinela)
+        ocorrencias = {'sentinela': sentinela.to_numpy()}
+
+        if self.tipo == 'texto':
+            convertidos = valores
+            invalidos = np.zeros(len(valores), dtype=bool)
+            if self.categorias is not None:
+                invalidos |= (valores.notna() & ~valores.isin(self.categorias)).to_numpy()
+            if self.padrao is not None:
+                casam = valores.astype('string').str.fullmatch(self.padrao).fillna(False).to_numpy(dtype=bool)
+                invalidos |= valores.notna().to_numpy() & ~casam
+            ocorrencias['categoria'] = invalidos
+        else:
+            convertidos = pd.to_numeric(valores, errors='coerce').astype('float64')
+            tipo_invalido = (valores.notna() & convertidos.isna()).to_numpy()
+            if self.tipo == 'inteiro':
+                tipo_invalido = tipo_invalido | ((convertidos % 1 != 0) & convertidos.notna()).to_numpy()
+            ocorrencias['tipo'] = tipo_invalido
+            convertidos = convertidos.mask(tipo_invalido)
+
+            minimo = -np.inf if self.minimo is None else self.minimo
+            maximo = np.inf if self.maximo is None else self.maximo
+            fora = ((convertidos < minimo) | (convertidos > maximo)).to_numpy()
+            dentro_tolerancia = ((convertidos >= minimo - self.tolerancia) & (convertidos <= maximo + self.tolerancia)).to_numpy()
+            ocorrencias['ajuste'] = fora & dentro_tolerancia
+            ocorrencias['faixa'] = fora & ~dentro_tolerancia
+            convertidos = convertidos.clip(minimo, maximo).mask(ocorrencias['faixa'])
+
+        if self.obrigatoria:
+            ocorrencias['obrigatoria'] = (valores.isna() | sentinela).to_numpy()
+        return convertidos, ocorrencias
+
+
+def validar(df, esquema, sentinelas=(), identificacao=()):
+    """Aplica ``esquema`` ({coluna: Coluna}) a ``df``; retorna a tabela limpa, a quarentena e o relatório de qualidade.
+
+    Colunas do esquema que não existem em ``df`` são ignoradas (o PEDE não tem
+    todas as variáveis em todos os anos). A quarentena traz as colunas de
+    ``identificacao``, os valores originais das colunas com problema e a
+    coluna ``MOTIVOS``.
+    """
+    limpo = df.copy()
+    quarentena = np.zeros(len(df), dtype=bool)
+    motivos = []
+    colunas_quarentena = list(identificacao)
+    relatorio = []
+    for coluna, regra_coluna in esquema.items():
+        if coluna not in df.columns:
+            continue
+        originais = df[coluna]
+        limpo[coluna], ocorrencias = regra_coluna.aplicar(originais, sentinelas)
+        for regra, mascara in ocorrencias.items():
+            if not mascara.any():
+                continue
+            exemplos = originais[mascara].astype(str).unique()[:EXEMPLOS].tolist()
+            relatorio.append((coluna, regra, int(mascara.sum()), exemplos))
+            if regra in REGRAS_QUARENTENA:
+                quarentena |= mascara
+                colunas_quarentena.append(coluna)
+                motivos.append(pd.Series(f'{coluna}: {regra} (', index=df.index[mascara]) + originais[mascara].astype(str) + ')')
+
+    # Valores originais, como texto, das colunas de identificação e das que tiveram algum problema
+    colunas_quarentena = [coluna for coluna in dict.fromkeys(colunas_quarentena) if coluna in df.columns]
+    linhas_quarentena = df.loc[quarentena, colunas_quarentena].astype(str)
+    por_linha = pd.concat(motivos).groupby(level=0).agg('; '.join) if motivos else pd.Series(dtype=str)
+    linhas_quarentena['MOTIVOS'] = por_linha.reindex(linhas_quarentena.index)
+
+    relatorio = pd.DataFrame(relatorio, columns=COLUNAS_RELATORIO)
+    return limpo[~quarentena], linhas_quarentena.reset_index(drop=True), relatorio
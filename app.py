@@ -1,13 +1,16 @@
-import pandas as pd
+import uuid
+
 import numpy as np
+import pandas as pd
 import streamlit as st
-import plotly.express as px
+import plotly.colors
 import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from statsmodels.tsa.holtwinters import SimpleExpSmoothing
+
+from analytics import backtesting, cenarios, cubo, dados, figuras, geo, graficos_ideb, instrumentacao, intervalos, previsao, significancia, trajetoria
+
+# As abas recebem cópias rasas dos DataFrames em cache (ver analytics/dados.py); com copy-on-write, uma escrita
+# feita por uma aba copia os dados em vez de alterar a tabela compartilhada entre sessões
+pd.set_option('mode.copy_on_write', True)
 
 st.set_page_config(
     page_title="Datathon - Passos Mágicos"
@@ -16,10 +19,7 @@ st.set_page_config(
 st.title('Passos Mágicos - Analytics')
 
 
-tab0, tab1, tab2, tab3, tab4, tab5 = st.tabs(["Introdução", "Visão Geral dos Dados", "Forecast e What-if", "Ponto de Virada", "IDEB", "Conclusão"])
-
-with tab0:      
-
+def secao_introducao():
     st.markdown("## Introdução")
 
     paragrafo1_tab0 = 'Em um mundo marcado por desigualdades sociais, as organizações não governamentais (ONGs) desempenham um papel fundamental na construção de comunidades mais justas e inclusivas. Entre essas instituições, a <a href="https://passosmagicos.org.br/" target="_blank"><b>Passos Mágicos</b></a> se destaca como um farol de esperança. Fundada em 1992 por Michelle Flues e Dimetri Ivanoff, a ONG evoluiu significativamente ao longo dos anos, expandindo sua atuação e aprimorando sua abordagem para oferecer não apenas educação, mas também suporte psicológico, desenvolvimento pessoal e comunitário a crianças e jovens de baixa renda do município de Embu-Guaçu.'
@@ -34,8 +34,7 @@ with tab0:
 
     st.markdown(texto_justificado_tab0, unsafe_allow_html=True) 
 
-with tab1:      
-
+def secao_visao_geral():
     st.markdown("## Visão Geral dos Dados")
 
     paragrafo1_tab1 = 'O primeiro passo para entender a relevância e o impacto da <b>Passos Mágicos</b> é analisar os números macros da ONG ao longo dos anos.'
@@ -46,26 +45,29 @@ with tab1:
 
     st.markdown(texto_justificado_tab1, unsafe_allow_html=True) 
 
-    df_dados_gerais = pd.read_csv('dados/dados_gerais.csv', delimiter=';', thousands='.')
+    df_dados_gerais = dados.carregar_dados_gerais()
 
 
-    # Criando o gráfico de colunas para alunos, bolsistas e universitários
-    fig1 = go.Figure()
+    # Figuras construídas uma única vez por versão dos dados (ver analytics/figuras.py)
+    def grafico_alunos():
+        # Criando o gráfico de colunas para alunos, bolsistas e universitários
+        fig1 = go.Figure()
 
-    # Adicionando colunas para alunos, bolsistas e universitários
-    fig1.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Alunos'], name='Alunos'))
-    fig1.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Bolsistas'], name='Bolsistas'))
-    fig1.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Universitarios'], name='Universitários'))
+        # Adicionando colunas para alunos, bolsistas e universitários
+        fig1.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Alunos'], name='Alunos'))
+        fig1.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Bolsistas'], name='Bolsistas'))
+        fig1.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Universitarios'], name='Universitários'))
 
-    # Personalizando o layout do primeiro gráfico
-    fig1.update_layout(title='Número de Alunos, Bolsistas e Universitários ao Longo dos Anos',
-                    xaxis_title='Ano',
-                    yaxis_title='Número',
-                    barmode='group',
-                    legend_title='Grupo')
+        # Personalizando o layout do primeiro gráfico
+        fig1.update_layout(title='Número de Alunos, Bolsistas e Universitários ao Longo dos Anos',
+                        xaxis_title='Ano',
+                        yaxis_title='Número',
+                        barmode='group',
+                        legend_title='Grupo')
+        return fig1
 
     # Exibindo o primeiro gráfico
-    st.plotly_chart(fig1)
+    figuras.exibir(figuras.figura('alunos_bolsistas_universitarios', [dados.CAMINHO_DADOS_GERAIS], grafico_alunos))
 
     paragrafo2_tab1 = 'Ao longo do tempo, observamos um crescimento notável no número de alunos envolvidos com a ONG: começando com 70 alunos em 2016 e escalando para 1.100 alunos até o ano de 2023. Destaca-se especialmente o impressionante aumento de aproximadamente 329% ocorrido entre 2016 e 2017, refletindo um crescimento substancial e uma maior adesão ao programa ao longo dos anos.'
     paragrafo3_tab1 = 'Além disso, também é evidente o aumento significativo no número de bolsistas e universitários participantes. Um ponto de destaque notável é a variação do número de universitários, que passou de 2 em 2019 para 26 em 2020, representando um aumento extraordinário de 1.200%.'
@@ -77,25 +79,27 @@ with tab1:
 
     st.markdown(texto_justificado_1_tab1, unsafe_allow_html=True) 
 
-    # Criando o gráfico de colunas para professores, psicólogos, psicopedagogos, psiquiatras e assistentes sociais
-    fig2 = go.Figure()
+    def grafico_profissionais():
+        # Criando o gráfico de colunas para professores, psicólogos, psicopedagogos, psiquiatras e assistentes sociais
+        fig2 = go.Figure()
 
-    # Adicionando colunas para professores, psicólogos, psicopedagogos, psiquiatras e assistentes sociais
-    fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Professores'], name='Professores'))
-    fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Psicologos'], name='Psicólogos'))
-    fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Psicopedagogos'], name='Psicopedagogos'))
-    fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Psiquiatras'], name='Psiquiatras'))
-    fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Assistentes_Sociais'], name='Assistentes Sociais'))
+        # Adicionando colunas para professores, psicólogos, psicopedagogos, psiquiatras e assistentes sociais
+        fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Professores'], name='Professores'))
+        fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Psicologos'], name='Psicólogos'))
+        fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Psicopedagogos'], name='Psicopedagogos'))
+        fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Psiquiatras'], name='Psiquiatras'))
+        fig2.add_trace(go.Bar(x=df_dados_gerais['Ano'], y=df_dados_gerais['Assistentes_Sociais'], name='Assistentes Sociais'))
 
-    # Personalizando o layout do segundo gráfico
-    fig2.update_layout(title='Número de Professores e Profissionais de Apoio ao Longo dos Anos',
-                    xaxis_title='Ano',
-                    yaxis_title='Número',
-                    barmode='group',
-                    legend_title='Grupo')
+        # Personalizando o layout do segundo gráfico
+        fig2.update_layout(title='Número de Professores e Profissionais de Apoio ao Longo dos Anos',
+                        xaxis_title='Ano',
+                        yaxis_title='Número',
+                        barmode='group',
+                        legend_title='Grupo')
+        return fig2
 
     # Exibindo o segundo gráfico
-    st.plotly_chart(fig2)
+    figuras.exibir(figuras.figura('profissionais', [dados.CAMINHO_DADOS_GERAIS], grafico_profissionais))
     
     paragrafo4_tab1 = 'Obviamente, o progresso observado no número de alunos se deu pelo crescimento dos colaboradores envolvidos com a <b>Passos Mágicos</b>. É interessante observar que o aumento no número de professores ocorreu de maneira consistente ao longo dos anos, seguindo uma tendência linear de crescimento, com avanços notáveis em todos os anos, exceto em 2020, quando a Pandemia de COVID-19 teve um impacto significativo.'
     paragrafo5_tab1 = 'Além disso, o crescimento da ONG abriu portas para a entrada de novos profissionais, elevando o total para 22 no ano de 2023. Essa expansão na equipe reflete não apenas o amadurecimento da organização, mas também sua capacidade de atrair talentos e se adaptar às demandas crescentes de suas operações e programas.'
@@ -112,24 +116,26 @@ with tab1:
     df_dados_gerais['Total_Profissionais'] = df_dados_gerais[['Professores', 'Psicologos', 'Psicopedagogos', 'Psiquiatras', 'Assistentes_Sociais']].sum(axis=1)
 
 
-    # Criando o gráfico de linha para a soma dos alunos e dos profissionais ao longo dos anos
-    fig = go.Figure()
+    def grafico_totais():
+        # Criando o gráfico de linha para a soma dos alunos e dos profissionais ao longo dos anos
+        fig = go.Figure()
 
-    # Adicionando linhas para a soma dos alunos e dos profissionais
-    fig.add_trace(go.Scatter(x=df_dados_gerais['Ano'], y=df_dados_gerais['Total_Alunos'], mode='lines', name='Total de Alunos'))
+        # Adicionando linhas para a soma dos alunos e dos profissionais
+        fig.add_trace(go.Scatter(x=df_dados_gerais['Ano'], y=df_dados_gerais['Total_Alunos'], mode='lines', name='Total de Alunos'))
 
-    # Adicionando uma segunda escala para os profissionais
-    fig.add_trace(go.Scatter(x=df_dados_gerais['Ano'], y=df_dados_gerais['Total_Profissionais'], mode='lines', name='Total de Profissionais', yaxis='y2'))
+        # Adicionando uma segunda escala para os profissionais
+        fig.add_trace(go.Scatter(x=df_dados_gerais['Ano'], y=df_dados_gerais['Total_Profissionais'], mode='lines', name='Total de Profissionais', yaxis='y2'))
 
-    # Personalizando o layout do gráfico
-    fig.update_layout(title='Total de Alunos e Profissionais ao Longo dos Anos',
-                    xaxis_title='Ano',
-                    yaxis_title='Total de Alunos',
-                    legend_title='Grupo',
-                    yaxis2=dict(title='Total de Profissionais', overlaying='y', side='right'))
+        # Personalizando o layout do gráfico
+        fig.update_layout(title='Total de Alunos e Profissionais ao Longo dos Anos',
+                        xaxis_title='Ano',
+                        yaxis_title='Total de Alunos',
+                        legend_title='Grupo',
+                        yaxis2=dict(title='Total de Profissionais', overlaying='y', side='right'))
+        return fig
 
     # Exibindo o gráfico
-    st.plotly_chart(fig)
+    figuras.exibir(figuras.figura('total_alunos_profissionais', [dados.CAMINHO_DADOS_GERAIS], grafico_totais))
     
     paragrafo6_tab1 = 'Podemos explorar essa dinâmica traçando as curvas que representam o Total de Alunos e o Total de Profissionais ao longo dos anos. Por uma questão de escala, optamos por utilizar um eixo secundário para representar o número de profissionais. Ao conduzir essa análise, observamos que ambas as séries temporais seguem uma tendência de crescimento semelhante. Isso fortalece a compreensão de que o aumento no número de alunos assistidos pela ONG está diretamente associado à estrutura que ela consegue proporcionar. Essa constatação reforça a importância de investimentos e apoios contínuos para manter e fortalecer essa tendência positiva.'
 
@@ -139,19 +145,24 @@ with tab1:
     
     st.markdown(texto_justificado_3_tab1, unsafe_allow_html=True) 
 
-    # Removendo a coluna de ano
-    df_dados_sem_ano = df_dados_gerais.drop(columns=['Ano'])
+    def heatmap_correlacao(fig):
+        # O seaborn (e com ele o pyplot e o scipy) só é importado quando o heatmap precisa ser desenhado
+        import seaborn as sns
 
-    # Calculando a matriz de correlação
-    correlation_matrix = df_dados_sem_ano.corr()
+        # Removendo a coluna de ano
+        df_dados_sem_ano = df_dados_gerais.drop(columns=['Ano'])
 
-    # Criando um heatmap com Seaborn
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f")
-    plt.title('Matriz de Correlação')
+        # Calculando a matriz de correlação
+        correlation_matrix = df_dados_sem_ano.corr()
+
+        # Criando um heatmap com Seaborn
+        ax = fig.subplots()
+        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f", ax=ax)
+        ax.set_title('Matriz de Correlação')
 
     # Exibindo o heatmap
-    st.pyplot(plt)
+    st.image(figuras.imagem('matriz_correlacao', [dados.CAMINHO_DADOS_GERAIS], heatmap_correlacao, tamanho=(10, 8)),
+             use_column_width=True)
 
     paragrafo7_tab1 = 'De forma mais técnica, podemos examinar a matriz de correlação desses dados. É evidente que muitos números estão correlacionados, por isso, concentramos nossa análise na relação entre o total de alunos e o total de profissionais, onde observamos uma correlação positiva de 0.9. Embora não possamos afirmar com certeza, essa correlação sugere fortemente uma relação de causalidade, indicando mais uma vez que o crescimento no número de profissionais da <b>Passos Mágicos</b> possibilita à organização auxiliar um número cada vez maior de crianças e adolescentes.'
 
@@ -163,7 +174,7 @@ with tab1:
 
 
 
-with tab2:   
+def secao_forecast():
     st.markdown("## Forecast")
     
     paragrafo1_tab2 = 'Para entender o impacto do crescimento da <b>Passos Mágicos</b> foram aplicadas as seguintes técnicas de forecast: Média Móvel Simples, Regressão Linear Simples, Método Naive, Random Forest e Suavização Exponencial Simples.'
@@ -175,86 +186,107 @@ with tab2:
     st.markdown(texto_justificado_tab2, unsafe_allow_html=True) 
 
     # Dados existentes
-    anos_exist = df_dados_gerais['Ano'].values
-    alunos_exist = df_dados_gerais['Alunos'].values
+    df_dados_gerais = dados.carregar_dados_gerais()
+    serie_alunos = df_dados_gerais.set_index('Ano')['Alunos']
+    anos_exist = serie_alunos.index.values
+    alunos_exist = serie_alunos.values
+
+    # Cor de cada método: a mesma na linha da previsão e na faixa do intervalo
+    cores_metodos = {
+        'media_movel': (31, 119, 180),
+        'regressao_linear': (0, 128, 0),
+        'naive': (255, 127, 14),
+        'random_forest': (148, 103, 189),
+        'suavizacao_exponencial': (214, 39, 40),
+    }
 
-    # Previsão com média móvel simples
-    media_movel = np.mean(alunos_exist)
-    forecast_media_movel = np.full(len(anos_exist) + 5, media_movel)
-    forecast_media_movel = np.round(forecast_media_movel).astype(int)
-    
+    def faixa_intervalo(limites, cor, **kwargs):
+        # Polígono fechado: limite superior nos anos futuros e, de volta, o limite inferior
+        anos_faixa = np.concatenate([limites.index.values, limites.index.values[::-1]])
+        valores_faixa = np.concatenate([limites['superior'].values, limites['inferior'].values[::-1]])
+        return go.Scatter(x=anos_faixa, y=valores_faixa.round(), fill='toself', fillcolor='rgba({}, {}, {}, 0.12)'.format(*cor),
+                          line=dict(width=0), hoverinfo='skip', **kwargs)
 
-    # Previsão com regressão linear simples
-    modelo_regressao = LinearRegression()
-    modelo_regressao.fit(anos_exist.reshape(-1, 1), alunos_exist)
-    anos_futuros_regressao = np.arange(anos_exist[0], anos_exist[-1] + 6).reshape(-1, 1)
-    forecast_regressao = modelo_regressao.predict(anos_futuros_regressao)
-    forecast_regressao = np.round(forecast_regressao).astype(int)
-
-    # Previsão com método Naive
-    last_observation = alunos_exist[-1]
-    forecast_naive = np.full(len(anos_exist) + 5, last_observation)
-    forecast_naive = np.round(forecast_naive).astype(int)
-
-    # Previsão com Random Forest
-    modelo_random_forest = RandomForestRegressor()
-    modelo_random_forest.fit(anos_exist.reshape(-1, 1), alunos_exist)
-    anos_futuros_rf = np.arange(anos_exist[0], anos_exist[-1] + 6).reshape(-1, 1)
-    forecast_random_forest = modelo_random_forest.predict(anos_futuros_rf)
-    forecast_random_forest = np.round(forecast_random_forest).astype(int)
-
-    # Previsão com suavização exponencial simples
-    modelo_suav_exp = SimpleExpSmoothing(alunos_exist)
-    resultado_suav_exp = modelo_suav_exp.fit()
-    forecast_suav_exp = resultado_suav_exp.forecast(len(anos_exist) + 5)
-    forecast_suav_exp = np.round(forecast_suav_exp).astype(int)
-
-    # Criando o gráfico com Plotly
-    fig = go.Figure()
+    # Intervalos de 95% por bootstrap dos resíduos, calculados fora do dashboard e apenas lidos aqui (ver analytics/intervalos.py)
+    limites = intervalos.ler(serie_alunos, 5)
+    if limites is None:
+        st.info('Os intervalos de previsão ainda não foram calculados para estes dados. Calcule com: python -m analytics.intervalos')
 
-    # Adicionando dados existentes
-    fig.add_trace(go.Scatter(x=anos_exist, y=alunos_exist, mode='lines+markers', name='Total de Alunos', line=dict(width=3)))
+    def grafico_previsoes():
+        # Previsões de todos os métodos, ajustados uma única vez por versão dos dados (ver analytics/previsao.py)
+        previsoes = previsao.forecast(serie_alunos, 5).round().astype(int)
 
-    # Adicionando previsões
-    fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_media_movel, mode='lines', name='Média Móvel Simples', line=dict(dash='dash', width=1)))
-    fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_regressao, mode='lines', name='Regressão Linear Simples', line=dict(dash='dash', color='green', width=1)))
-    fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_naive, mode='lines', name='Método Naive', line=dict(dash='dash', width=1)))
-    fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_random_forest, mode='lines', name='Random Forest', line=dict(dash='dash', width=1)))
-    fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_suav_exp, mode='lines', name='Suavização Exponencial Simples', line=dict(dash='dash', width=1)))
+        # Criando o gráfico com Plotly
+        fig = go.Figure()
 
-    # Personalizando layout
-    fig.update_layout(title='Previsões de Alunos desde o Início até os Próximos 5 Anos',
-                    xaxis_title='Ano',
-                    yaxis_title='Total de Alunos')
+        # Adicionando dados existentes
+        fig.add_trace(go.Scatter(x=anos_exist, y=alunos_exist, mode='lines+markers', name='Total de Alunos', line=dict(width=3)))
+
+        # Adicionando previsões e os seus intervalos (clicar no método na legenda oculta os dois)
+        for metodo, nome_metodo in previsao.METODOS.items():
+            cor = cores_metodos[metodo]
+            if limites is not None:
+                fig.add_trace(faixa_intervalo(limites[metodo], cor, legendgroup=metodo, showlegend=False))
+            fig.add_trace(go.Scatter(x=previsoes.index.values, y=previsoes[metodo], mode='lines', name=nome_metodo, legendgroup=metodo,
+                                     line=dict(dash='dash', color='rgb({}, {}, {})'.format(*cor), width=1)))
+
+        # Personalizando layout
+        titulo = 'Previsões de Alunos desde o Início até os Próximos 5 Anos'
+        fig.update_layout(title=titulo if limites is None else f'{titulo} (faixas: intervalo de 95%)',
+                        xaxis_title='Ano',
+                        yaxis_title='Total de Alunos')
+        return fig
 
     # Exibindo o gráfico
-    st.plotly_chart(fig)
+    figuras.exibir(figuras.figura('previsoes', [dados.CAMINHO_DADOS_GERAIS], grafico_previsoes, parametros=(limites is not None,)))
 
-    paragrafo2_tab2 = 'Devido à limitada quantidade de dados disponíveis no conjunto de dados, técnicas que dependem de um volume maior de dados, como Naive Bayes, Random Forest e Suavização Exponencial Simples, não conseguiram atingir o desempenho esperado. A aplicação da Média Móvel Simples também não se mostrou adequada para o caso em questão. Ficou evidente que a utilização da Regressão Linear Simples produziu os melhores resultados, oferecendo uma visão precisa para análises de curto prazo.'
+    # Placar do backtesting com origem móvel, calculado fora do dashboard e apenas lido aqui (ver analytics/backtesting.py)
+    placar_metodos = backtesting.ler(serie_alunos)
 
-    texto_justificado_1_tab2 = f"""
-        <p style="text-align: justify;">{paragrafo2_tab2}</p>
-    """
-    
-    st.markdown(texto_justificado_1_tab2, unsafe_allow_html=True) 
+    if placar_metodos is None:
+        st.info('O placar do backtesting ainda não foi calculado para estes dados. Calcule com: python -m analytics.backtesting')
+    else:
+        resumo_placar = backtesting.resumo(placar_metodos)
+        melhor_metodo = resumo_placar.index[0]
+        nome_melhor_metodo = previsao.METODOS[melhor_metodo]
 
+        paragrafo2_tab2 = f'Para comparar os métodos, cada um foi avaliado em um backtesting com origem móvel: a partir de {serie_alunos.index[backtesting.MINIMO_TREINO - 1]}, os modelos foram ajustados apenas aos anos anteriores e suas previsões para os {backtesting.HORIZONTE} anos seguintes foram comparadas com os valores observados. Com a limitada quantidade de dados disponíveis, o método com o menor erro médio foi <b>{nome_melhor_metodo}</b>, com erro absoluto médio (MAE) de {resumo_placar.loc[melhor_metodo, "mae"]:.0f} alunos e erro percentual médio (MAPE) de {resumo_placar.loc[melhor_metodo, "mape"]:.1f}%. O placar completo está na tabela abaixo, e o gráfico seguinte mostra a previsão do método selecionado.'
 
-    # Criando o gráfico com Plotly
-    fig = go.Figure()
+        texto_justificado_1_tab2 = f"""
+            <p style="text-align: justify;">{paragrafo2_tab2}</p>
+        """
 
-    # Adicionando dados existentes
-    fig.add_trace(go.Scatter(x=anos_exist, y=alunos_exist, mode='lines+markers', name='Dados Exist.'))
+        st.markdown(texto_justificado_1_tab2, unsafe_allow_html=True)
 
-    # Adicionando previsões
-    fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_regressao, mode='lines', name='Regressão Linear Simples', line=dict(dash='dash', color='green')))
+        st.dataframe(resumo_placar.rename(index=previsao.METODOS, columns={'mae': 'MAE (alunos)', 'mape': 'MAPE (%)'}).rename_axis('Método').round(1))
 
-    # Personalizando layout
-    fig.update_layout(title='Total de Alunos + Regressão Linear Simples (5 anos)',
-                    xaxis_title='Ano',
-                    yaxis_title='Total de Alunos')
 
-    # Exibindo o gráfico
-    st.plotly_chart(fig)
+        def grafico_melhor_metodo():
+            forecast_melhor = previsao.forecast(serie_alunos, 5, metodos=[melhor_metodo])[melhor_metodo].round().astype(int)
+            anos_futuros_melhor = forecast_melhor.index.values
+
+            # Criando o gráfico com Plotly
+            fig = go.Figure()
+
+            # Adicionando dados existentes
+            fig.add_trace(go.Scatter(x=anos_exist, y=alunos_exist, mode='lines+markers', name='Dados Exist.'))
+
+            # Adicionando previsões
+            cor = cores_metodos[melhor_metodo]
+            if limites is not None:
+                fig.add_trace(faixa_intervalo(limites[melhor_metodo], cor, name='Intervalo de 95%'))
+            fig.add_trace(go.Scatter(x=anos_futuros_melhor, y=forecast_melhor, mode='lines', name=nome_melhor_metodo,
+                                     line=dict(dash='dash', color='rgb({}, {}, {})'.format(*cor))))
+
+            # Personalizando layout
+            fig.update_layout(title=f'Total de Alunos + {nome_melhor_metodo} (5 anos)',
+                            xaxis_title='Ano',
+                            yaxis_title='Total de Alunos')
+            return fig
+
+        # Exibindo o gráfico
+        figuras.exibir(figuras.figura('melhor_metodo', [dados.CAMINHO_DADOS_GERAIS], grafico_melhor_metodo,
+                                      parametros=(melhor_metodo, limites is not None)))
     
     
     st.markdown("### Cenários de Crescimento (What-if)")
@@ -267,47 +299,43 @@ with tab2:
     
     st.markdown(texto_justificado_2_tab2, unsafe_allow_html=True)
     
-    input_aumento = st.number_input('Percentual de aumento (1 = 100%):', value=0.5, step=0.1)
+    input_aumentos = st.slider('Faixa de percentual de aumento (1 = 100%):', min_value=0.0, max_value=2.0, value=(0.0, 1.0), step=0.1)
+    input_passo = st.number_input('Intervalo entre cenários:', value=0.1, min_value=0.05, max_value=1.0, step=0.05)
     input_anos = st.slider('Número de anos:', min_value=1, max_value=10, value=5)
-                    
-    if st.button('Simulação'):
-        aumento = input_aumento
-        anos = input_anos
-
-        # Aplicando o aumento ao conjunto de dados original
-        alunos_exist_aumento = alunos_exist * (1 + aumento)
-
-        # Ajustando a regressão linear ao conjunto de dados com aumento
-        modelo_regressao_aumento = LinearRegression()
-        modelo_regressao_aumento.fit(anos_exist.reshape(-1, 1), alunos_exist_aumento)
 
-        anos_futuros_regressao = np.arange(anos_exist[0], anos_exist[-1] + anos).reshape(-1, 1)
-        forecast_regressao_aumento = modelo_regressao_aumento.predict(anos_futuros_regressao)
+    # Todos os cenários em uma única operação vetorizada sobre a reta em cache do forecast (ver analytics/cenarios.py)
+    aumentos = cenarios.fatores_aumento(*input_aumentos, input_passo)
+    projecoes = cenarios.projetar(serie_alunos, aumentos, input_anos).round().astype(int)
 
-        # Arredondando os valores de forecast_regressao_aumento para inteiros
-        forecast_regressao_aumento_int = np.round(forecast_regressao_aumento).astype(int)
+    cores = plotly.colors.sample_colorscale('Greens', np.linspace(0.35, 1, len(aumentos)))
 
+    # Criando o gráfico em leque com Plotly
+    fig = go.Figure()
 
-        # Criando o gráfico com Plotly
-        fig = go.Figure()
-
-        # Adicionando dados existentes
-        fig.add_trace(go.Scatter(x=anos_exist, y=alunos_exist, mode='lines+markers', name='Dados Exist.'))
+    # Adicionando previsões
+    for aumento, cor in zip(aumentos, cores):
+        fig.add_trace(go.Scatter(x=projecoes.columns, y=projecoes.loc[aumento], mode='lines', name=f'+{aumento:.0%}', line=dict(dash='dash', color=cor, width=1)))
 
-        # Adicionando previsões
-        fig.add_trace(go.Scatter(x=anos_futuros_regressao.flatten(), y=forecast_regressao_aumento_int, mode='lines', name='Regressão Linear Simples', line=dict(dash='dash', color='green')))
+    # Adicionando dados existentes
+    fig.add_trace(go.Scatter(x=anos_exist, y=alunos_exist, mode='lines+markers', name='Dados Exist.', line=dict(color='#1f77b4', width=3)))
 
-        # Personalizando layout
-        fig.update_layout(title='Cenários de Crescimento (What-if)',
-                        xaxis_title='Ano',
-                        yaxis_title='Total de Alunos')
+    # Personalizando layout
+    fig.update_layout(title='Cenários de Crescimento (What-if)',
+                    xaxis_title='Ano',
+                    yaxis_title='Total de Alunos',
+                    legend_title='Aumento')
 
-        # Exibindo o gráfico
-        st.plotly_chart(fig)
+    # Exibindo o gráfico
+    figuras.exibir(fig)
 
+    # Total de alunos projetado ao final de cada horizonte, por cenário
+    tabela_cenarios = cenarios.tabela_horizontes(projecoes, anos_exist[-1], range(1, input_anos + 1))
+    tabela_cenarios.index = [f'+{aumento:.0%}' for aumento in tabela_cenarios.index]
+    tabela_cenarios.columns = [str(anos_exist[-1] + horizonte) for horizonte in tabela_cenarios.columns]
+    st.write(tabela_cenarios)
 
-with tab3:      
 
+def secao_ponto_virada():
     st.markdown("## Ponto de Virada")
 
     paragrafo1_tab3 = 'O <b>Ponto de Virada</b> representa um estágio crucial no desenvolvimento do aluno, no qual ele manifesta ativamente várias dimensões de sua jornada dentro da Associação. Nesse momento, é essencial que o aluno esteja consciente da importância da educação ao reconhecer o valor do conhecimento adquirido e a relevância do aprendizado como processo de construção de novos conhecimentos. Passar pelo <b>Ponto de Virada</b> deve significar que o aluno está pronto para protagonizar a transformação de sua vida por meio da educação onde outrora era coadjuvante.'
@@ -320,44 +348,71 @@ with tab3:
 
     st.markdown(texto_justificado_tab3, unsafe_allow_html=True)
 
-    # Lendo o arquivo CSV gerado e transformando ele em um XLSX antes de lê-lo
-    df = pd.read_csv("dados/dados.csv", sep = ";", encoding = "iso-8859-1")
-    df.to_excel("dados/dados.xlsx", index = False)
-    df = pd.read_excel("dados/dados.xlsx")
+    # Cubo de agregados gravado com cada partição na ingestão; as tabelas e gráficos são fatias dele (ver analytics/cubo.py)
+    cubo_alunos = dados.carregar_cubo_alunos()
+
+    # Filtros de detalhamento, resolvidos como interseção de máscaras pré-calculadas (ver analytics/filtros.py)
+    indice_filtros = dados.carregar_indice_filtros()
 
-    # Ajustando algumas colunas do DF
-    df['INDE']  = pd.to_numeric(df['INDE'], errors='coerce')
-    df['IAA']   = pd.to_numeric(df['IAA'], errors='coerce')
-    df['IEG']   = pd.to_numeric(df['IEG'], errors='coerce')
-    df['IPS']   = pd.to_numeric(df['IPS'], errors='coerce')
-    df['IDA']   = pd.to_numeric(df['IDA'], errors='coerce')
-    df['IPP']   = pd.to_numeric(df['IPP'], errors='coerce')
-    df['IPV']   = pd.to_numeric(df['IPV'], errors='coerce')
-    df['IAN']   = pd.to_numeric(df['IAN'], errors='coerce')
+    st.sidebar.markdown("## Filtros do Ponto de Virada")
 
-    # Criando uma coluna para conseguir ordenar os alunos de acordo com o número deles
-    df['NUMERO_ALUNO'] = df['ALUNO'].str.split('-').str[1].astype(int)
+    filtros_tab3 = {
+        'ANO': st.sidebar.multiselect('Ano', indice_filtros.categorias['ANO']),
+        'FASE': st.sidebar.multiselect('Fase', indice_filtros.categorias['FASE'], format_func=lambda fase: f'{fase:g}'),
+        'FASE_TURMA': st.sidebar.multiselect('Fase/Turma', indice_filtros.categorias['FASE_TURMA']),
+        'PEDRA': st.sidebar.multiselect('Pedra', indice_filtros.categorias['PEDRA']),
+        'INSTITUICAO_ENSINO_ALUNO': st.sidebar.multiselect('Instituição de ensino', indice_filtros.categorias['INSTITUICAO_ENSINO_ALUNO']),
+        'BOLSISTA': st.sidebar.multiselect('Bolsista', indice_filtros.categorias['BOLSISTA']),
+    }
+    filtros_tab3 = {dimensao: valores for dimensao, valores in filtros_tab3.items() if valores}
+
+    # Sem filtros, o cubo gravado na ingestão já tem tudo o que a aba precisa
+    cubo_tab3 = indice_filtros.cubo(filtros_tab3) if filtros_tab3 else cubo_alunos
+
+    # Combinações de filtros sem nenhum aluno com Ponto de Virada informado (ex.: Bolsista só existe em 2022)
+    selecao_vazia = cubo.contagem(cubo_tab3).to_numpy().sum() == 0
+    mensagem_selecao_vazia = 'Nenhum aluno com Ponto de Virada informado para os filtros selecionados.'
+
+    # Testes de permutação de todas as medidas e anos da seleção, calculados uma vez por filtro (ver analytics/significancia.py)
+    testes_tab3 = None if selecao_vazia else dados.carregar_testes_ponto_virada().testar(filtros_tab3)
 
-    # Apagando os dados dos alunos que acabaram sendo disponibilizados com erros
-    df.drop(df[(df['ALUNO'] == 'ALUNO-1259')].index, inplace = True)
-    df.drop(df[df['PONTO_VIRADA'] == '#NULO!'].index, inplace = True)
+    def tabela_testes(medidas):
+        testes = testes_tab3[testes_tab3.index.get_level_values('MEDIDA').isin(medidas)]
+        tabela = testes[['diferenca', 'ic_inferior', 'ic_superior', 'd_cohen', 'p_valor', 'p_holm']].reset_index()
+        tabela['ANO'] = tabela['ANO'].astype(str)
+        return tabela.rename(columns={'MEDIDA': 'Medida', 'diferenca': 'Diferença (Sim - Não)', 'ic_inferior': 'IC 95% inferior',
+                                      'ic_superior': 'IC 95% superior', 'd_cohen': 'd de Cohen', 'p_valor': 'p (permutação)',
+                                      'p_holm': 'p (Holm)'}).round(3)
+
+    legenda_testes = (f'Diferença entre as médias dos alunos com e sem Ponto de Virada, com intervalo de confiança de 95% (Welch), '
+                      f'tamanho de efeito (d de Cohen) e p-valor de {significancia.PERMUTACOES} permutações dos rótulos dentro de cada ano, '
+                      f'também ajustado por Holm para todos os testes da seleção.')
 
        
     st.markdown("### Alunos que atingiram ou não o Ponto de Virada")
 
-    df_ponto_virada = df.groupby(["ANO", "PONTO_VIRADA"])["PONTO_VIRADA"].count().unstack().fillna(0)
-   
-    fig = px.bar(df_ponto_virada, 
-                 x=df_ponto_virada.index, 
-                 y=df_ponto_virada.columns,
-                 labels={'value': 'Quantidade', 'variable': 'Ponto de Virada'},                 
-                 barmode='group')
-    
-    fig.update_layout(yaxis_range=[0, 1000])  # Limitar o eixo y entre 0 e 1000
-    fig.update_xaxes(title="Ano")  
-    fig.update_yaxes(title="Quantidade")
-    fig.update_layout(legend_title="Ponto de Virada")     
-    st.plotly_chart(fig)
+    def grafico_ponto_virada():
+        import plotly.express as px
+
+        df_ponto_virada = cubo.contagem(cubo_tab3)
+
+        fig = px.bar(df_ponto_virada, 
+                     x=df_ponto_virada.index, 
+                     y=df_ponto_virada.columns,
+                     labels={'value': 'Quantidade', 'variable': 'Ponto de Virada'},                 
+                     barmode='group')
+
+        if not filtros_tab3:
+            fig.update_layout(yaxis_range=[0, 1000])  # Limitar o eixo y entre 0 e 1000
+        fig.update_xaxes(title="Ano")  
+        fig.update_yaxes(title="Quantidade")
+        fig.update_layout(legend_title="Ponto de Virada")     
+        return fig
+
+    if selecao_vazia:
+        st.info(mensagem_selecao_vazia)
+    else:
+        figuras.exibir(figuras.figura('ponto_virada', dados.arquivos_alunos(), grafico_ponto_virada, filtros_tab3))
 
     paragrafo3_tab0 = 'Podemos observar que o <b>Ponto de Virada</b> é alcançado por apenas uma minoria dos alunos, representando um percentual relativamente baixo, situado na faixa dos 15% nos anos de 2020 e 2022. O ano de 2021 apresenta um percentual de cerca de 18%, mas com uma quantidade menor de alunos em momento de <b>Ponto de Virada</b>. Ao passo que em 2022, apesar de voltar ao percentual médio, a quantidade de alunos nesse momento aumenta significativamente, o que pode indicar resiliência em manter os resultados alcançados, considerando o período após a pandemia e o aumento conjunto no quadro de profissionais atuantes na ONG. O indicativo de que a maioria dos alunos não experimenta esse ponto de transformação ou mudança significativa em seu processo educacional durante esses períodos analisados levanta questões sobre os fatores subjacentes que influenciam essa pequena porcentagem de alunos e o que pode ser feito para aumentar o alcance desse ponto crítico de desenvolvimento educacional. Afinal, o envolvimento de outros profissionais, mais relacionados ao acompanhamento psíquico, emocional e social para além da vertente pedagógica ainda é recente e a proporção de professores e alunos se manteve crescente.'
 
@@ -369,39 +424,42 @@ with tab3:
 
     st.markdown("### Número de Profissionais Atuando na ONG")
 
-    df_ponto_virada_sim = df[df['PONTO_VIRADA'] == "Sim"].groupby(["ANO"])["PONTO_VIRADA"].count()
+    # A comparação com o número de profissionais considera sempre todos os alunos
+    df_ponto_virada_sim = cubo.contagem(cubo_alunos)["Sim"]
     
-    fig, ax1 = plt.subplots()    
-    anos = df_ponto_virada_sim.index.tolist()
-    ax1.plot(anos, df_ponto_virada_sim, marker="o", linestyle="-", color="b")
-    ax1.set_xlabel("Ano")
-    ax1.set_ylabel("Alunos que atingiram o Ponto de Virada", color="b")
-    ax1.set_ylim(80, 130)
-    ax1.tick_params(axis='y', labelcolor='b')
-
-    # Adicionar os valores de cada ponto com posição ajustada
-    for i, txt in enumerate(df_ponto_virada_sim):
-        ax1.text(anos[i], txt + 0.3, str(txt), ha='center', va='bottom')  # Ajustando a posição vertical
-
-    # Definir os anos como categorias no eixo X
-    ax1.set_xticks(anos)
-
-    # Adicionar o segundo eixo Y
-    ax2 = ax1.twinx()
-    valores_secundarios = {2020: 12, 2021: 16, 2022: 21}  # Número de profissionais trabalhando na ONG em cada ano
-    valores_secundarios_anos = list(valores_secundarios.keys())
-    valores_secundarios_valores = list(valores_secundarios.values())
-    ax2.plot(valores_secundarios_anos, valores_secundarios_valores, marker="s", linestyle="--", color="g")
-    ax2.set_ylabel("Número de profissionais", color="g")
-    ax2.tick_params(axis='y', labelcolor='g')
-
-    # Adicionar os valores de cada ponto do segundo eixo Y com posição ajustada
-    for i, valor in enumerate(valores_secundarios_valores):
-        ax2.text(valores_secundarios_anos[i], valor + 0.15, str(valor), ha='center', va='bottom', color='g')  # Ajustando a posição vertical
+    def grafico_profissionais_ponto_virada(fig):
+        ax1 = fig.subplots()
+        anos = df_ponto_virada_sim.index.tolist()
+        ax1.plot(anos, df_ponto_virada_sim, marker="o", linestyle="-", color="b")
+        ax1.set_xlabel("Ano")
+        ax1.set_ylabel("Alunos que atingiram o Ponto de Virada", color="b")
+        ax1.set_ylim(80, 130)
+        ax1.tick_params(axis='y', labelcolor='b')
 
-    
-    plt.grid(True)    
-    st.pyplot(fig)
+        # Adicionar os valores de cada ponto com posição ajustada
+        for i, txt in enumerate(df_ponto_virada_sim):
+            ax1.text(anos[i], txt + 0.3, str(txt), ha='center', va='bottom')  # Ajustando a posição vertical
+
+        # Definir os anos como categorias no eixo X
+        ax1.set_xticks(anos)
+
+        # Adicionar o segundo eixo Y
+        ax2 = ax1.twinx()
+        valores_secundarios = {2020: 12, 2021: 16, 2022: 21}  # Número de profissionais trabalhando na ONG em cada ano
+        valores_secundarios_anos = list(valores_secundarios.keys())
+        valores_secundarios_valores = list(valores_secundarios.values())
+        ax2.plot(valores_secundarios_anos, valores_secundarios_valores, marker="s", linestyle="--", color="g")
+        ax2.set_ylabel("Número de profissionais", color="g")
+        ax2.tick_params(axis='y', labelcolor='g')
+
+        # Adicionar os valores de cada ponto do segundo eixo Y com posição ajustada
+        for i, valor in enumerate(valores_secundarios_valores):
+            ax2.text(valores_secundarios_anos[i], valor + 0.15, str(valor), ha='center', va='bottom', color='g')  # Ajustando a posição vertical
+
+        ax2.grid(True)
+
+    st.image(figuras.imagem('profissionais_ponto_virada', dados.arquivos_alunos(), grafico_profissionais_ponto_virada),
+             use_column_width=True)
 
     paragrafo4_tab0 = 'Ao analisarmos a relação entre o número de profissionais na ONG e o número de alunos que alcançaram o <b>Ponto de Virada</b>, podemos observar um crescimento gradual, embora modesto. Inicialmente, a proporção era de 12,77%, aumentando para 14,81% e posteriormente para 18,58%. Essa tendência sugere uma possível correlação entre o aumento do suporte oferecido pelos profissionais da ONG e o crescimento do número de alunos capazes de atingir esse marco educacional crucial. Reforçando a resiliência em manter proporcionalmente os resultados com o aumento da quantidade de alunos e indicando que o envolvimento de profissionais voltados ao bem estar psíquico, emocional e social podem trazer resultados maiores no médio-prazo.'
     
@@ -413,9 +471,15 @@ with tab3:
 
     st.markdown("### Notas de Português e Matemática")
 
-    media_por_ano_com_pv = df.groupby(['ANO', 'PONTO_VIRADA'])[['NOTA_MAT', 'NOTA_PORT', 'NOTA_ING']].mean().reset_index()
-    media_por_ano_com_pv['ANO'] = media_por_ano_com_pv['ANO'].astype(str)    
-    st.write(media_por_ano_com_pv)
+    if selecao_vazia:
+        st.info(mensagem_selecao_vazia)
+    else:
+        media_por_ano_com_pv = cubo.medias(cubo_tab3, ['NOTA_MAT', 'NOTA_PORT', 'NOTA_ING']).reset_index()
+        media_por_ano_com_pv['ANO'] = media_por_ano_com_pv['ANO'].astype(str)
+        st.write(media_por_ano_com_pv)
+
+        st.dataframe(tabela_testes(['NOTA_MAT', 'NOTA_PORT', 'NOTA_ING']), hide_index=True)
+        st.caption(legenda_testes)
 
     paragrafo5_tab0 = 'Apesar de os dados das notas de Matemática, Português e Inglês estarem disponíveis apenas para o ano de 2022, é evidente que uma discrepância significativa na média das notas é observada entre os alunos que atingiram o <b>Ponto de Virada</b> e aqueles que não o alcançaram. Isso sugere que a percepção desse ponto crítico ocorreu em um período em que os alunos estavam mais dedicados às aulas e avaliações. Esta observação implica não apenas na importância da dedicação dos alunos, mas também levanta questões sobre o papel do currículo, dos métodos de ensino e do ambiente educacional no processo de alcance desse <b>Ponto de Virada</b>.'
 
@@ -427,10 +491,16 @@ with tab3:
     
     st.markdown("### Média dos Indicadores")
 
-    medias = df.groupby(['ANO', 'PONTO_VIRADA'])[['INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN']].mean()    
-    medias.reset_index(inplace=True)   
-    medias['ANO'] = medias['ANO'].astype(int).astype(str)
-    st.write(medias)
+    if selecao_vazia:
+        st.info(mensagem_selecao_vazia)
+    else:
+        medias = cubo.medias(cubo_tab3, ['INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN'])
+        medias.reset_index(inplace=True)
+        medias['ANO'] = medias['ANO'].astype(int).astype(str)
+        st.write(medias)
+
+        st.dataframe(tabela_testes(['INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN']), hide_index=True)
+        st.caption(legenda_testes)
 
     paragrafo6_tab0 = 'Da mesma forma que foi observado com as notas, uma tendência semelhante se manifestou nos diversos indicadores avaliados. Incluindo autoavaliação, engajamento, aspectos psicossociais, aprendizado e avaliação psicopedagógica. Essa consistência sugere que há uma inter-relação complexa entre esses diferentes aspectos do desenvolvimento do aluno. Essa análise mais profunda aponta para a necessidade de uma abordagem holística na compreensão do progresso educacional, levando em consideração não apenas o desempenho acadêmico, mas também fatores socioemocionais e psicopedagógicos que impactam o processo de aprendizagem e crescimento pessoal do aluno, possibilitando uma maior clareza de propósito na jornada da educação e aumentando o potencial do <b>Ponto de Virada</b>.'
 
@@ -440,9 +510,73 @@ with tab3:
 
     st.markdown(texto_justificado_5_tab3, unsafe_allow_html=True)
 
+    st.markdown("### Propensão ao Ponto de Virada")
+
+    # Probabilidades da tabela inteira, pontuadas em lote com o modelo treinado offline (ver analytics/propensao.py)
+    modelo_propensao = dados.carregar_modelo_propensao()
+
+    if modelo_propensao is None:
+        st.info('Nenhum modelo de propensão treinado. Treine com: python -m analytics.propensao')
+    else:
+        df_alunos = dados.carregar_alunos()
+        probabilidades = dados.carregar_propensao()
+
+        ano_coorte = st.selectbox('Ano da coorte:', indice_filtros.categorias['ANO'], index=len(indice_filtros.categorias['ANO']) - 1)
+        lista_propensao = st.radio('Lista:', ['Mais próximos de atingir', 'Em risco de não atingir'], horizontal=True)
+        quantidade_lista = st.number_input('Alunos na lista:', value=20, min_value=5, max_value=200, step=5)
+
+        # Alunos da coorte, dentro dos filtros da barra lateral, que ainda não atingiram o Ponto de Virada
+        selecionados = np.flatnonzero(indice_filtros.mascara({**filtros_tab3, 'ANO': [ano_coorte]}) & (df_alunos['PONTO_VIRADA'].to_numpy() == 'Não'))
+        ordem = np.argsort(probabilidades[selecionados], kind='stable')
+        if lista_propensao == 'Mais próximos de atingir':
+            ordem = ordem[::-1]
+        linhas_lista = selecionados[ordem[:quantidade_lista]]
+
+        df_propensao = df_alunos.iloc[linhas_lista][['ALUNO', 'FASE', 'PEDRA', 'INDE', 'IDA', 'IEG', 'IAA']]
+        df_propensao.insert(1, 'PROPENSAO (%)', probabilidades[linhas_lista] * 100)
+        st.dataframe(df_propensao.round(1), hide_index=True)
+
+        metricas_propensao = modelo_propensao.metricas
+        st.caption(f'Modelo v{modelo_propensao.versao} (regressão logística), validado em {metricas_propensao["ano_validacao"]}: '
+                   f'AUC {metricas_propensao["auc"]:.2f}. {len(selecionados)} alunos da coorte ainda não atingiram o Ponto de Virada.')
+        if modelo_propensao.particoes_desatualizadas:
+            st.warning('O modelo foi treinado com dados diferentes das partições atuais; treine novamente com: python -m analytics.propensao')
+
+    st.markdown("### Trajetória do Aluno")
 
-with tab4:      
+    # Consulta por busca binária na tabela ordenada por aluno (ver analytics/trajetoria.py)
+    indice_alunos = dados.carregar_indice_alunos()
 
+    busca_aluno = st.text_input('Aluno (ex.: ALUNO-1 ou 1):')
+
+    if busca_aluno:
+        numero_aluno = trajetoria.numero_aluno(busca_aluno)
+
+        if numero_aluno is None or numero_aluno not in indice_alunos:
+            st.warning('Aluno não encontrado.')
+        else:
+            df_trajetoria = trajetoria.transicoes_ponto_virada(indice_alunos.trajetoria(numero_aluno))
+
+            def grafico_trajetoria():
+                fig = go.Figure()
+
+                for indicador in ['INDE', 'IAA', 'IEG', 'IPS', 'IDA', 'IPP', 'IPV', 'IAN']:
+                    fig.add_trace(go.Scatter(x=df_trajetoria['ANO'], y=df_trajetoria[indicador], mode='lines+markers', name=indicador))
+
+                fig.update_layout(title=f'Evolução dos Indicadores do ALUNO-{numero_aluno}',
+                                xaxis_title='Ano',
+                                yaxis_title='Valor',
+                                legend_title='Indicador')
+                fig.update_xaxes(tickvals=df_trajetoria['ANO'])
+                return fig
+
+            figuras.exibir(figuras.figura('trajetoria', dados.arquivos_alunos(), grafico_trajetoria, numero_aluno))
+
+            df_trajetoria['ANO'] = df_trajetoria['ANO'].astype(str)
+            st.write(df_trajetoria)
+
+
+def secao_ideb():
     st.markdown("## IDEB")
 
     paragrafo1_tab4 = 'O Índice de Desenvolvimento da Educação Básica (IDEB) é uma métrica utilizada no Brasil para avaliar a qualidade do ensino nas escolas públicas, levando em conta o desempenho dos alunos em avaliações padronizadas e a taxa de aprovação. Sua importância reside no fato de que oferece um panorama objetivo sobre a eficácia do sistema educacional, permitindo identificar pontos fortes e fracos e orientando políticas públicas para melhorar o ensino.'
@@ -456,35 +590,18 @@ with tab4:
 
     st.markdown(texto_justificado_1_tab4, unsafe_allow_html=True)
 
-    df_ideb_por_escola = pd.read_excel('dados/ideb_saeb_por_escola.xlsx')
-    df_ideb_por_escola_embu_guacu = df_ideb_por_escola[df_ideb_por_escola['nome_municipio'] == 'Embu-Guaçu']
-    df_ideb_por_escola_embu_guacu = df_ideb_por_escola_embu_guacu[df_ideb_por_escola_embu_guacu['ideb'] != '-']
-    df_ideb_por_escola_embu_guacu[['saeb_matematica', 'saeb_portugues', 'saeb_nota_media', 'ideb']] = df_ideb_por_escola_embu_guacu[['saeb_matematica', 'saeb_portugues', 'saeb_nota_media', 'ideb']].astype(float)
+    # Apenas as partições de Embu-Guaçu são lidas, já tipadas (ver analytics/ideb.py)
+    df_ideb_por_escola_embu_guacu = dados.carregar_ideb_por_escola('Embu-Guaçu', uf='SP').dropna(subset=['ideb'])
 
+    df_ideb_por_municipio = dados.carregar_ideb_por_municipio('Embu-Guaçu', uf='SP')
 
-    df_ideb_por_municipio = pd.read_excel('dados/ideb_saeb_por_municipio.xlsx')
+    # Escolas divididas uma única vez por ciclo x ano; todos os gráficos saem dessas partições (ver analytics/graficos_ideb.py)
+    graficos = graficos_ideb.GraficosIdeb(df_ideb_por_escola_embu_guacu, df_ideb_por_municipio, 'Embu-Guaçu')
+    arquivos_ideb_embu_guacu = dados.arquivos_ideb('Embu-Guaçu', uf='SP')
 
     st.markdown("### IDEB do Município de Embu-Guaçu")
 
-    fig0 = go.Figure()
-
-    fig0.add_trace(go.Bar(x=df_ideb_por_municipio[(df_ideb_por_municipio['ano'] == 2017) & (df_ideb_por_municipio['rede'] == 'Pública')]['ciclo'], 
-                        y=df_ideb_por_municipio[(df_ideb_por_municipio['ano'] == 2017) & (df_ideb_por_municipio['rede'] == 'Pública')]['ideb'], 
-                        name='2017'))
-    fig0.add_trace(go.Bar(x=df_ideb_por_municipio[(df_ideb_por_municipio['ano'] == 2019) & (df_ideb_por_municipio['rede'] == 'Pública')]['ciclo'], 
-                        y=df_ideb_por_municipio[(df_ideb_por_municipio['ano'] == 2019) & (df_ideb_por_municipio['rede'] == 'Pública')]['ideb'], 
-                        name='2019'))
-    fig0.add_trace(go.Bar(x=df_ideb_por_municipio[(df_ideb_por_municipio['ano'] == 2021) & (df_ideb_por_municipio['rede'] == 'Pública')]['ciclo'], 
-                        y=df_ideb_por_municipio[(df_ideb_por_municipio['ano'] == 2021) & (df_ideb_por_municipio['rede'] == 'Pública')]['ideb'], 
-                        name='2021'))
-
-    fig0.update_layout(title='Valor do IDEB do Município de Embu-Guaçu por Ano Escolar',
-                    xaxis_title='Ano Escolar',
-                    yaxis_title='IDEB',
-                    barmode='group',                    
-                    legend_title='Ano')
-
-    st.plotly_chart(fig0)
+    figuras.exibir(figuras.figura('ideb_municipio', arquivos_ideb_embu_guacu, graficos.municipio))
 
     paragrafo3_tab4 = 'Através da análise do gráfico, percebe-se um crescimento no IDEB entre os anos de 2017 e 2019 nos anos finais do ensino (do 6º ao 9º ano) e no ensino médio. Entretanto, ocorreu uma reversão nesse cenário nos anos subsequentes, com uma queda significativa nos valores do IDEB entre 2019 e 2021, principalmente nos anos iniciais do ensino (do 1º ao 5º ano). Esta diminuição acentuada pode ser atribuída, em grande parte, aos desafios enfrentados durante a pandemia de COVID-19. O impacto da interrupção das aulas presenciais, adaptações no ensino remoto e as disparidades no acesso às tecnologias educacionais podem ter contribuído para esse declínio no desempenho educacional, evidenciando a necessidade de estratégias específicas de recuperação e apoio pedagógico para mitigar esses efeitos adversos.'
 
@@ -496,61 +613,8 @@ with tab4:
 
     st.markdown("### IDEB por Escola do Município de Embu-Guaçu")
 
-    df_ideb_por_escola_embu_guacu = df_ideb_por_escola_embu_guacu.sort_values(by='ideb', ascending=False)
-
-    fig1 = go.Figure()
-
-    fig1.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]['ideb'], name='2017'))
-    fig1.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]['ideb'], name='2019'))
-    fig1.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]['ideb'], name='2021'))
-
-    fig1.update_layout(title='Valor do IDEB por Escola do Município de Embu-Guaçu nos Anos Iniciais (1º ao 5º ano)',
-                    xaxis_title='Escolas',
-                    yaxis_title='IDEB',
-                    barmode='group',
-                    legend_title='Ano',
-                    width=900,  
-                    height=600,  
-                    yaxis_tickangle=-45)  
-    
-    st.plotly_chart(fig1)
-
-
-   
-    fig2 = go.Figure()
-
-    fig2.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]['ideb'], name='2017'))
-    fig2.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]['ideb'], name='2019'))
-    fig2.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]['ideb'], name='2021'))
-    
-    fig2.update_layout(title='Valor do IDEB por Escola do Município de Embu-Guaçu nos Anos Finais (6º ao 9º ano)',
-                    xaxis_title='Escolas',
-                    yaxis_title='IDEB',
-                    barmode='group',
-                    legend_title='Ano',
-                    width=800,
-                    height=600, 
-                    yaxis_tickangle=-45)
-  
-    st.plotly_chart(fig2)
-
-    
-    fig3 = go.Figure()
-
-    fig3.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]['ideb'], name='2017'))
-    fig3.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]['ideb'], name='2019'))
-    fig3.add_trace(go.Bar(x=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]['nome_escola'], y=df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]['ideb'], name='2021'))
-
-    fig3.update_layout(title='Valor do IDEB por Escola do Município de Embu-Guaçu no Ensino Médio',
-                    xaxis_title='Escolas',
-                    yaxis_title='IDEB',
-                    barmode='group',
-                    legend_title='Ano',
-                    width=600, 
-                    height=500, 
-                    yaxis_tickangle=-45) 
-   
-    st.plotly_chart(fig3)
+    for ciclo in graficos.ciclos:
+        figuras.exibir(figuras.figura('ideb_por_ciclo', arquivos_ideb_embu_guacu, lambda: graficos.por_ciclo(ciclo), ciclo))
 
     paragrafo4_tab4 = 'O comportamento do Índice de Desenvolvimento da Educação Básica (IDEB) no município de Embu-Guaçu reflete-se de forma semelhante nos dados específicos por escola, revelando uma tendência de declínio nos anos recentes, especialmente entre 2019 e 2021, em decorrência dos impactos da pandemia.'
 
@@ -563,104 +627,8 @@ with tab4:
 
     st.markdown("#### IDEB por Escola e por Ano nos Anos Iniciais (1º ao 5º ano)")
 
-
-    df_2017 = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]
-
-    df_2017 = df_2017.sort_values(by='ideb', ascending=True)   
-    ideb_2017 = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'AI') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2017)]['ideb'].mean()
-       
-    colors = ['#1f77b4' if ideb >= ideb_2017 else '#aec7e8' for ideb in df_2017['ideb']]
-    
-    fig4 = go.Figure()
-    
-    fig4.add_trace(go.Bar(x=df_2017['ideb'], y=df_2017['nome_escola'],
-                        name='2017', orientation='h', marker_color=colors))
-    
-    fig4.add_vline(x=ideb_2017, line_dash="dash", line_color="black")
-    
-    fig4.add_annotation(x=ideb_2017 + 0.2, y=15, text=f"IDEB Embu-Guaçu: {ideb_2017}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig4.update_layout(title='Valor do IDEB 2017 por Escola do Município de Embu-Guaçu nos Anos Iniciais (1º ao 5º ano)',
-                    xaxis_title='IDEB 2017',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=600,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig4)
-
-    df_2019 = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]
-    df_2019 = df_2019.sort_values(by='ideb', ascending=True)
-    ideb_2019 = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'AI') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2019)]['ideb'].mean()
-
-    colors = ['#1f77b4' if ideb >= ideb_2019 else '#aec7e8' for ideb in df_2019['ideb']]
-
-    fig5 = go.Figure()
-    
-    fig5.add_trace(go.Bar(x=df_2019['ideb'], y=df_2019['nome_escola'],
-                        name='2019', orientation='h', marker_color=colors))
-    
-    fig5.add_vline(x=ideb_2019, line_dash="dash", line_color="black")
-    
-    fig5.add_annotation(x=ideb_2019 + 0.2, y=16, text=f"IDEB Embu-Guaçu: {ideb_2019}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig5.update_layout(title='Valor do IDEB 2019 por Escola do Município de Embu-Guaçu nos Anos Iniciais (1º ao 5º ano)',
-                    xaxis_title='IDEB 2019',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=600,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig5)
-
-
-    df_2021 = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AI')]
-    df_2021 = df_2021.sort_values(by='ideb', ascending=True)
-    ideb_2021 = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'AI') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2021)]['ideb'].mean()
-
-    colors = ['#1f77b4' if ideb >= ideb_2021 else '#aec7e8' for ideb in df_2021['ideb']]
-
-    fig6 = go.Figure()
-    
-    fig6.add_trace(go.Bar(x=df_2021['ideb'], y=df_2021['nome_escola'],
-                        name='2021', orientation='h', marker_color=colors))
-    
-    fig6.add_vline(x=ideb_2021, line_dash="dash", line_color="black")
-    
-    fig6.add_annotation(x=ideb_2021 + 0.2, y=15, text=f"IDEB Embu-Guaçu: {ideb_2021}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig6.update_layout(title='Valor do IDEB 2021 por Escola do Município de Embu-Guaçu nos Anos Iniciais (1º ao 5º ano)',
-                    xaxis_title='IDEB 2021',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=600,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig6)
+    for ano in graficos.anos:
+        figuras.exibir(figuras.figura('ideb_por_ano', arquivos_ideb_embu_guacu, lambda: graficos.por_ano('AI', ano), ('AI', ano)))
 
     paragrafo5_tab4 = 'Para avaliar o desempenho das escolas em relação ao Índice de Desenvolvimento da Educação Básica (IDEB) do município de Embu Guaçu, foram estabelecidos critérios específicos. As escolas consideradas com melhor desempenho foram aquelas que obtiveram notas superiores ao IDEB municipal nos anos de 2017, 2019 e 2021. Por outro lado, para identificar as escolas com desempenho inferior, foram consideradas aquelas que apresentaram notas abaixo do IDEB municipal nos três anos consecutivos.'
     paragrafo6_tab4 = 'Entre as escolas com melhor desempenho no IDEB nos Anos Iniciais (1º ao 5º ano), destacam-se: Hélio Luiz Dobrochinski Prof, Chácara Florida II e Pedro Villas Boas de Souza Dom.'
@@ -679,103 +647,8 @@ with tab4:
 
     st.markdown("#### IDEB por Escola e por Ano nos Anos Finais (6º ao 9º ano)")
 
-    df_2017_af = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]
-    df_2019_af = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]
-    df_2021_af = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'AF')]
-    
-    df_2017_af = df_2017_af.sort_values(by='ideb', ascending=True)
-    df_2019_af = df_2019_af.sort_values(by='ideb', ascending=True)
-    df_2021_af = df_2021_af.sort_values(by='ideb', ascending=True)
-
-    ideb_2017_af = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'AF') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2017)]['ideb'].mean()
-    ideb_2019_af = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'AF') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2019)]['ideb'].mean()
-    ideb_2021_af = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'AF') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2021)]['ideb'].mean()
-
-
-    colors1 = ['#1f77b4' if ideb >= ideb_2017_af else '#aec7e8' for ideb in df_2017_af['ideb']]
-    colors2 = ['#1f77b4' if ideb >= ideb_2019_af else '#aec7e8' for ideb in df_2019_af['ideb']]
-    colors3 = ['#1f77b4' if ideb >= ideb_2021_af else '#aec7e8' for ideb in df_2021_af['ideb']]
-
-
-    fig7 = go.Figure()
-    
-    fig7.add_trace(go.Bar(x=df_2017_af['ideb'], y=df_2017_af['nome_escola'],
-                        name='2017', orientation='h', marker_color=colors1))
-    
-    fig7.add_vline(x=ideb_2017_af, line_dash="dash", line_color="black")
-    
-    fig7.add_annotation(x=ideb_2017_af + 0.2, y=10, text=f"IDEB Embu-Guaçu: {ideb_2017_af}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig7.update_layout(title='Valor do IDEB 2017 por Escola do Município de Embu-Guaçu nos Anos Finais (6º ao 9º ano)',
-                    xaxis_title='IDEB 2017',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=600,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig7)
-
-
-    fig8 = go.Figure()
-    
-    fig8.add_trace(go.Bar(x=df_2019_af['ideb'], y=df_2019_af['nome_escola'],
-                        name='2019', orientation='h', marker_color=colors2))
-    
-    fig8.add_vline(x=ideb_2019_af, line_dash="dash", line_color="black")
-    
-    fig8.add_annotation(x=ideb_2019_af + 0.2, y=12, text=f"IDEB Embu-Guaçu: {ideb_2019_af}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig8.update_layout(title='Valor do IDEB 2019 por Escola do Município de Embu-Guaçu nos Anos Finais (6º ao 9º ano)',
-                    xaxis_title='IDEB 2019',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=600,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig8)
-
-
-    fig9 = go.Figure()
-    
-    fig9.add_trace(go.Bar(x=df_2021_af['ideb'], y=df_2021_af['nome_escola'],
-                        name='2021', orientation='h', marker_color=colors3))
-    
-    fig9.add_vline(x=ideb_2021_af, line_dash="dash", line_color="black")
-    
-    fig9.add_annotation(x=ideb_2021_af + 0.2, y=12, text=f"IDEB Embu-Guaçu: {ideb_2021_af}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig9.update_layout(title='Valor do IDEB 2021 por Escola do Município de Embu-Guaçu nos Anos Finais (6º ao 9º ano)',
-                    xaxis_title='IDEB 2021',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=600,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig9)
+    for ano in graficos.anos:
+        figuras.exibir(figuras.figura('ideb_por_ano', arquivos_ideb_embu_guacu, lambda: graficos.por_ano('AF', ano), ('AF', ano)))
 
     paragrafo9_tab4 = 'Os critérios de avaliação adotados foram os mesmos delineados anteriormente.'
     paragrafo10_tab4 = 'Entre as escolas que se destacaram pelo melhor desempenho no IDEB nos Anos Finais (6º ao 9º ano) estão: Alexandre Rodrigues Nogueira e Paschoal Carlos Magno. Por outro lado, aquelas que registraram um desempenho inferior no IDEB nos Anos Finais (6º ao 9º ano) foram: Olivia de Faria Nogueira e Loris Nassif Mattar Profa.'
@@ -792,102 +665,8 @@ with tab4:
 
     st.markdown("#### IDEB por Escola e por Ano no Ensino Médio")
 
-    df_2017_em = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2017) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]
-    df_2019_em = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2019) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]
-    df_2021_em = df_ideb_por_escola_embu_guacu[(df_ideb_por_escola_embu_guacu['ano'] == 2021) & (df_ideb_por_escola_embu_guacu['ciclo'] == 'EM')]
-    
-    df_2017_em = df_2017_em.sort_values(by='ideb', ascending=True)
-    df_2019_em = df_2019_em.sort_values(by='ideb', ascending=True)
-    df_2021_em = df_2021_em.sort_values(by='ideb', ascending=True)
-
-    ideb_2017_em = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'EM') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2017)]['ideb'].mean()
-    ideb_2019_em = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'EM') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2019)]['ideb'].mean()
-    ideb_2021_em = df_ideb_por_municipio[(df_ideb_por_municipio['ciclo'] == 'EM') & (df_ideb_por_municipio['rede'] == 'Pública') & (df_ideb_por_municipio['ano'] == 2021)]['ideb'].mean()
-
-    colors1_em = ['#1f77b4' if ideb >= ideb_2017_em else '#aec7e8' for ideb in df_2017_em['ideb']]
-    colors2_em = ['#1f77b4' if ideb >= ideb_2019_em else '#aec7e8' for ideb in df_2019_em['ideb']]
-    colors3_em = ['#1f77b4' if ideb >= ideb_2021_em else '#aec7e8' for ideb in df_2021_em['ideb']]
-    
-
-    fig10 = go.Figure()
-    
-    fig10.add_trace(go.Bar(x=df_2017_em['ideb'], y=df_2017_em['nome_escola'],
-                        name='2017', orientation='h', marker_color=colors1_em))
-    
-    fig10.add_vline(x=ideb_2017_em, line_dash="dash", line_color="black")
-    
-    fig10.add_annotation(x=ideb_2017_em + 0.2, y=6, text=f"IDEB Embu-Guaçu: {ideb_2017_em}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig10.update_layout(title='Valor do IDEB 2017 por Escola do Município de Embu-Guaçu no Ensino Médio',
-                    xaxis_title='IDEB 2017',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=300,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig10)
-
-
-    fig11 = go.Figure()
-    
-    fig11.add_trace(go.Bar(x=df_2019_em['ideb'], y=df_2019_em['nome_escola'],
-                        name='2019', orientation='h', marker_color=colors2_em))
-    
-    fig11.add_vline(x=ideb_2019_em, line_dash="dash", line_color="black")
-    
-    fig11.add_annotation(x=ideb_2019_em + 0.2, y=8, text=f"IDEB Embu-Guaçu: {ideb_2019_em}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig11.update_layout(title='Valor do IDEB 2019 por Escola do Município de Embu-Guaçu no Ensino Médio',
-                    xaxis_title='IDEB 2019',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=400,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig11)
-
-
-    fig12 = go.Figure()
-    
-    fig12.add_trace(go.Bar(x=df_2021_em['ideb'], y=df_2021_em['nome_escola'],
-                        name='2021', orientation='h', marker_color=colors3_em))
-    
-    fig12.add_vline(x=ideb_2021_em, line_dash="dash", line_color="black")
-    
-    fig12.add_annotation(x=ideb_2021_em + 0.2, y=4, text=f"IDEB Embu-Guaçu: {ideb_2021_em}", showarrow=True,
-                    arrowhead=1, arrowcolor="black", arrowsize=0.5,
-                    arrowwidth=2, ax=70, ay=-30)
-    
-    fig12.update_layout(title='Valor do IDEB 2021 por Escola do Município de Embu-Guaçu nos no Ensino Médio',
-                    xaxis_title='IDEB 2021',
-                    yaxis_title='Escolas',
-                    legend_title='Ano',
-                    barmode='group',
-                    width=800, 
-                    height=300,
-                    plot_bgcolor='rgba(255,255,255,0)', 
-                    font=dict(family='Arial', size=12, color='black'), 
-                    legend=dict(x=0, y=1.0, bgcolor='rgba(255,255,255,0.5)'), 
-                    margin=dict(l=200, r=50, t=70, b=50), 
-                    )
-    
-    st.plotly_chart(fig12)
+    for ano in graficos.anos:
+        figuras.exibir(figuras.figura('ideb_por_ano', arquivos_ideb_embu_guacu, lambda: graficos.por_ano('EM', ano), ('EM', ano)))
 
     paragrafo13_tab4 = 'Os critérios de avaliação adotados foram os mesmos delineados anteriormente.'
     paragrafo14_tab4 = 'Entre as escolas que se destacaram pelo melhor desempenho no IDEB no Ensino Médio estão: Leonice de Aquino Oliveira e Maria Andre Schunck Dona. Por outro lado, a escola que registrou um desempenho inferior no IDEB no Ensino Médio foi: Donizetti Aparecido Leite Professor.'
@@ -910,30 +689,13 @@ with tab4:
 
     st.markdown(texto_justificado_7_tab4, unsafe_allow_html=True)
 
-    coordenadas_escolas = {
-        'AMANDA CONSUELO DA CUNHA ESCOLA MUNICIPAL': (-23.867716889795453, -46.790130881181234),
-        'ESCOLA MUNICIPAL JOAO ALVES': (-23.882388200836104, -46.84855013597809),
-        'ESCOLA MUNICIPAL MARIA IGNEZ CONCELLES IRMA INES': (-23.80726208790731, -46.83203519864512),
-        'CECILIA CRISTINA DE OLIVEIRA RODRIGUES ESCOLA MUNICIPAL': (-23.870709390590278, -46.78891146803589),
-        'LORIS NASSIF MATTAR PROFA': (-23.847907585873706, -46.87684725341914),
-        'ALFREDO SCHUNK ESCOLA MUNICIPAL': (-23.874592459464882, -46.7780885762005),
-        'LEVI PEREIRA MARTINS PROFESSOR': (-23.922059766915865, -46.86920741439455),
-        'DONIZETTI APARECIDO LEITE PROFESSOR': (-23.88200854220514, -46.79276327820527),
-        'OLIVIA DE FARIA NOGUEIRA': (-23.79704780323135, -46.81595838614066),
-        'ESCOLA MUNICIPAL PEDRO ANTONIO DE ALMEIDA': (-23.835174009714695, -46.85846506926611)        
-    }
-
-    df = pd.DataFrame(list(coordenadas_escolas.items()), columns=['Escola', 'Coordenadas'])
+    # Escolas abaixo do IDEB municipal em todas as edições avaliadas, com as coordenadas da tabela geocodificada (ver analytics/geo.py)
+    escolas_abaixo = dados.carregar_ranking_ideb('SP').abaixo_do_municipio('Embu-Guaçu').drop_duplicates(subset=geo.CHAVE_ESCOLA)
+    escolas_abaixo = geo.geocodificar(escolas_abaixo, dados.carregar_escolas_geo())
 
-    
-    fig = px.scatter_mapbox(df, lat=[coord[0] for coord in df['Coordenadas']], 
-                            lon=[coord[1] for coord in df['Coordenadas']], 
-                            hover_name='Escola', zoom=11)
-
-    fig.update_layout(mapbox_style="open-street-map", width=700, height=600)
-    fig.update_traces(marker=dict(size=15))
-    
-    st.plotly_chart(fig)
+    mapa_embu_guacu = figuras.figura('mapa_escolas_abaixo', arquivos_ideb_embu_guacu + [geo.CAMINHO_ESCOLAS_GEO],
+                                     lambda: graficos_ideb.mapa_escolas(escolas_abaixo.dropna(subset=['latitude', 'longitude'])))
+    figuras.exibir(mapa_embu_guacu)
 
 
     paragrafo16_tab4 = 'Ao analisar o mapa, pode-se observar que as escolas com os menores IDEBs no município de Embu Guaçu estão predominantemente localizadas em regiões afastadas do centro urbano. Especificamente, há uma concentração significativa dessas escolas no distrito de Cipó-Guaçu. Essa distribuição geográfica levanta questões importantes sobre os possíveis motivos por trás do baixo desempenho educacional nessas áreas. Fatores como infraestrutura precária, acesso limitado a recursos educacionais, desigualdades socioeconômicas e falta de investimento em educação contribuem para essa realidade.'
@@ -944,9 +706,67 @@ with tab4:
 
     st.markdown(texto_justificado_8_tab4, unsafe_allow_html=True)
 
+    st.markdown("### Comparação entre Municípios")
+
+    paragrafo21_tab4 = 'Para apoiar a expansão da <b>Passos Mágicos</b> para outros municípios, as escolas de cada UF são comparadas com o IDEB do próprio município: a diferença para o IDEB municipal, o percentil da escola entre as escolas da UF e a tendência do IDEB entre as edições avaliadas.'
 
-with tab5:      
+    texto_justificado_10_tab4 = f"""
+        <p style="text-align: justify;">{paragrafo21_tab4}</p>
+    """
 
+    st.markdown(texto_justificado_10_tab4, unsafe_allow_html=True)
+
+    catalogo_ideb = dados.carregar_catalogo_ideb()
+    ufs = sorted(catalogo_ideb['uf'].unique())
+    coluna_uf, coluna_municipio, coluna_ciclo = st.columns(3)
+    uf_selecionada = coluna_uf.selectbox('UF', ufs, index=ufs.index('SP') if 'SP' in ufs else 0)
+    municipios_uf = sorted(catalogo_ideb.loc[catalogo_ideb['uf'] == uf_selecionada, 'nome_municipio'].unique())
+    municipio_selecionado = coluna_municipio.selectbox('Município', municipios_uf, index=municipios_uf.index('Embu-Guaçu') if 'Embu-Guaçu' in municipios_uf else 0)
+    nomes_ciclos = {'AI': 'Anos Iniciais', 'AF': 'Anos Finais', 'EM': 'Ensino Médio'}
+    ciclo_selecionado = coluna_ciclo.selectbox('Ciclo', list(nomes_ciclos), format_func=nomes_ciclos.get)
+
+    # Ranking calculado uma vez por UF e mantido em cache; trocar de município apenas seleciona as linhas (ver analytics/ranking_ideb.py)
+    ranking = dados.carregar_ranking_ideb(uf_selecionada)
+    comparacao = ranking.comparacao(municipio_selecionado, ciclo_selecionado)
+
+    if comparacao.empty:
+        st.write('Não há IDEB por escola para o município e ciclo selecionados.')
+    else:
+        ultimo_ano = comparacao['ano'].max()
+        selecao_ideb = (uf_selecionada, municipio_selecionado, ciclo_selecionado)
+        arquivos_ideb_uf = dados.arquivos_ideb(uf=uf_selecionada)
+        figuras.exibir(figuras.figura('diferenca_municipio', arquivos_ideb_uf,
+                                       lambda: graficos_ideb.diferenca_municipio(comparacao, municipio_selecionado, ciclo_selecionado, ultimo_ano), selecao_ideb))
+
+        colunas_ultimo_ano = ['nome_escola', 'rede', 'ideb', 'delta_municipio', 'percentil_uf', 'posicao_municipio']
+        tabela_ranking = (comparacao.loc[comparacao['ano'] == ultimo_ano, colunas_ultimo_ano]
+                          .merge(ranking.tendencias(municipio_selecionado, ciclo_selecionado).drop(columns=['uf', 'nome_municipio', 'ciclo']), on=['nome_escola', 'rede'])
+                          .sort_values(by='posicao_municipio')
+                          .set_index('nome_escola'))
+        st.dataframe(tabela_ranking.round(3))
+
+        # Escolas do ciclo abaixo do IDEB municipal, agrupadas por proximidade e com a unidade da Passos Mágicos mais próxima
+        escolas_abaixo_selecao = geo.geocodificar(ranking.abaixo_do_municipio(municipio_selecionado, ciclo_selecionado), dados.carregar_escolas_geo())
+        escolas_abaixo_selecao = escolas_abaixo_selecao.dropna(subset=['latitude', 'longitude'])
+        sem_coordenadas = ranking.abaixo_do_municipio(municipio_selecionado, ciclo_selecionado)['nome_escola'].nunique() - escolas_abaixo_selecao['nome_escola'].nunique()
+
+        def mapa_selecao():
+            escolas_mapa = escolas_abaixo_selecao.copy()
+            escolas_mapa['agrupamento'] = geo.IndiceEspacial(escolas_mapa).agrupar(raio_km=3).map(lambda grupo: 'Isolada' if grupo < 0 else f'Grupo {grupo + 1}').to_numpy()
+            dados_hover = None
+            indice_unidades = dados.carregar_indice_unidades()
+            if indice_unidades is not None:
+                escolas_mapa = geo.unidade_mais_proxima(escolas_mapa, indice_unidades)
+                dados_hover = {'unidade_mais_proxima': True, 'distancia_unidade_km': ':.1f'}
+            return graficos_ideb.mapa_escolas(escolas_mapa, cor='agrupamento', dados_hover=dados_hover)
+
+        if not escolas_abaixo_selecao.empty:
+            figuras.exibir(figuras.figura('mapa_escolas_abaixo_selecao', arquivos_ideb_uf + [geo.CAMINHO_ESCOLAS_GEO, geo.CAMINHO_UNIDADES], mapa_selecao, selecao_ideb))
+        if sem_coordenadas:
+            st.write(f'{sem_coordenadas} escola(s) abaixo do IDEB municipal ainda sem coordenadas em dados/escolas_geo.csv.')
+
+
+def secao_conclusao():
     st.markdown("## Conclusão")
 
     paragrafo17_tab4 = 'Através da elaboração deste trabalho, evidenciou-se que a busca mais patrocínio, investidores e voluntários é fundamental para fortalecer e expandir as operações da ONG <b>Passos Mágicos</b>. Ao aumentar os recursos disponíveis, a organização estará melhor equipada para atender a um número crescente de alunos, proporcionando-lhes a educação e o apoio necessários para um futuro promissor. Estratégias como campanhas de divulgação, networking e programas de voluntariado bem estruturados são essenciais para alcançar esse objetivo.'
@@ -961,4 +781,40 @@ with tab5:
         <p style="text-align: justify;">{paragrafo20_tab4}</p>
     """
 
-    st.markdown(texto_justificado_9_tab4, unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(texto_justificado_9_tab4, unsafe_allow_html=True)
+
+
+# Apenas a seção selecionada é executada a cada rerun; o tempo de cada uma é registrado (ver analytics/instrumentacao.py)
+SECOES = {
+    "Introdução": secao_introducao,
+    "Visão Geral dos Dados": secao_visao_geral,
+    "Forecast e What-if": secao_forecast,
+    "Ponto de Virada": secao_ponto_virada,
+    "IDEB": secao_ideb,
+    "Conclusão": secao_conclusao,
+}
+
+secao_ativa = st.sidebar.radio('Seção', list(SECOES))
+
+# Identifica a sessão nas medições, para separar os reruns de cada usuário
+id_sessao = st.session_state.setdefault('id_sessao', uuid.uuid4().hex[:8])
+
+with instrumentacao.medir(secao_ativa, id_sessao):
+    SECOES[secao_ativa]()
+
+with st.sidebar.expander('Tempo de execução por seção'):
+    st.dataframe(instrumentacao.resumo().round(1))
+
+# Painel de desenvolvimento: etapas do último rerun e de todos os reruns, com exportação das métricas
+if st.sidebar.checkbox('Painel de desempenho'):
+    with st.sidebar:
+        ultima_execucao = instrumentacao.ultima_execucao(id_sessao)
+        st.markdown(f"**Último rerun** ({ultima_execucao['secao']}): {ultima_execucao['duracao_ms']:.0f} ms, "
+                    f"{ultima_execucao['memoria_mb']:+.1f} MB")
+        st.dataframe(instrumentacao.etapas_execucao(ultima_execucao).round(1), hide_index=True)
+
+        escopo_metricas = st.radio('Etapas de', ['Esta sessão', 'Todas as sessões'], horizontal=True)
+        st.dataframe(instrumentacao.resumo_etapas(id_sessao if escopo_metricas == 'Esta sessão' else None).round(1))
+
+        st.download_button('Exportar JSON', instrumentacao.exportar_json(), file_name='metricas_dashboard.json', mime='application/json')
+        st.download_button('Exportar Prometheus', instrumentacao.exportar_prometheus(), file_name='metricas_dashboard.prom', mime='text/plain')
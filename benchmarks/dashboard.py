@@ -0,0 +1,206 @@
+"""Benchmark do dashboard sem navegador: latência e memória por seção e interação.
+
+Executa o ``app.py`` com o ``AppTest`` do Streamlit e mede os cenários de uso
+mais comuns: a primeira carga, a troca para cada seção da barra lateral e as
+interações da seção de Forecast (número de anos e faixa de aumento do
+What-if, que gera os cenários a cada mudança, sem botão de simulação). Cada
+repetição usa uma sessão nova, aberta na seção inicial, e só a interação
+medida entra no tempo. Os caches do processo são mantidos entre as
+repetições (como em um servidor já aquecido), exceto com ``--frio``, que os
+limpa antes de cada uma.
+
+Para cada cenário são registrados o tempo (mediana, p95, mínimo e máximo), o
+RSS ao final e o pico de RSS do processo. Depois das repetições cronometradas,
+uma execução extra com ``tracemalloc`` registra o pico de memória alocada
+pelo Python durante a interação e o saldo de blocos alocados por ela, sem
+distorcer os tempos.
+
+O resultado é gravado em JSON (``--json``); com ``--base``, cada cenário é
+comparado com um resultado gravado antes e o script falha se a mediana do
+tempo ou o pico de alocação passarem da base mais a tolerância.
+
+Uso: ``python benchmarks/dashboard.py [--repeticoes N] [--frio] [--json ARQUIVO] [--base ARQUIVO] [--tolerancia 0.25]``
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import psutil
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+from analytics import backtesting, dados, figuras, intervalos, previsao
+
+SECAO_FORECAST = 'Forecast e What-if'
+
+
+def _nova_sessao():
+    app = AppTest.from_file(str(figuras.CAMINHO_APP), default_timeout=300)
+    app.run()
+    return app
+
+
+def _trocar_secao(secao):
+    def interagir(app):
+        app.sidebar.radio[0].set_value(secao)
+    return _nova_sessao, interagir
+
+
+def _widget_forecast(tipo, rotulo, valor):
+    def preparar():
+        app = _nova_sessao()
+        app.sidebar.radio[0].set_value(SECAO_FORECAST)
+        app.run()
+        return app
+
+    def interagir(app):
+        widget = next(widget for widget in getattr(app, tipo) if widget.label == rotulo)
+        widget.set_value(valor)
+    return preparar, interagir
+
+
+def cenarios(secoes):
+    """Cenários nomeados: ``(preparar, interagir)``; ``preparar`` não é cronometrado, ``interagir`` + ``run`` é."""
+    resultado = {'carga_inicial': (lambda: AppTest.from_file(str(figuras.CAMINHO_APP), default_timeout=300), lambda app: None)}
+    for secao in secoes:
+        resultado[f'secao: {secao}'] = _trocar_secao(secao)
+    resultado['forecast: número de anos'] = _widget_forecast('slider', 'Número de anos:', 10)
+    resultado['forecast: faixa de aumento'] = _widget_forecast('slider', 'Faixa de percentual de aumento (1 = 100%):', (0.5, 2.0))
+    resultado['forecast: intervalo entre cenários'] = _widget_forecast('number_input', 'Intervalo entre cenários:', 0.05)
+    return resultado
+
+
+def _limpar_caches():
+    backtesting.limpar_cache()
+    dados.limpar_cache()
+    figuras.limpar_cache()
+    intervalos.limpar_cache()
+    previsao.limpar_cache()
+
+
+def _pico_rss_mb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2 ** 20 if sys.platform == 'darwin' else pico / 2 ** 10
+
+
+def _executar(preparar, interagir, frio):
+    """Tempo (s) da interação e, se o ``tracemalloc`` estiver ativo, pico alocado (bytes) e saldo de blocos durante ela."""
+    if frio:
+        _limpar_caches()
+    app = preparar()
+    gc.collect()
+    # A sessão preparada continua alocada: o pico é medido a partir do que já estava alocado
+    tracemalloc.reset_peak()
+    alocado_antes = tracemalloc.get_traced_memory()[0]
+    blocos_antes = sys.getallocatedblocks()
+    inicio = time.perf_counter()
+    interagir(app)
+    app.run()
+    duracao = time.perf_counter() - inicio
+    pico_alocado = tracemalloc.get_traced_memory()[1] - alocado_antes if tracemalloc.is_tracing() else None
+    blocos = sys.getallocatedblocks() - blocos_antes
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return duracao, pico_alocado, blocos
+
+
+def medir(preparar, interagir, repeticoes, frio=False):
+    tempos = np.array([_executar(preparar, interagir, frio)[0] for _ in range(repeticoes)]) * 1000
+    rss_mb = psutil.Process().memory_info().rss / 2 ** 20
+
+    # Execução separada com tracemalloc, que deixa o Python bem mais lento
+    tracemalloc.start()
+    try:
+        _, pico_alocado, blocos = _executar(preparar, interagir, frio)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'tempo_ms': {
+            'mediana': float(np.median(tempos)),
+            'p95': float(np.percentile(tempos, 95)),
+            'min': float(tempos.min()),
+            'max': float(tempos.max()),
+        },
+        'rss_mb': rss_mb,
+        'pico_rss_mb': _pico_rss_mb(),
+        'pico_alocado_kb': pico_alocado / 1024,
+        'blocos_alocados': blocos,
+    }
+
+
+def comparar(resultado, base, tolerancia):
+    """Regressões de ``resultado`` em relação a ``base``: mediana do tempo e pico de alocação acima da tolerância."""
+    regressoes = []
+    for nome, atual in resultado['cenarios'].items():
+        anterior = base['cenarios'].get(nome)
+        if anterior is None:
+            continue
+        for metrica, valor, valor_base in (('tempo mediano', atual['tempo_ms']['mediana'], anterior['tempo_ms']['mediana']),
+                                           ('pico alocado', atual['pico_alocado_kb'], anterior['pico_alocado_kb'])):
+            if valor > valor_base * (1 + tolerancia):
+                regressoes.append(f'{nome}: {metrica} {valor:.1f} > {valor_base:.1f} ({valor / valor_base - 1:+.0%})')
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--frio', action='store_true', help='limpa os caches do processo antes de cada repetição')
+    parser.add_argument('--cenario', action='append', help='executa apenas os cenários que contêm este texto')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    parser.add_argument('--base', help='resultado gravado antes, para comparação')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='aumento relativo aceito sobre a base')
+    args = parser.parse_args()
+
+    if os.path.isdir(figuras.PASTA_FIGURAS):
+        print(f'Aviso: {figuras.PASTA_FIGURAS} existe; figuras fora do cache em memória serão lidas do disco.')
+
+    # A primeira execução do processo paga as importações e a leitura dos dados; é registrada à parte
+    inicio = time.perf_counter()
+    app = _nova_sessao()
+    primeira_execucao_ms = (time.perf_counter() - inicio) * 1000
+    secoes = app.sidebar.radio[0].options
+
+    resultado = {
+        'ambiente': {'python': platform.python_version(), 'streamlit': streamlit.__version__, 'plataforma': platform.platform()},
+        'repeticoes': args.repeticoes,
+        'frio': args.frio,
+        'primeira_execucao_ms': primeira_execucao_ms,
+        'cenarios': {},
+    }
+    print(f'primeira execução do processo: {primeira_execucao_ms:.0f} ms')
+    print(f'{"cenário":<42}{"mediana":>10}{"p95":>10}{"RSS (MB)":>10}{"alocado (KB)":>14}')
+    for nome, (preparar, interagir) in cenarios(secoes).items():
+        if args.cenario and not any(texto in nome for texto in args.cenario):
+            continue
+        medicao = medir(preparar, interagir, args.repeticoes, args.frio)
+        resultado['cenarios'][nome] = medicao
+        print(f'{nome:<42}{medicao["tempo_ms"]["mediana"]:>10.1f}{medicao["tempo_ms"]["p95"]:>10.1f}'
+              f'{medicao["rss_mb"]:>10.1f}{medicao["pico_alocado_kb"]:>14.0f}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultado, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            sys.exit('Regressões em relação à base:\n' + '\n'.join(regressoes))
+        print(f'Sem regressões em relação à base (tolerância {args.tolerancia:.0%}).')
+
+
+if __name__ == '__main__':
+    main()
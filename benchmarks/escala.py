@@ -0,0 +1,94 @@
+"""Mede o pipeline e as estruturas do dashboard com PEDEs sintéticos em escala.
+
+Para cada escala (múltiplo do número de alunos do PEDE real), gera um PEDE
+sintético com ``analytics.sintetico`` em uma pasta temporária, ingere-o com
+``analytics.pipeline`` e constrói sobre as partições as mesmas estruturas
+que o dashboard usa: tabela de alunos, cubo, índice de filtros e índice de
+trajetórias. Para cada etapa, registra o tempo e o RSS ao final, além do
+pico de RSS do processo. Escalas grandes (1000x = ~1,35 milhão de alunos)
+precisam de alguns GB de memória.
+
+Uso: ``python benchmarks/escala.py [--escalas 10 100 1000] [--anos N] [--json ARQUIVO]``
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+from analytics import cubo, filtros, ingestao, pipeline, sintetico, trajetoria
+
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+def _pico_rss_mb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2 ** 20 if sys.platform == 'darwin' else pico / 2 ** 10
+
+
+def medir_escala(escala, anos, pasta_tmp):
+    etapas = {}
+
+    def etapa(nome, funcao):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        etapas[nome] = {'tempo_s': time.perf_counter() - inicio, 'rss_mb': _rss_mb()}
+        return resultado
+
+    origem = os.path.join(pasta_tmp, f'pede_{escala:g}x.csv')
+    pasta = os.path.join(pasta_tmp, f'alunos_{escala:g}x')
+    alunos = round(escala * len(pipeline.ler_pede(anos=[])))
+
+    etapa('geração', lambda: sintetico.gerar(origem, alunos, anos))
+    etapa('ingestão', lambda: pipeline.executar(origem, pasta))
+    df = etapa('leitura alunos', lambda: ingestao.ler_particoes(ingestao.arquivos_particoes(pipeline.ARQUIVO_ALUNOS, pasta)))
+    cubo_alunos = etapa('leitura cubo', lambda: ingestao.ler_particoes(ingestao.arquivos_particoes(pipeline.ARQUIVO_CUBO, pasta)))
+    etapa('contagem no cubo', lambda: cubo.contagem(cubo_alunos))
+    indice = etapa('índice de filtros', lambda: filtros.IndiceFiltros(df))
+    etapa('filtro Ametista', lambda: indice.cubo({'PEDRA': ['Ametista']}))
+    indice_alunos = etapa('índice de trajetórias', lambda: trajetoria.IndiceAlunos(df))
+    etapa('trajetória de um aluno', lambda: indice_alunos.trajetoria(alunos // 2))
+
+    return {
+        'alunos': alunos,
+        'linhas': len(df),
+        'tamanho_csv_mb': os.path.getsize(origem) / 2 ** 20,
+        'pico_rss_mb': _pico_rss_mb(),
+        'etapas': etapas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escalas', type=float, nargs='+', default=[10, 100])
+    parser.add_argument('--anos', type=int, help='número de anos do PEDE sintético (padrão: os anos reais)')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    args = parser.parse_args()
+
+    resultado = {}
+    with tempfile.TemporaryDirectory() as pasta_tmp:
+        for escala in args.escalas:
+            medicao = medir_escala(escala, args.anos, pasta_tmp)
+            resultado[f'{escala:g}x'] = medicao
+            print(f'{escala:g}x: {medicao["alunos"]} alunos, {medicao["linhas"]} linhas, CSV de {medicao["tamanho_csv_mb"]:.0f} MB, '
+                  f'pico de RSS {medicao["pico_rss_mb"]:.0f} MB')
+            for nome, etapa in medicao['etapas'].items():
+                print(f'  {nome:<26}{etapa["tempo_s"] * 1000:>10.1f} ms{etapa["rss_mb"]:>10.0f} MB')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
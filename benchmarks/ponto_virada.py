@@ -0,0 +1,82 @@
+"""Compara o tempo de renderização da aba Ponto de Virada antes e depois da ingestão tipada.
+
+"antigo" reproduz o caminho original (CSV -> XLSX -> DataFrame + limpeza e
+agrupamentos a cada rerun) e "novo" fatia o cubo de agregados das partições
+Arrow lido via ``analytics.dados``. O tempo "frio" é o primeiro rerun de um
+processo recém-iniciado; o "quente" é a mediana dos reruns seguintes.
+
+Uso: ``python benchmarks/ponto_virada.py [--repeticoes N]``
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import plotly.express as px
+
+from analytics import cubo, dados, ingestao
+
+
+def _preparar_antigo(pasta_tmp):
+    df = pd.read_csv(dados.PASTA_DADOS / 'dados.csv', sep=';', encoding='iso-8859-1')
+    caminho_xlsx = os.path.join(pasta_tmp, 'dados.xlsx')
+    df.to_excel(caminho_xlsx, index=False)
+    df = pd.read_excel(caminho_xlsx)
+    for coluna in cubo.INDICADORES:
+        df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+    df['NUMERO_ALUNO'] = df['ALUNO'].str.split('-').str[1].astype(int)
+    df.drop(df[(df['ALUNO'] == 'ALUNO-1259')].index, inplace=True)
+    df.drop(df[df['PONTO_VIRADA'] == '#NULO!'].index, inplace=True)
+    return df
+
+
+def _renderizar_antigo(df):
+    # Mesmos agrupamentos e gráfico construídos pela aba originalmente
+    df_ponto_virada = df.groupby(['ANO', 'PONTO_VIRADA'])['PONTO_VIRADA'].count().unstack().fillna(0)
+    px.bar(df_ponto_virada, x=df_ponto_virada.index, y=df_ponto_virada.columns, barmode='group')
+    df[df['PONTO_VIRADA'] == 'Sim'].groupby(['ANO'])['PONTO_VIRADA'].count()
+    df.groupby(['ANO', 'PONTO_VIRADA'])[cubo.NOTAS].mean()
+    df.groupby(['ANO', 'PONTO_VIRADA'])[cubo.INDICADORES].mean()
+
+
+def _renderizar_novo():
+    cubo_alunos = dados.carregar_cubo_alunos()
+    df_ponto_virada = cubo.contagem(cubo_alunos)
+    px.bar(df_ponto_virada, x=df_ponto_virada.index, y=df_ponto_virada.columns, barmode='group')
+    cubo.medias(cubo_alunos, cubo.NOTAS)
+    cubo.medias(cubo_alunos, cubo.INDICADORES)
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes + 1):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos[0], statistics.median(tempos[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=10)
+    args = parser.parse_args()
+
+    ingestao.exigir_particoes()
+    with tempfile.TemporaryDirectory() as pasta_tmp:
+        antigo = _medir(lambda: _renderizar_antigo(_preparar_antigo(pasta_tmp)), args.repeticoes)
+    dados.limpar_cache()
+    novo = _medir(_renderizar_novo, args.repeticoes)
+
+    print(f'{"caminho":<8}{"frio (ms)":>12}{"quente (ms)":>14}')
+    for nome, (frio, quente) in (('antigo', antigo), ('novo', novo)):
+        print(f'{nome:<8}{frio * 1000:>12.1f}{quente * 1000:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Teste de resistência dos gráficos matplotlib/seaborn do dashboard.
+
+Executa as seções com gráficos matplotlib (Visão Geral dos Dados e Ponto de
+Virada) muitas vezes seguidas em uma sessão ``AppTest`` e verifica que a
+memória do processo fica estável: o RSS ao final não pode passar do RSS após
+o aquecimento mais a tolerância, e nenhuma figura pode ficar aberta no
+``pyplot``. Por padrão o cache de figuras em memória é limpo antes de cada
+execução, para que os gráficos sejam redesenhados toda vez; se a pasta
+``.cache/figuras`` existir, os PNGs vêm dela.
+
+O Streamlit fecha todas as figuras do ``pyplot`` ao fim de cada execução, de
+qualquer sessão; por isso os gráficos não usam o ``pyplot``, e uma figura
+aberta ao fim do teste indica que algum gráfico voltou a usá-lo.
+
+Uso: ``python benchmarks/soak_matplotlib.py [--execucoes N] [--tolerancia-mb MB] [--com-cache]``
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+from streamlit.testing.v1 import AppTest
+
+from analytics import figuras
+
+SECOES = ['Visão Geral dos Dados', 'Ponto de Virada']
+
+
+def _rss_mb():
+    gc.collect()
+    return psutil.Process().memory_info().rss / 2 ** 20
+
+
+def _figuras_abertas():
+    # O pyplot só é importado se algum código usar o estado global
+    pyplot = sys.modules.get('matplotlib.pyplot')
+    return len(pyplot.get_fignums()) if pyplot else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--execucoes', type=int, default=200)
+    parser.add_argument('--aquecimento', type=int, default=20)
+    parser.add_argument('--tolerancia-mb', type=float, default=25.0)
+    parser.add_argument('--com-cache', action='store_true', help='mantém o cache de figuras entre as execuções')
+    args = parser.parse_args()
+
+    if os.path.isdir(figuras.PASTA_FIGURAS) and not args.com_cache:
+        print(f'Aviso: {figuras.PASTA_FIGURAS} existe; os PNGs serão lidos do disco em vez de redesenhados.')
+
+    app = AppTest.from_file(str(figuras.CAMINHO_APP), default_timeout=180)
+    app.run()
+
+    rss_aquecido = None
+    inicio = time.perf_counter()
+    for execucao in range(args.execucoes):
+        if not args.com_cache:
+            figuras.limpar_cache()
+        app.sidebar.radio[0].set_value(SECOES[execucao % len(SECOES)])
+        app.run()
+        if app.exception:
+            sys.exit(f'Erro na execução {execucao}: {app.exception[0].message}')
+        if execucao + 1 == args.aquecimento:
+            rss_aquecido = _rss_mb()
+            print(f'RSS após {args.aquecimento} execuções de aquecimento: {rss_aquecido:.1f} MB')
+    duracao = time.perf_counter() - inicio
+
+    rss_final = _rss_mb()
+    abertas = _figuras_abertas()
+    crescimento = rss_final - rss_aquecido
+    print(f'RSS após {args.execucoes} execuções: {rss_final:.1f} MB ({crescimento:+.1f} MB), '
+          f'{duracao / args.execucoes * 1000:.0f} ms por execução, {abertas} figura(s) aberta(s) no pyplot')
+
+    if abertas:
+        sys.exit('Falha: figuras do pyplot não foram fechadas.')
+    if crescimento > args.tolerancia_mb:
+        sys.exit(f'Falha: a memória cresceu mais de {args.tolerancia_mb} MB.')
+    print('OK: memória estável.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Relatório do tempo de importação do dashboard, por pacote.
+
+Importa o ``app.py`` em um processo novo com ``python -X importtime`` (o que
+executa a seção inicial, como no primeiro acesso a um worker recém-iniciado)
+e soma o tempo próprio de cada módulo pelo pacote de primeiro nível. O
+relatório também lista os pacotes pesados que não deveriam ser carregados na
+inicialização (scikit-learn, statsmodels, seaborn, pyplot...) e falha se
+algum deles aparecer.
+
+Com ``--json`` o resultado é gravado para servir de base; com ``--base`` o
+tempo total é comparado com uma base gravada antes e o script falha se
+passar dela mais a tolerância.
+
+Uso: ``python benchmarks/tempo_importacao.py [--repeticoes N] [--json ARQUIVO] [--base ARQUIVO] [--tolerancia 0.2]``
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Devem ser importados apenas pelas seções e métodos que os usam
+ADIADOS = ['sklearn', 'statsmodels', 'seaborn', 'matplotlib.pyplot', 'scipy', 'plotly.express']
+
+
+def medir(modulo='app'):
+    """Tempo próprio (ms) de cada módulo importado por ``modulo`` em um processo novo."""
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'], cwd=RAIZ,
+                              capture_output=True, text=True)
+    if processo.returncode != 0:
+        sys.exit(f'Erro ao importar {modulo}:\n{processo.stderr[-2000:]}')
+
+    modulos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, _, nome = linha[len('import time:'):].split('|')
+        modulos[nome.strip()] = int(proprio) / 1000
+    return modulos
+
+
+def por_pacote(modulos):
+    pacotes = defaultdict(float)
+    for nome, tempo in modulos.items():
+        pacotes[nome.split('.')[0]] += tempo
+    return dict(sorted(pacotes.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modulo', default='app')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--pacotes', type=int, default=15, help='quantidade de pacotes exibidos')
+    parser.add_argument('--json', help='grava o resultado neste arquivo')
+    parser.add_argument('--base', help='resultado gravado antes, para comparação')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento relativo aceito sobre a base')
+    args = parser.parse_args()
+
+    # O tempo total é a mediana das repetições; a divisão por pacote é a da repetição mais próxima dela
+    medicoes = [medir(args.modulo) for _ in range(args.repeticoes)]
+    totais = [sum(modulos.values()) for modulos in medicoes]
+    total = statistics.median(totais)
+    modulos = medicoes[min(range(len(totais)), key=lambda i: abs(totais[i] - total))]
+    pacotes = por_pacote(modulos)
+    carregados = [nome for nome in ADIADOS if nome in modulos]
+
+    print(f'{"pacote":<24}{"ms":>10}{"%":>8}')
+    for nome, tempo in list(pacotes.items())[:args.pacotes]:
+        print(f'{nome:<24}{tempo:>10.1f}{tempo / total:>8.1%}')
+    print(f'{"total":<24}{total:>10.1f}   ({len(modulos)} módulos, mediana de {args.repeticoes})')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'modulo': args.modulo, 'total_ms': total, 'pacotes_ms': pacotes, 'adiados_carregados': carregados},
+                      arquivo, indent=2, ensure_ascii=False)
+
+    falhas = []
+    if carregados:
+        falhas.append(f'importados na inicialização: {", ".join(carregados)}')
+    if args.base:
+        with open(args.base, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)['total_ms']
+        print(f'base: {base:.1f} ms ({total / base - 1:+.1%})')
+        if total > base * (1 + args.tolerancia):
+            falhas.append(f'tempo total {total:.1f} ms acima da base {base:.1f} ms + {args.tolerancia:.0%}')
+    if falhas:
+        sys.exit('Falha: ' + '; '.join(falhas))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Dobras do backtesting com origem móvel e o placar calculado a partir delas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import backtesting
+
+SERIE = pd.Series([10.0, 20.0, 15.0, 30.0, 25.0, 40.0, 35.0], index=pd.Index(np.arange(2015, 2022), name='Ano'))
+
+
+def test_dobras_usam_apenas_os_anos_anteriores_a_origem():
+    erros = backtesting.erros(SERIE, horizonte=3, minimo_treino=3, metodos=('naive',), processos=1)
+    dobras = [(origem, horizonte, ano) for origem, horizonte, ano in erros[['origem', 'horizonte', 'ano']].itertuples(index=False)]
+    assert dobras == [
+        (2017, 1, 2018), (2017, 2, 2019), (2017, 3, 2020),
+        (2018, 1, 2019), (2018, 2, 2020), (2018, 3, 2021),
+        (2019, 1, 2020), (2019, 2, 2021),
+        (2020, 1, 2021),
+    ]
+    # O Naive repete o último ano de treino, a própria origem
+    assert erros['previsto'].tolist() == SERIE.loc[erros['origem']].tolist()
+    assert erros['real'].tolist() == SERIE.loc[erros['ano']].tolist()
+
+
+def test_lotes_em_processos_dao_as_mesmas_dobras():
+    metodos = ('media_movel', 'regressao_linear', 'naive')
+    em_lotes = backtesting.erros(SERIE, minimo_treino=3, metodos=metodos, processos=2)
+    pd.testing.assert_frame_equal(em_lotes, backtesting.erros(SERIE, minimo_treino=3, metodos=metodos, processos=1))
+
+
+def test_placar_por_horizonte():
+    placar = backtesting.calcular_placar(backtesting.erros(SERIE, horizonte=3, minimo_treino=3, metodos=('naive',), processos=1))
+    assert placar['dobras'].tolist() == [4, 3, 2]
+    # Horizonte 3: 2017 -> 2020 (15 vs 40) e 2018 -> 2021 (30 vs 35)
+    assert placar.loc[('naive', 3), 'mae'] == pytest.approx((25 + 5) / 2)
+    assert placar.loc[('naive', 3), 'mape'] == pytest.approx((25 / 40 + 5 / 35) / 2 * 100)
+
+
+def test_serie_curta_demais():
+    with pytest.raises(ValueError):
+        backtesting.erros(SERIE.iloc[:3], minimo_treino=3)
@@ -0,0 +1,31 @@
+"""Cenários what-if sobre a regressão linear em forma fechada."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import cenarios, previsao
+
+SERIE = pd.Series([812.0, 841.0, 1015.0, 970.0, 1100.0], index=pd.Index([2018, 2019, 2020, 2021, 2022], name='Ano'))
+
+
+def test_regressao_em_forma_fechada_igual_ao_polyfit():
+    inclinacao, intercepto = previsao.ajustar(SERIE, 'regressao_linear')
+    assert (inclinacao, intercepto) == pytest.approx(tuple(np.polyfit(SERIE.index.to_numpy(dtype='float64'), SERIE.to_numpy(), 1)))
+
+
+def test_fatores_aumento_incluem_o_maximo_no_passo():
+    assert cenarios.fatores_aumento(0.5, 2.0, 0.05).tolist() == [round(0.5 + 0.05 * i, 4) for i in range(31)]
+    assert cenarios.fatores_aumento(0.0, 0.25, 0.1).tolist() == [0.0, 0.1, 0.2]
+
+
+def test_projecoes_escalam_a_reta_do_polyfit():
+    aumentos = cenarios.fatores_aumento(0.0, 1.0, 0.25)
+    projecoes = cenarios.projetar(SERIE, aumentos, horizonte=3)
+    anos = np.arange(2018, 2026)
+    reta = np.polyval(np.polyfit(SERIE.index.to_numpy(dtype='float64'), SERIE.to_numpy(), 1), anos)
+    np.testing.assert_allclose(projecoes.to_numpy(), (1 + aumentos)[:, np.newaxis] * reta)
+    assert projecoes.columns.tolist() == anos.tolist()
+
+    tabela = cenarios.tabela_horizontes(projecoes, 2022, [1, 3])
+    np.testing.assert_allclose(tabela.to_numpy(), projecoes[[2023, 2025]].to_numpy())
@@ -0,0 +1,43 @@
+"""Cubo de agregados comparado com o ``groupby`` direto na tabela de alunos."""
+
+import numpy as np
+import pandas as pd
+
+from analytics import cubo
+
+
+def _alunos():
+    rng = np.random.default_rng(0)
+    n = 60
+    df = pd.DataFrame({
+        'ANO': np.repeat([2021, 2022], n // 2),
+        'PONTO_VIRADA': rng.choice(['Sim', 'Não'], n),
+        'PEDRA': rng.choice(['Quartzo', 'Ágata', 'Ametista', 'Topázio'], n),
+        'FASE': rng.integers(0, 4, n).astype('float64'),
+        'INSTITUICAO_ENSINO_ALUNO': rng.choice(['Escola Pública', 'Rede Decisão'], n),
+        'INDE': rng.uniform(3, 10, n),
+        'NOTA_MAT': rng.uniform(0, 10, n),
+    })
+    # Valores ausentes ficam fora das quantidades e das somas
+    df.loc[::7, 'INDE'] = np.nan
+    return df
+
+
+def test_cubos_por_ano_concatenados_igual_ao_groupby_direto():
+    df = _alunos()
+    cubo_anos = pd.concat([cubo.construir_cubo(particao) for _, particao in df.groupby('ANO')], ignore_index=True)
+    direto = df.groupby(['ANO', 'PONTO_VIRADA'])
+
+    pd.testing.assert_frame_equal(cubo.contagem(cubo_anos), direto.size().unstack(fill_value=0)[cubo.PONTOS_VIRADA],
+                                  check_names=False, check_dtype=False)
+    medias = cubo.medias(cubo_anos, ['INDE', 'NOTA_MAT'])
+    desvios = cubo.desvios_padrao(cubo_anos, ['INDE', 'NOTA_MAT'])
+    np.testing.assert_allclose(medias.to_numpy(), direto[['INDE', 'NOTA_MAT']].mean().to_numpy())
+    np.testing.assert_allclose(desvios.to_numpy(), direto[['INDE', 'NOTA_MAT']].std().to_numpy())
+
+
+def test_fatia_com_filtro_igual_ao_groupby_filtrado():
+    df = _alunos()
+    filtrados = df[df['PEDRA'].isin(['Ágata', 'Topázio'])]
+    fatia = cubo.medias(cubo.construir_cubo(df), ['NOTA_MAT'], por=('ANO', 'FASE'), filtros={'PEDRA': ['Ágata', 'Topázio']})
+    np.testing.assert_allclose(fatia['NOTA_MAT'].to_numpy(), filtrados.groupby(['ANO', 'FASE'])['NOTA_MAT'].mean().to_numpy())
@@ -0,0 +1,46 @@
+"""Índice espacial sobre um cadastro pequeno de unidades."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import geo
+
+# 0,009 grau de latitude é cerca de 1 km; a unidade C fica a dezenas de km das outras
+UNIDADES = pd.DataFrame({
+    'nome_unidade': ['A', 'B', 'C', 'Sem coordenadas'],
+    'latitude': [-23.5505, -23.5415, -23.9000, np.nan],
+    'longitude': [-46.6333, -46.6333, -46.8000, np.nan],
+})
+
+
+@pytest.fixture
+def indice():
+    return geo.IndiceEspacial(UNIDADES)
+
+
+def test_unidades_sem_coordenadas_ficam_fora(indice):
+    assert len(indice) == 3
+
+
+def test_no_raio_do_mais_proximo_ao_mais_distante(indice):
+    proximas = indice.no_raio(-23.5505, -46.6333, raio_km=2)
+    assert proximas['nome_unidade'].tolist() == ['A', 'B']
+    assert proximas['distancia_km'].to_numpy() == pytest.approx([0, 1.0], abs=0.01)
+
+
+def test_mais_proximos_em_lote(indice):
+    posicoes, distancias = indice.mais_proximos([-23.5420, -23.8990], [-46.6333, -46.8000])
+    assert indice.pontos['nome_unidade'].to_numpy()[posicoes].tolist() == ['B', 'C']
+    assert distancias == pytest.approx([0.06, 0.11], abs=0.01)
+
+
+def test_agrupar_separa_a_unidade_isolada(indice):
+    grupos = indice.agrupar(raio_km=2)
+    assert grupos.tolist() == [0, 0, -1]
+
+
+def test_unidade_mais_proxima_das_escolas(indice):
+    escolas = pd.DataFrame({'latitude': [-23.5500, -23.8000], 'longitude': [-46.6330, -46.8000]})
+    resultado = geo.unidade_mais_proxima(escolas, indice)
+    assert resultado['unidade_mais_proxima'].tolist() == ['A', 'C']
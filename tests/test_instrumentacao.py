@@ -0,0 +1,18 @@
+"""Exportação das medições do dashboard no formato do Prometheus."""
+
+from analytics import instrumentacao
+
+
+def test_soma_e_contagem_acumuladas_alem_das_ultimas_medicoes():
+    instrumentacao.limpar()
+    execucoes = instrumentacao.MAX_MEDICOES + 10
+    for _ in range(execucoes):
+        with instrumentacao.medir('Seção'):
+            with instrumentacao.etapa('etapa'):
+                pass
+
+    linhas = instrumentacao.exportar_prometheus().splitlines()
+    assert f'dashboard_secao_segundos_count{{secao="Seção"}} {execucoes}' in linhas
+    assert f'dashboard_etapa_segundos_count{{etapa="etapa"}} {execucoes}' in linhas
+    assert instrumentacao.resumo().loc['Seção', 'execucoes'] == instrumentacao.MAX_MEDICOES
+    instrumentacao.limpar()
@@ -0,0 +1,54 @@
+"""Bootstrap dos intervalos de previsão em lote, comparado a um laço por reamostragem."""
+
+import numpy as np
+import pandas as pd
+
+from analytics import intervalos
+
+SERIE = pd.Series([812.0, 841.0, 1015.0, 970.0, 1100.0, 1160.0], index=pd.Index(np.arange(2017, 2023), name='Ano'))
+ANOS = SERIE.index.to_numpy(dtype='float64')
+VALORES = SERIE.to_numpy()
+ANOS_FUTUROS = np.arange(2023, 2026, dtype='float64')
+
+
+def test_regressao_em_lote_igual_ao_reajuste_por_reamostragem():
+    quantidade = 200
+    trajetorias = intervalos._simular_vetorizado('regressao_linear', ANOS, VALORES, ANOS_FUTUROS, np.random.default_rng(7), quantidade)
+
+    # Mesmos sorteios, na mesma ordem, com um polyfit por série sintética
+    rng = np.random.default_rng(7)
+    ajustados = np.polyval(np.polyfit(ANOS, VALORES, 1), ANOS)
+    residuos = (VALORES - ajustados) - (VALORES - ajustados).mean()
+    simuladas = ajustados + residuos[rng.integers(0, len(residuos), size=(quantidade, len(VALORES)))]
+    futuros = residuos[rng.integers(0, len(residuos), size=(quantidade, len(ANOS_FUTUROS)))]
+    esperadas = np.array([np.polyval(np.polyfit(ANOS, simulada, 1), ANOS_FUTUROS) for simulada in simuladas]) + futuros
+    np.testing.assert_allclose(trajetorias, esperadas)
+
+
+def test_naive_sem_variacao_nos_passos_repete_o_ultimo_valor():
+    linear = 100.0 + 10 * np.arange(6)
+    trajetorias = intervalos._simular_vetorizado('naive', ANOS, linear, ANOS_FUTUROS, np.random.default_rng(0), 50)
+    # Passos constantes viram resíduos centrados nulos: o passeio aleatório fica parado no último valor
+    np.testing.assert_allclose(trajetorias, 150.0)
+
+
+def test_limites_sao_quantis_por_ano_limitados_a_zero():
+    trajetorias = np.random.default_rng(1).normal(5, 10, size=(1000, 3))
+    limites = intervalos._limites(trajetorias, 0.9)
+    esperados = [np.quantile(np.maximum(trajetorias[:, ano], 0), [0.05, 0.95]) for ano in range(3)]
+    np.testing.assert_allclose(limites, esperados)
+    assert (limites >= 0).all()
+
+
+def test_calcular_grava_e_ler_recupera(tmp_path, monkeypatch):
+    monkeypatch.setattr(intervalos, 'REAMOSTRAGENS_MODELOS', 4)
+    intervalos.limpar_cache()
+    assert intervalos.ler(SERIE, 3, pasta=tmp_path) is None
+
+    calculados = intervalos.calcular(SERIE, 3, processos=1, pasta=tmp_path)
+    intervalos.limpar_cache()
+    lidos = intervalos.ler(SERIE, 3, pasta=tmp_path)
+    pd.testing.assert_frame_equal(lidos, calculados)
+    assert lidos.index.tolist() == [2023, 2024, 2025]
+    assert ((lidos.xs('inferior', axis=1, level=1) <= lidos.xs('superior', axis=1, level=1)).all()).all()
+    intervalos.limpar_cache()
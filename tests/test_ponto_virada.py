@@ -0,0 +1,43 @@
+"""Seção Ponto de Virada com combinações de filtros sem alunos rotulados."""
+
+import os
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from analytics import cubo, filtros
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _filtro(at, rotulo):
+    return next(widget for widget in at.sidebar.multiselect if widget.label == rotulo)
+
+
+def test_contagem_sem_alunos_tem_colunas_sim_nao():
+    vazio = cubo.construir_cubo(pd.DataFrame(columns=cubo.DIMENSOES))
+    assert list(cubo.contagem(vazio).columns) == cubo.PONTOS_VIRADA
+
+
+def test_fase_turma_montada_de_fase_e_turma_fora_de_2020():
+    df = pd.DataFrame({
+        'FASE_TURMA': ['2H', None, None],
+        'FASE': [2.0, 2.0, 0.0],
+        'TURMA': [None, 'G', 'K'],
+    })
+    assert filtros.fase_turma(df).tolist() == ['2H', '2G', '0K']
+
+
+@pytest.mark.parametrize('selecao', [{'Ano': [2020], 'Bolsista': ['Sim']}, {'Ano': [2022], 'Fase/Turma': ['2H']}])
+def test_secao_ponto_virada_com_selecao_vazia(selecao):
+    at = AppTest.from_file(os.path.join(RAIZ, 'app.py'), default_timeout=300)
+    at.run()
+    at.sidebar.radio[0].set_value('Ponto de Virada')
+    at.run()
+    for rotulo, valores in selecao.items():
+        _filtro(at, rotulo).set_value(valores)
+    at.run()
+
+    assert not at.exception
+    assert any('Nenhum aluno com Ponto de Virada' in info.value for info in at.info)
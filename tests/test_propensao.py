@@ -0,0 +1,52 @@
+"""Pontuação em lote do modelo de propensão e verificação das partições do artefato."""
+
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from analytics import pipeline, propensao
+from analytics.caminhos import PASTA_DADOS
+
+
+def _alunos(quantidade=300, semente=0):
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({indicador: rng.uniform(2, 10, quantidade) for indicador in propensao.INDICADORES})
+    df['FASE'] = rng.integers(0, 9, quantidade).astype('float64')
+    df['ANO'] = rng.choice([2020, 2021, 2022], quantidade)
+    df['NUMERO_ALUNO'] = rng.integers(1, quantidade // 2, quantidade)
+    df['ANOS_PM'] = rng.integers(0, 5, quantidade).astype('float64')
+    df['PEDRA'] = rng.choice(propensao.PEDRAS, quantidade)
+    chance = 1 / (1 + np.exp(-(df['IPP'] - 6)))
+    df['PONTO_VIRADA'] = np.where(rng.random(quantidade) < chance, 'Sim', 'Não')
+    df.loc[::17, 'IDA'] = np.nan
+    return df
+
+
+def test_pontuar_igual_ao_predict_proba_do_sklearn():
+    df = _alunos()
+    artefato = {**propensao.treinar(df), 'versao': 1}
+    modelo = propensao.ModeloPropensao(artefato)
+
+    regressao = LogisticRegression()
+    regressao.classes_ = np.array([0, 1])
+    regressao.coef_ = np.array([artefato['coeficientes']])
+    regressao.intercept_ = np.array([artefato['intercepto']])
+    x = propensao.matriz_atributos(df)
+    x = (np.where(np.isnan(x), artefato['media'], x) - artefato['media']) / np.array(artefato['desvio'])
+
+    np.testing.assert_allclose(modelo.pontuar(df), regressao.predict_proba(x)[:, 1], rtol=1e-12)
+
+
+def test_particoes_alteradas(tmp_path):
+    caminho = tmp_path / 'alunos.feather'
+    caminho.write_bytes(b'particao')
+    nome = os.path.relpath(caminho, PASTA_DADOS)
+    artefato = {**propensao.treinar(_alunos()), 'versao': 1,
+                'particoes': {nome: pipeline.hash_arquivo(caminho), 'alunos/ANO=1999/alunos.feather': 'removida'}}
+    modelo = propensao.ModeloPropensao(artefato)
+
+    assert modelo.particoes_alteradas([caminho]) == ['alunos/ANO=1999/alunos.feather']
+    caminho.write_bytes(b'particao corrigida')
+    assert modelo.particoes_alteradas([caminho]) == sorted([nome, 'alunos/ANO=1999/alunos.feather'])
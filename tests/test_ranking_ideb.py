@@ -0,0 +1,51 @@
+"""Percentis, posições e tendências do ranking do IDEB em tabelas pequenas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import ranking_ideb
+
+
+def _escola(municipio, nome, ano, ideb):
+    return {'uf': 'SP', 'nome_municipio': municipio, 'nome_escola': nome, 'rede': 'Municipal', 'ciclo': 'AI', 'ano': ano, 'ideb': ideb}
+
+
+ESCOLAS = pd.DataFrame([
+    _escola('Embu-Guaçu', 'A', 2021, 4.0),
+    _escola('Embu-Guaçu', 'B', 2021, 5.0),
+    _escola('Embu-Guaçu', 'C', 2021, 5.0),
+    _escola('Embu-Guaçu', 'D', 2021, 6.0),
+    _escola('Itapecerica da Serra', 'E', 2021, 3.0),
+    _escola('Embu-Guaçu', 'A', 2017, 3.0),
+    _escola('Embu-Guaçu', 'A', 2019, 3.8),
+    _escola('Embu-Guaçu', 'F', 2021, np.nan),
+])
+
+MUNICIPIOS = pd.DataFrame({
+    'uf': 'SP', 'nome_municipio': ['Embu-Guaçu', 'Embu-Guaçu', 'Itapecerica da Serra'], 'ciclo': 'AI', 'ano': 2021,
+    'rede': ['Pública', 'Privada', 'Pública'], 'ideb': [4.8, 7.0, 4.0],
+})
+
+
+def test_percentis_e_posicoes_com_empates():
+    comparacao = ranking_ideb.comparar(ESCOLAS, MUNICIPIOS)
+    edicao = comparacao[comparacao['ano'] == 2021].set_index('nome_escola')
+    assert edicao['percentil_uf'].to_dict() == pytest.approx({'A': 0.4, 'B': 0.8, 'C': 0.8, 'D': 1.0, 'E': 0.2})
+    assert edicao['percentil_municipio'].to_dict() == pytest.approx({'A': 0.25, 'B': 0.75, 'C': 0.75, 'D': 1.0, 'E': 1.0})
+    assert edicao['posicao_municipio'].to_dict() == {'A': 4, 'B': 2, 'C': 2, 'D': 1, 'E': 1}
+    # Só a rede pública entra no IDEB de referência do município
+    assert edicao['delta_municipio'].to_dict() == pytest.approx({'A': -0.8, 'B': 0.2, 'C': 0.2, 'D': 1.2, 'E': -1.0})
+
+
+def test_tendencia_igual_ao_polyfit_das_edicoes_presentes():
+    tendencias = ranking_ideb.tendencias(ESCOLAS).set_index('nome_escola')
+    assert tendencias.loc['A', 'tendencia'] == pytest.approx(np.polyfit([2017, 2019, 2021], [3.0, 3.8, 4.0], 1)[0])
+    assert tendencias[['ideb_2017', 'ideb_2019', 'ideb_2021']].loc['A'].tolist() == [3.0, 3.8, 4.0]
+    assert np.isnan(tendencias.loc['B', 'tendencia'])
+
+
+def test_abaixo_do_municipio_em_todas_as_edicoes():
+    ranking = ranking_ideb.RankingIdeb(ESCOLAS, MUNICIPIOS)
+    assert ranking.abaixo_do_municipio(minimo_edicoes=1)['nome_escola'].tolist() == ['E']
+    assert ranking.abaixo_do_municipio('Embu-Guaçu', minimo_edicoes=1).empty
@@ -0,0 +1,40 @@
+"""Consulta da trajetória de um aluno por busca binária."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import trajetoria
+
+
+def _alunos():
+    # Linhas fora de ordem, com alunos vizinhos (7 e 8) e um aluno de um único ano
+    linhas = [(8, 2022, 'Sim'), (7, 2021, 'Não'), (10, 2020, 'Não'), (7, 2020, 'Não'), (8, 2020, 'Não'), (7, 2022, 'Sim')]
+    df = pd.DataFrame(linhas, columns=['NUMERO_ALUNO', 'ANO', 'PONTO_VIRADA'])
+    for coluna in trajetoria.COLUNAS_TRAJETORIA:
+        if coluna not in df.columns:
+            df[coluna] = np.arange(len(df), dtype='float64')
+    return df
+
+
+def test_trajetoria_igual_a_selecao_direta_ordenada_por_ano():
+    df = _alunos()
+    indice = trajetoria.IndiceAlunos(df)
+    for numero in df['NUMERO_ALUNO'].unique():
+        esperada = df[df['NUMERO_ALUNO'] == numero].sort_values('ANO')[trajetoria.COLUNAS_TRAJETORIA].reset_index(drop=True)
+        pd.testing.assert_frame_equal(indice.trajetoria(numero), esperada)
+
+
+@pytest.mark.parametrize('numero', [1, 9, 11])
+def test_aluno_ausente_tem_trajetoria_vazia(numero):
+    indice = trajetoria.IndiceAlunos(_alunos())
+    assert numero not in indice
+    assert indice.trajetoria(numero).empty
+
+
+def test_numero_aluno_e_transicoes():
+    assert trajetoria.numero_aluno('ALUNO-123') == 123
+    assert trajetoria.numero_aluno(' 45 ') == 45
+    assert trajetoria.numero_aluno('Maria') is None
+    transicoes = trajetoria.transicoes_ponto_virada(trajetoria.IndiceAlunos(_alunos()).trajetoria(7))
+    assert transicoes['TRANSICAO'].tolist() == [pd.NA, pd.NA, 'Não → Sim']
@@ -0,0 +1,67 @@
+"""Regras de ``validacao.Coluna`` e a quarentena de ``validacao.validar``."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import validacao
+
+
+def test_sentinela_vira_nulo_e_conta_como_ausente_na_obrigatoria():
+    regra = validacao.Coluna(tipo='numero', obrigatoria=True, sentinelas=['#NULO!'])
+    convertidos, ocorrencias = regra.aplicar(pd.Series(['1.5', '#NULO!', '-', None]), sentinelas=['-'])
+    assert convertidos.iloc[0] == 1.5 and convertidos.iloc[1:].isna().all()
+    assert ocorrencias['sentinela'].tolist() == [False, True, True, False]
+    assert ocorrencias['obrigatoria'].tolist() == [False, True, True, True]
+
+
+def test_tipo_invalido_em_numero_e_inteiro():
+    _, numero = validacao.Coluna(tipo='numero').aplicar(pd.Series(['7', 'sete', '7.5']))
+    convertidos, inteiro = validacao.Coluna(tipo='inteiro').aplicar(pd.Series(['7', 'sete', '7.5']))
+    assert numero['tipo'].tolist() == [False, True, False]
+    assert inteiro['tipo'].tolist() == [False, True, True]
+    assert convertidos.iloc[0] == 7 and convertidos.iloc[1:].isna().all()
+
+
+def test_faixa_com_tolerancia_ajusta_ao_limite():
+    regra = validacao.Coluna(tipo='numero', minimo=0, maximo=10, tolerancia=0.001)
+    convertidos, ocorrencias = regra.aplicar(pd.Series([5.0, 10.00002, 10.5, -1.0]))
+    assert ocorrencias['ajuste'].tolist() == [False, True, False, False]
+    assert ocorrencias['faixa'].tolist() == [False, False, True, True]
+    assert convertidos.iloc[:2].tolist() == [5.0, 10.0] and convertidos.iloc[2:].isna().all()
+
+
+def test_categoria_e_padrao():
+    _, categorias = validacao.Coluna(categorias=['Sim', 'Não']).aplicar(pd.Series(['Sim', 'Talvez', None]))
+    _, padrao = validacao.Coluna(padrao=r'\d+[A-Z]+').aplicar(pd.Series(['2H', 'H2', None]))
+    assert categorias['categoria'].tolist() == [False, True, False]
+    assert padrao['categoria'].tolist() == [False, True, False]
+
+
+def test_tipo_desconhecido():
+    with pytest.raises(ValueError):
+        validacao.Coluna(tipo='data')
+
+
+def test_validar_separa_quarentena_e_relatorio():
+    df = pd.DataFrame({
+        'NOME': ['A', 'B', 'C', 'D'],
+        'IAA': ['9.5', '10.00002', 'abc', '#NULO!'],
+        'PONTO_VIRADA': ['Sim', 'Não', 'Talvez', 'Sim'],
+    })
+    esquema = {
+        'IAA': validacao.Coluna(tipo='numero', minimo=0, maximo=10, tolerancia=0.001),
+        'PONTO_VIRADA': validacao.Coluna(categorias=['Sim', 'Não']),
+        'COLUNA_DE_OUTRO_ANO': validacao.Coluna(obrigatoria=True),
+    }
+    limpo, quarentena, relatorio = validacao.validar(df, esquema, sentinelas=['#NULO!'], identificacao=['NOME'])
+
+    assert limpo['NOME'].tolist() == ['A', 'B', 'D']
+    assert limpo['IAA'].tolist()[:2] == [9.5, 10.0] and np.isnan(limpo['IAA'].iloc[2])
+    assert quarentena.columns.tolist() == ['NOME', 'IAA', 'PONTO_VIRADA', 'MOTIVOS']
+    assert quarentena.to_dict(orient='records') == [
+        {'NOME': 'C', 'IAA': 'abc', 'PONTO_VIRADA': 'Talvez', 'MOTIVOS': 'IAA: tipo (abc); PONTO_VIRADA: categoria (Talvez)'},
+    ]
+    ocorrencias = relatorio.set_index(['coluna', 'regra'])['ocorrencias'].to_dict()
+    assert ocorrencias == {('IAA', 'sentinela'): 1, ('IAA', 'tipo'): 1, ('IAA', 'ajuste'): 1, ('PONTO_VIRADA', 'categoria'): 1}
+    assert relatorio.columns.tolist() == validacao.COLUNAS_RELATORIO